@@ -0,0 +1,126 @@
+"""
+Alcance de datos por usuario (organización y CEDIS asignados)
+
+El alcance se calcula una sola vez por petición a partir del usuario
+autenticado y es inmutable. `filtrar` agrega a cualquier consulta los
+predicados que correspondan según las columnas del modelo:
+
+- `organizacion_id = :org` si el modelo tiene organización;
+- `cedis_id IN (:cedis)` si el usuario tiene CEDIS asignados;
+- para tablas que solo tienen `cedis_id` (extintores, pipc, riesgo...),
+  `cedis_id IN (SELECT id FROM cedis WHERE organizacion_id = :org)`.
+
+El administrador no tiene restricciones. Un usuario sin organización ni
+CEDIS asignados no ve datos.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import FrozenSet, Iterable, Optional
+
+from fastapi import Depends, HTTPException
+from sqlalchemy import false, select
+from sqlalchemy.orm import Session
+
+from app.core.security import get_current_user
+from app.models import CEDIS
+from app.models.usuario import Usuario
+
+@dataclass(frozen=True)
+class Alcance:
+    usuario_id: int
+    rol: str
+    organizacion_id: Optional[int]
+    cedis_ids: Optional[FrozenSet[int]]  # None = todos los CEDIS de la organización
+
+    @property
+    def total(self) -> bool:
+        return self.rol == "Administrador"
+
+    @property
+    def vacio(self) -> bool:
+        return not self.total and self.organizacion_id is None and not self.cedis_ids
+
+    def predicado(self, modelo):
+        """Condición SQL del alcance para `modelo` (None si no hay restricción)"""
+        if self.total:
+            return None
+        if self.vacio:
+            return false()
+
+        columna_org = getattr(modelo, "organizacion_id", None)
+        columna_cedis = modelo.id if modelo is CEDIS else getattr(modelo, "cedis_id", None)
+
+        condiciones = []
+        if columna_org is not None and self.organizacion_id is not None:
+            condiciones.append(columna_org == self.organizacion_id)
+        if columna_cedis is not None:
+            if self.cedis_ids is not None:
+                condiciones.append(columna_cedis.in_(self.cedis_ids))
+            elif columna_org is None:
+                condiciones.append(columna_cedis.in_(
+                    select(CEDIS.id).where(CEDIS.organizacion_id == self.organizacion_id)
+                ))
+
+        if not condiciones:
+            return false()
+        return condiciones[0] if len(condiciones) == 1 else condiciones[0] & condiciones[1]
+
+    def filtrar(self, query, modelo):
+        """Aplicar el alcance a una consulta (Query o select) sobre `modelo`"""
+        condicion = self.predicado(modelo)
+        if condicion is None:
+            return query
+        return query.filter(condicion) if hasattr(query, "filter") else query.where(condicion)
+
+    def permite(self, cedis: CEDIS) -> bool:
+        """Si un CEDIS ya cargado está dentro del alcance"""
+        if self.total:
+            return True
+        if self.vacio:
+            return False
+        if self.organizacion_id is not None and cedis.organizacion_id != self.organizacion_id:
+            return False
+        return self.cedis_ids is None or cedis.id in self.cedis_ids
+
+    def verificar_cedis(self, db: Session, cedis_id: int) -> CEDIS:
+        """Cargar un CEDIS validando el alcance (404 si no existe, 403 si no está permitido)"""
+        cedis = db.query(CEDIS).filter(CEDIS.id == cedis_id).first()
+        if not cedis:
+            raise HTTPException(status_code=404, detail="CEDIS no encontrado")
+        if not self.permite(cedis):
+            raise HTTPException(status_code=403, detail="Sin permisos")
+        return cedis
+
+    def verificar_cedis_ids(self, db: Session, cedis_ids: Iterable[int]):
+        """Validar varios CEDIS con una sola consulta (404 si alguno no existe, 403 si no está permitido)"""
+        ids = set(cedis_ids)
+        encontrados = db.query(CEDIS).filter(CEDIS.id.in_(ids)).all()
+        faltantes = ids - {cedis.id for cedis in encontrados}
+        if faltantes:
+            raise HTTPException(status_code=404, detail=f"CEDIS no encontrados: {sorted(faltantes)}")
+        if not all(self.permite(cedis) for cedis in encontrados):
+            raise HTTPException(status_code=403, detail="Sin permisos")
+
+    def verificar_organizacion(self, organizacion_id: Optional[int]):
+        """Validar la organización de un registro que se va a crear"""
+        if not self.total and organizacion_id != self.organizacion_id:
+            raise HTTPException(status_code=403, detail="Sin permisos")
+
+@lru_cache(maxsize=1024)
+def _construir(usuario_id: int, rol: str, organizacion_id: Optional[int], cedis: Optional[tuple]) -> Alcance:
+    return Alcance(
+        usuario_id=usuario_id,
+        rol=rol,
+        organizacion_id=organizacion_id,
+        cedis_ids=frozenset(cedis) if cedis else None
+    )
+
+def alcance_de(usuario: Usuario) -> Alcance:
+    """Alcance del usuario (cacheado por sus atributos de acceso)"""
+    cedis = tuple(sorted(usuario.cedis_asignados)) if usuario.cedis_asignados else None
+    return _construir(usuario.id, usuario.rol, usuario.organizacion_id, cedis)
+
+def get_alcance(current_user: Usuario = Depends(get_current_user)) -> Alcance:
+    """Dependencia: alcance del usuario autenticado"""
+    return alcance_de(current_user)
@@ -7,8 +7,13 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
-# Motor de base de datos
-engine = create_engine(settings.DATABASE_URL)
+# Motor de base de datos (tamaño del pool por proceso; ver app/servidor.py)
+engine = create_engine(
+    settings.DATABASE_URL,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT
+)
 
 # Sesión
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -23,3 +28,14 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def precalentar_pool(conexiones: int) -> int:
+    """Abrir `conexiones` de una vez para que las primeras peticiones no paguen el connect"""
+    abiertas = []
+    try:
+        for _ in range(conexiones):
+            abiertas.append(engine.connect())
+    finally:
+        for conexion in abiertas:
+            conexion.close()
+    return len(abiertas)
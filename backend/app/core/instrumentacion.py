@@ -0,0 +1,172 @@
+"""
+Instrumentación de SQL por petición
+
+Los eventos `before/after_cursor_execute` del engine miden cada sentencia.
+Dentro de una petición HTTP se acumulan en una medición (contextvar) y el
+middleware agrega a la respuesta:
+
+- `X-DB-Query-Count`: sentencias ejecutadas;
+- `X-DB-Time`: tiempo total en la base de datos (ms);
+- `X-DB-Suspected-N1`: sentencias que se repitieron con la misma forma al
+  menos SQL_N_MAS_1_UMBRAL veces (típico de un N+1).
+
+Las consultas que tardan SQL_LENTA_MS o más y los N+1 sospechosos se
+escriben como líneas JSON en el logger `app.sql`, con el SQL normalizado y
+la forma (tipos) de los parámetros, nunca sus valores.
+"""
+
+import json
+import logging
+import re
+import sys
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.sql")
+
+_ESPACIOS = re.compile(r"\s+")
+_LISTAS_IN = re.compile(r"\bIN\s*\(\s*%\([^)]+\)s(?:\s*,\s*%\([^)]+\)s)*\s*\)", re.IGNORECASE)
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+def normalizar_sql(sentencia: str) -> str:
+    """Misma forma para sentencias que solo difieren en valores"""
+    sentencia = _ESPACIOS.sub(" ", sentencia).strip()
+    sentencia = _LISTAS_IN.sub("IN (...)", sentencia)
+    return _LITERALES.sub("?", sentencia)
+
+def _tipo(valor) -> str:
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        return f"{type(valor).__name__}[{len(valor)}]"
+    return type(valor).__name__
+
+def forma_parametros(parametros, executemany: bool = False):
+    """Tipos de los parámetros (sin valores)"""
+    if executemany:
+        filas = list(parametros or [])
+        return {"filas": len(filas), "forma": forma_parametros(filas[0]) if filas else None}
+    if isinstance(parametros, dict):
+        return {nombre: _tipo(valor) for nombre, valor in parametros.items()}
+    if isinstance(parametros, (list, tuple)):
+        return [_tipo(valor) for valor in parametros]
+    return None
+
+class MedicionConsultas:
+    """Consultas ejecutadas durante una petición"""
+
+    def __init__(self):
+        self.total = 0
+        self.tiempo = 0.0
+        self.por_sentencia: Counter = Counter()
+
+    def registrar(self, sentencia: str, duracion: float):
+        self.total += 1
+        self.tiempo += duracion
+        self.por_sentencia[sentencia] += 1
+
+    def repetidas(self, umbral: int):
+        return [(sql, n) for sql, n in self.por_sentencia.most_common() if n >= umbral]
+
+# Mutable por la misma razón que el contexto de auditoría: los endpoints
+# síncronos corren en otro hilo con una copia del contexto
+_medicion: ContextVar[Optional[MedicionConsultas]] = ContextVar("medicion_consultas", default=None)
+_ruta: ContextVar[Optional[str]] = ContextVar("ruta_medicion", default=None)
+
+def _escribir(registro: dict):
+    logger.warning(json.dumps(registro, ensure_ascii=False, default=str))
+
+def _antes(conexion, cursor, sentencia, parametros, contexto, executemany):
+    conexion.info.setdefault("inicio_consulta", []).append(time.perf_counter())
+
+def _despues(conexion, cursor, sentencia, parametros, contexto, executemany):
+    inicios = conexion.info.get("inicio_consulta")
+    if not inicios:
+        return
+    duracion = time.perf_counter() - inicios.pop()
+    normalizada = normalizar_sql(sentencia)
+
+    medicion = _medicion.get()
+    if medicion is not None:
+        medicion.registrar(normalizada, duracion)
+
+    if duracion * 1000 >= settings.SQL_LENTA_MS:
+        _escribir({
+            "evento": "consulta_lenta",
+            "duracion_ms": round(duracion * 1000, 2),
+            "sql": normalizada,
+            "parametros": forma_parametros(parametros, executemany),
+            "filas": cursor.rowcount,
+            "ruta": _ruta.get()
+        })
+
+def _error(contexto_excepcion):
+    # Una sentencia que falla no llega a after_cursor_execute
+    conexion = contexto_excepcion.connection
+    if conexion is not None and conexion.info.get("inicio_consulta"):
+        conexion.info["inicio_consulta"].pop()
+
+def instrumentar(engine):
+    """Registrar los eventos de medición en un engine"""
+    if event.contains(engine, "before_cursor_execute", _antes):
+        return
+    event.listen(engine, "before_cursor_execute", _antes)
+    event.listen(engine, "after_cursor_execute", _despues)
+    event.listen(engine, "handle_error", _error)
+
+def configurar_log(destino: str = ""):
+    """Líneas JSON a un archivo (SQL_LOG_ARCHIVO) o a stderr"""
+    if logger.handlers:
+        return
+    manejador = logging.FileHandler(destino, encoding="utf-8") if destino else logging.StreamHandler(sys.stderr)
+    manejador.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(manejador)
+    logger.propagate = False
+
+class InstrumentacionSQLMiddleware:
+    """Middleware ASGI: mide las consultas de cada petición y agrega los encabezados X-DB-*"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        medicion = MedicionConsultas()
+        token_medicion = _medicion.set(medicion)
+        token_ruta = _ruta.set(f"{scope['method']} {scope['path']}")
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                encabezados = list(mensaje.get("headers", []))
+                encabezados.append((b"x-db-query-count", str(medicion.total).encode()))
+                encabezados.append((b"x-db-time", f"{medicion.tiempo * 1000:.2f}".encode()))
+                repetidas = medicion.repetidas(settings.SQL_N_MAS_1_UMBRAL)
+                if repetidas:
+                    encabezados.append((b"x-db-suspected-n1", str(len(repetidas)).encode()))
+                mensaje = {**mensaje, "headers": encabezados}
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _medicion.reset(token_medicion)
+            _ruta.reset(token_ruta)
+
+        # Ruta con plantilla (/api/cedis/{cedis_id}) para agrupar en el log
+        ruta = scope.get("route")
+        ruta = f"{scope['method']} {ruta.path}" if ruta is not None else f"{scope['method']} {scope['path']}"
+        for sentencia, repeticiones in medicion.repetidas(settings.SQL_N_MAS_1_UMBRAL):
+            _escribir({
+                "evento": "n_mas_1_sospechoso",
+                "ruta": ruta,
+                "repeticiones": repeticiones,
+                "consultas_peticion": medicion.total,
+                "sql": sentencia
+            })
@@ -0,0 +1,272 @@
+"""
+Métricas de la API en formato de texto de Prometheus (GET /metrics)
+
+El middleware registra por ruta (la plantilla, p. ej. /api/cedis/{cedis_id},
+para no crear una serie por id) y método:
+
+- http_request_duration_seconds (histograma) y http_requests_total por estado;
+- http_response_size_bytes (histograma);
+- http_requests_in_flight (gauge).
+
+Además se exponen métricas calculadas al momento de la consulta: memoria
+del proceso, saturación del threadpool de endpoints síncronos y estado del
+pool de conexiones. Los valores son por proceso (cada worker los suyos).
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BUCKETS_TAMAÑO = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+SIN_RUTA = "<sin_ruta>"
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _etiquetas(nombres: Tuple[str, ...], valores: Tuple, extra: str = "") -> str:
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+def _numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+class _Metrica:
+    tipo = "untyped"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+
+    def encabezado(self) -> List[str]:
+        return [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._valores: Dict[Tuple, float] = {}
+
+    def inc(self, *valores, cantidad: float = 1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def exponer(self) -> List[str]:
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return self.encabezado() + [
+            f"{self.nombre}{_etiquetas(self.etiquetas, llave)} {_numero(valor)}" for llave, valor in valores
+        ]
+
+class Medidor(_Metrica):
+    tipo = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._valores: Dict[Tuple, float] = {}
+
+    def inc(self, *valores, cantidad: float = 1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def dec(self, *valores, cantidad: float = 1):
+        self.inc(*valores, cantidad=-cantidad)
+
+    def exponer(self) -> List[str]:
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return self.encabezado() + [
+            f"{self.nombre}{_etiquetas(self.etiquetas, llave)} {_numero(valor)}" for llave, valor in valores
+        ]
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = (), buckets: Iterable[float] = BUCKETS_LATENCIA):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        # llave -> [conteos por bucket (no acumulados) + desbordamiento, suma, total]
+        self._series: Dict[Tuple, list] = {}
+
+    def observar(self, valor: float, *valores):
+        indice = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exponer(self) -> List[str]:
+        with self._lock:
+            series = sorted((llave, [list(s[0]), s[1], s[2]]) for llave, s in self._series.items())
+        lineas = self.encabezado()
+        for llave, (conteos, suma, total) in series:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (float("inf"),), conteos):
+                acumulado += conteo
+                le = f'le="{_numero(limite)}"'
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, llave, le)} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, llave)} {_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, llave)} {total}")
+        return lineas
+
+class Calculada(_Metrica):
+    """Valor que se obtiene al momento de exponer (memoria, pools, colas...)"""
+
+    def __init__(self, nombre: str, ayuda: str, funcion: Callable[[], Optional[float]], tipo: str = "gauge"):
+        super().__init__(nombre, ayuda)
+        self.funcion = funcion
+        self.tipo = tipo
+
+    def exponer(self) -> List[str]:
+        try:
+            valor = self.funcion()
+        except Exception:
+            valor = None
+        if valor is None:
+            return []
+        return self.encabezado() + [f"{self.nombre} {_numero(valor)}"]
+
+class Registro:
+    def __init__(self):
+        self._metricas: Dict[str, _Metrica] = {}
+
+    def agregar(self, metrica: _Metrica) -> _Metrica:
+        self._metricas.setdefault(metrica.nombre, metrica)
+        return self._metricas[metrica.nombre]
+
+    def calculada(self, nombre: str, ayuda: str, funcion: Callable[[], Optional[float]], tipo: str = "gauge"):
+        return self.agregar(Calculada(nombre, ayuda, funcion, tipo))
+
+    def exponer(self) -> str:
+        lineas = []
+        for metrica in self._metricas.values():
+            lineas.extend(metrica.exponer())
+        return "\n".join(lineas) + "\n"
+
+registro = Registro()
+
+duracion_peticiones = registro.agregar(Histograma(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP",
+    ("method", "route", "status")
+))
+peticiones = registro.agregar(Contador(
+    "http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status")
+))
+tamaño_respuestas = registro.agregar(Histograma(
+    "http_response_size_bytes", "Tamaño del cuerpo de las respuestas HTTP",
+    ("method", "route"), BUCKETS_TAMAÑO
+))
+en_curso = registro.agregar(Medidor(
+    "http_requests_in_flight", "Peticiones HTTP en proceso", ("method",)
+))
+
+# ============ PROCESO ============
+_PAGINA = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_INICIO_PROCESO = time.time()
+
+def _memoria_residente() -> Optional[float]:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGINA
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def _descriptores_abiertos() -> Optional[float]:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+registro.calculada("process_resident_memory_bytes", "Memoria residente del proceso", _memoria_residente)
+registro.calculada("process_cpu_seconds_total", "Tiempo de CPU del proceso", time.process_time, "counter")
+registro.calculada("process_open_fds", "Descriptores de archivo abiertos", _descriptores_abiertos)
+registro.calculada("process_start_time_seconds", "Inicio del proceso (epoch)", lambda: _INICIO_PROCESO)
+registro.calculada("process_threads", "Hilos del proceso", threading.active_count)
+
+# ============ THREADPOOL ============
+# Los endpoints síncronos corren en el threadpool de AnyIO; sus valores solo
+# pueden leerse desde el event loop, por eso se toman en `exponer_metricas`
+_threadpool: Dict[str, float] = {}
+
+registro.calculada("threadpool_threads_max", "Capacidad del threadpool de endpoints síncronos",
+                   lambda: _threadpool.get("total"))
+registro.calculada("threadpool_threads_busy", "Hilos del threadpool ocupados",
+                   lambda: _threadpool.get("ocupados"))
+registro.calculada("threadpool_tasks_waiting", "Tareas esperando un hilo libre del threadpool",
+                   lambda: _threadpool.get("esperando"))
+
+def _leer_threadpool():
+    from anyio.to_thread import current_default_thread_limiter
+
+    limitador = current_default_thread_limiter()
+    _threadpool["total"] = limitador.total_tokens
+    _threadpool["ocupados"] = limitador.borrowed_tokens
+    _threadpool["esperando"] = limitador.statistics().tasks_waiting
+
+# ============ POOL DE CONEXIONES ============
+def registrar_pool(engine):
+    """Métricas del pool de conexiones de SQLAlchemy"""
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return
+    registro.calculada("db_pool_size", "Conexiones configuradas en el pool", pool.size)
+    registro.calculada("db_pool_checked_out", "Conexiones del pool en uso", pool.checkedout)
+    registro.calculada("db_pool_checked_in", "Conexiones libres en el pool", pool.checkedin)
+    # QueuePool reporta negativo mientras el pool no se ha llenado
+    registro.calculada("db_pool_overflow", "Conexiones abiertas por encima del tamaño del pool",
+                       lambda: max(pool.overflow(), 0))
+
+async def exponer_metricas() -> str:
+    _leer_threadpool()
+    return registro.exponer()
+
+class MetricasMiddleware:
+    """Middleware ASGI: latencia, estado, tamaño y peticiones en curso por ruta"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metodo = scope["method"]
+        estado = {"codigo": 500, "bytes": 0}
+        inicio = time.perf_counter()
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["codigo"] = mensaje["status"]
+            elif mensaje["type"] == "http.response.body":
+                estado["bytes"] += len(mensaje.get("body", b""))
+            await send(mensaje)
+
+        en_curso.inc(metodo)
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            en_curso.dec(metodo)
+            duracion = time.perf_counter() - inicio
+            # Las rutas inexistentes comparten una sola serie
+            ruta = scope.get("route")
+            ruta = ruta.path if ruta is not None else SIN_RUTA
+            codigo = str(estado["codigo"])
+            duracion_peticiones.observar(duracion, metodo, ruta, codigo)
+            peticiones.inc(metodo, ruta, codigo)
+            tamaño_respuestas.observar(estado["bytes"], metodo, ruta)
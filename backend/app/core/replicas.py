@@ -0,0 +1,197 @@
+"""
+Réplicas de lectura
+
+Con DATABASE_REPLICA_URLS las rutas de solo lectura (tablero, estadísticas,
+listados, cumplimiento) usan `get_db_lectura`, que reparte las sesiones
+entre las réplicas en round-robin y deja al primario las escrituras.
+
+Un hilo de fondo registra cada DB_REPLICA_VERIFICACION_SEGUNDOS la posición
+WAL del primario y la posición reproducida por cada réplica. El horizonte
+de una réplica es el último instante en que el primario estaba en una
+posición que la réplica ya reprodujo: tiene todo lo confirmado hasta ahí.
+Una réplica atiende una sesión solo si:
+
+- su horizonte es posterior a ahora - DB_REPLICA_LAG_MAX_SEGUNDOS (réplica
+  atrasada o sin responder queda fuera), y
+- ya reprodujo la posición WAL de la última escritura del usuario, para que
+  lea sus propias escrituras.
+
+Esa posición se guarda después de cada commit en escrituras_usuario, en el
+primario, así que la ve cualquier worker o instancia; se consulta con la
+sesión del primario de la petición (la misma de la autenticación).
+
+Si ninguna cumple, la sesión va al primario. La réplica se elige en el
+primer uso de la sesión (cuando la autenticación ya identificó al usuario),
+no al crearla.
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
+from fastapi import Depends
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine, get_db
+from app.services.auditoria import usuario_actual
+
+# Posición WAL en bytes: reproducida en una réplica, escrita en el primario
+_SQL_LSN = text("""
+    SELECT (CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn() ELSE pg_current_wal_lsn() END
+            - '0/0'::pg_lsn)::bigint
+""")
+_SQL_REGISTRAR_ESCRITURA = text("""
+    INSERT INTO escrituras_usuario (usuario_id, lsn) VALUES (:usuario_id, pg_current_wal_lsn())
+    ON CONFLICT (usuario_id) DO UPDATE SET lsn = EXCLUDED.lsn, registrado_en = now()
+""")
+_SQL_ESCRITURA = text("SELECT (lsn - '0/0'::pg_lsn)::bigint FROM escrituras_usuario WHERE usuario_id = :usuario_id")
+
+class Replica:
+    def __init__(self, url: str):
+        self.engine = create_engine(
+            url,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT
+        )
+        self.nombre = self.engine.url.render_as_string(hide_password=True)
+        self.lsn: Optional[int] = None  # posición reproducida
+        self.horizonte: Optional[float] = None  # None = no disponible
+        self.retraso: Optional[float] = None
+
+class Replicas:
+    """Réplicas con su posición WAL y su horizonte"""
+
+    def __init__(self, urls: List[str], lag_max: float, intervalo: float):
+        self.lag_max = lag_max
+        self.intervalo = intervalo
+        self._replicas = [Replica(url) for url in urls]
+        self._turno = itertools.count()
+        # (instante, posición del primario); más viejas que lag_max no sirven
+        self._muestras = deque(maxlen=int(lag_max / max(intervalo, 0.001)) + 2)
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+
+    def __bool__(self) -> bool:
+        return bool(self._replicas)
+
+    @property
+    def engines(self) -> List[Engine]:
+        return [replica.engine for replica in self._replicas]
+
+    def _al_dia(self) -> List[Replica]:
+        limite = time.time() - self.lag_max
+        return [r for r in self._replicas if r.horizonte is not None and r.horizonte >= limite]
+
+    def disponibles(self) -> int:
+        return len(self._al_dia())
+
+    def elegir(self, lsn_usuario: int = 0) -> Optional[Engine]:
+        """Réplica al día que ya reprodujo `lsn_usuario` (None = usar el primario)"""
+        candidatas = [r for r in self._al_dia() if r.lsn >= lsn_usuario]
+        if not candidatas:
+            return None
+        return candidatas[next(self._turno) % len(candidatas)].engine
+
+    def verificar(self):
+        """Muestrear la posición del primario y actualizar el horizonte de cada réplica"""
+        inicio = time.time()
+        try:
+            with engine.connect() as conexion:
+                self._muestras.append((inicio, conexion.execute(_SQL_LSN).scalar()))
+        except Exception as e:
+            print(f"⚠️ No se pudo leer la posición WAL del primario: {e}")
+
+        for replica in self._replicas:
+            try:
+                with replica.engine.connect() as conexion:
+                    replica.lsn = conexion.execute(_SQL_LSN).scalar()
+            except Exception as e:
+                if replica.horizonte is not None:
+                    print(f"⚠️ Réplica {replica.nombre} no disponible: {e}")
+                replica.lsn, replica.horizonte, replica.retraso = None, None, None
+                continue
+
+            alcanzadas = [momento for momento, lsn in self._muestras if lsn <= replica.lsn]
+            replica.horizonte = max(alcanzadas) if alcanzadas else None
+            replica.retraso = inicio - replica.horizonte if alcanzadas else None
+
+    def iniciar(self):
+        if not self._replicas or (self._hilo is not None and self._hilo.is_alive()):
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ejecutar, name="replicas-lectura", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(self.intervalo + 10)
+            self._hilo = None
+        for replica in self._replicas:
+            replica.engine.dispose()
+
+    def _ejecutar(self):
+        while not self._detener.is_set():
+            self.verificar()
+            self._detener.wait(self.intervalo)
+
+replicas = Replicas(
+    [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()],
+    settings.DB_REPLICA_LAG_MAX_SEGUNDOS,
+    settings.DB_REPLICA_VERIFICACION_SEGUNDOS
+)
+
+class SesionLectura(Session):
+    """Sesión que elige réplica (o primario) al primer uso"""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if "engine" not in self.info:
+            self.info["engine"] = self._elegir() or engine
+        return self.info["engine"]
+
+    def _elegir(self) -> Optional[Engine]:
+        usuario_id = usuario_actual()
+        if not replicas.disponibles():
+            return None
+        if usuario_id is None:
+            return replicas.elegir()
+        lsn = self.info["primario"].execute(_SQL_ESCRITURA, {"usuario_id": usuario_id}).scalar()
+        return replicas.elegir(lsn or 0)
+
+SesionLecturaLocal = sessionmaker(class_=SesionLectura, autocommit=False, autoflush=False)
+
+@event.listens_for(SessionLocal, "after_begin")
+def _guardar_conexion(session, transaction, connection):
+    session.info["conexion"] = connection
+
+@event.listens_for(SessionLocal, "after_commit")
+def _registrar_escritura(session):
+    """Guardar la posición WAL ya confirmada, en la conexión que hizo el commit"""
+    conexion = session.info.get("conexion")
+    usuario_id = usuario_actual()
+    if not replicas or conexion is None or usuario_id is None:
+        return
+    conexion.execute(_SQL_REGISTRAR_ESCRITURA, {"usuario_id": usuario_id})
+    conexion.commit()
+
+@event.listens_for(SessionLocal, "after_transaction_end")
+def _olvidar_conexion(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("conexion", None)
+
+def get_db_lectura(db: Session = Depends(get_db)):
+    """Dependencia: sesión para rutas de solo lectura (réplica si hay una al día)"""
+    if not replicas:
+        yield db
+        return
+    lectura = SesionLecturaLocal(info={"primario": db})
+    try:
+        yield lectura
+    finally:
+        lectura.close()
@@ -4,6 +4,7 @@ Seguridad y Autenticación JWT
 
 from datetime import datetime, timedelta
 from typing import Optional
+from uuid import uuid4
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
@@ -13,6 +14,8 @@ from sqlalchemy.orm import Session
 from app.core.config import settings
 from app.core.database import get_db
 from app.models.usuario import Usuario
+from app.services.auditoria import asignar_usuario
+from app.services.sesiones import hash_token, registro_sesiones
 
 # Contexto para hash de passwords
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -28,15 +31,17 @@ def get_password_hash(password: str) -> str:
     """Hashear password"""
     return pwd_context.hash(password)
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    """Crear JWT token"""
+def create_access_token(
+    data: dict,
+    expires_delta: Optional[timedelta] = None,
+    expire: Optional[datetime] = None
+):
+    """Crear JWT token (jti único: dos logins en el mismo segundo dan tokens distintos)"""
     to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    if expire is None:
+        expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -59,6 +64,10 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
     
+    # Revocación verificada en memoria (sin consulta adicional)
+    if registro_sesiones.revocada(hash_token(token)):
+        raise credentials_exception
+    
     user = db.query(Usuario).filter(Usuario.email == email).first()
     if user is None:
         raise credentials_exception
@@ -66,6 +75,7 @@ def get_current_user(
     if not user.activo:
         raise HTTPException(status_code=400, detail="Usuario inactivo")
     
+    asignar_usuario(user.id)
     return user
 
 def get_current_active_admin(
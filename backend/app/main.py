@@ -4,22 +4,63 @@ Backend API - FastAPI
 Autor: Desarrollado para Victor Manuel De La Torre
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from anyio import to_thread
+import asyncio
 import os
+import secrets
 
 from app.core.config import settings
-from app.core.database import engine, Base
-from app.routers import auth, cedis, eventos, gastos, proteccion_civil, dashboard
+from app.core.database import engine, Base, SessionLocal, precalentar_pool
+from app.core.instrumentacion import InstrumentacionSQLMiddleware, configurar_log, instrumentar
+from app.core.metricas import CONTENT_TYPE, MetricasMiddleware, exponer_metricas, registrar_pool, registro
+from app.core.replicas import replicas
+from app.services.alertas_vencimiento import bucle_alertas
+from app.services.cumplimiento import bucle_cumplimiento
+from app.services.idempotencia import bucle_purga
+from app.services.pronosticos import bucle_pronosticos
+from app.services.auditoria import ContextoAuditoriaMiddleware, escritor_auditoria
+from app.services.sesiones import registro_sesiones
+from app.services.reportes import cola_reportes, marcar_interrumpidos
+from app.routers import auth, cedis, eventos, gastos, presupuestos, proteccion_civil, dashboard, noticias, riesgo, auditoria, reportes
 
 # Crear tablas al inicio
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("🚀 Iniciando Sistema de Protección de Activos API...")
+    if settings.THREADPOOL_HILOS:
+        # Endpoints síncronos concurrentes; app.servidor lo iguala a las conexiones del pool
+        to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_HILOS
+    if settings.DB_POOL_PRECALENTAR:
+        await to_thread.run_sync(precalentar_pool, settings.DB_POOL_SIZE)
+    escritor_auditoria.iniciar()
+    registro_sesiones.iniciar()
+    replicas.iniciar()
+    db = SessionLocal()
+    try:
+        marcar_interrumpidos(db)
+    finally:
+        db.close()
+    tareas = [
+        asyncio.create_task(bucle_purga()),
+        asyncio.create_task(bucle_pronosticos()),
+        asyncio.create_task(bucle_cumplimiento())
+    ]
+    if settings.ALERTAS_HABILITADAS:
+        tareas.append(asyncio.create_task(bucle_alertas()))
     yield
     # Shutdown
+    for tarea in tareas:
+        tarea.cancel()
+    cola_reportes.cerrar()
+    registro_sesiones.detener()
+    escritor_auditoria.detener()
+    replicas.detener()
+    engine.dispose()
     print("👋 Cerrando Sistema de Protección de Activos API...")
 
 app = FastAPI(
@@ -37,14 +78,34 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ContextoAuditoriaMiddleware)
+if settings.SQL_INSTRUMENTACION:
+    instrumentar(engine)
+    for engine_replica in replicas.engines:
+        instrumentar(engine_replica)
+    configurar_log(settings.SQL_LOG_ARCHIVO)
+    app.add_middleware(InstrumentacionSQLMiddleware)
+if settings.METRICAS_HABILITADAS:
+    registrar_pool(engine)
+    if replicas:
+        registro.calculada("db_replicas_disponibles", "Réplicas de lectura al día y respondiendo", replicas.disponibles)
+    registro.calculada("auditoria_cola_pendientes", "Registros de auditoría en cola", escritor_auditoria.pendientes)
+    registro.calculada("sesiones_revocadas", "Tokens revocados vigentes en memoria", lambda: len(registro_sesiones))
+    registro.calculada("reportes_en_proceso", "Reportes en el pool de generación", cola_reportes.pendientes)
+    app.add_middleware(MetricasMiddleware)
 
 # Routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Autenticación"])
 app.include_router(cedis.router, prefix="/api/cedis", tags=["CEDIS"])
 app.include_router(eventos.router, prefix="/api/eventos", tags=["Eventos Seguridad"])
 app.include_router(gastos.router, prefix="/api/gastos", tags=["Gastos"])
+app.include_router(presupuestos.router, prefix="/api/presupuestos", tags=["Presupuestos"])
 app.include_router(proteccion_civil.router, prefix="/api/proteccion-civil", tags=["Protección Civil"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
+app.include_router(noticias.router, prefix="/api/noticias", tags=["Monitoreo"])
+app.include_router(riesgo.router, prefix="/api/riesgo", tags=["Riesgo Delictivo"])
+app.include_router(reportes.router, prefix="/api/reportes", tags=["Reportes"])
+app.include_router(auditoria.router, prefix="/api/auditoria", tags=["Auditoría"])
 
 @app.get("/")
 async def root():
@@ -60,6 +121,21 @@ async def root():
 async def health():
     return {"status": "healthy", "database": "connected"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Métricas en formato de texto de Prometheus"""
+    if not settings.METRICAS_HABILITADAS:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not settings.METRICAS_TOKEN:
+        # Tráfico por ruta y estado de los pools: no se exponen sin token salvo que se pida
+        if not settings.METRICAS_SIN_TOKEN:
+            raise HTTPException(status_code=404, detail="Not Found")
+    elif not secrets.compare_digest(
+        request.headers.get("authorization", "").encode(), f"Bearer {settings.METRICAS_TOKEN}".encode()
+    ):
+        raise HTTPException(status_code=401, detail="No autorizado")
+    return Response(await exponer_metricas(), media_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -2,7 +2,8 @@
 Modelos principales del sistema
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ARRAY, JSON, Float, Date, ForeignKey, Text, DECIMAL
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, ARRAY, JSON, Float, Date, ForeignKey, Text, DECIMAL, Computed
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -35,6 +36,7 @@ class CEDIS(Base):
     nombre = Column(String(100), nullable=False)
     estado_id = Column(Integer, ForeignKey("estados.id"))
     municipio = Column(String(100), nullable=False)
+    municipio_norm = Column(String(100), Computed("normalizar_municipio(municipio)"))
     direccion = Column(Text)
     cp = Column(String(10))
     superficie_m2 = Column(DECIMAL(10, 2))
@@ -64,6 +66,11 @@ class EventoSeguridad(Base):
     hora = Column(String(10))
     mes = Column(String(20))
     dia_semana = Column(String(20))
+    # Calendario generado a partir de `fecha` (día ISO: 1 = lunes)
+    fecha_anio = Column(Integer, Computed("EXTRACT(YEAR FROM fecha)::smallint", persisted=True))
+    fecha_mes = Column(Integer, Computed("EXTRACT(MONTH FROM fecha)::smallint", persisted=True))
+    fecha_dia_semana = Column(Integer, Computed("EXTRACT(ISODOW FROM fecha)::smallint", persisted=True))
+    fecha_hora = Column(Integer, Computed("EXTRACT(HOUR FROM fecha)::smallint", persisted=True))
     responsable = Column(String(150))
     estatus = Column(String(50))
     organizacion_id = Column(Integer, ForeignKey("organizaciones.id"))
@@ -152,3 +159,225 @@ class Dictamen(Base):
     observaciones = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class IndiceDelictivo(Base):
+    __tablename__ = "indices_delictivos"
+    
+    id = Column(Integer, primary_key=True)
+    año = Column(Integer, nullable=False)
+    mes = Column(Integer, nullable=False)
+    estado_id = Column(Integer, ForeignKey("estados.id"))
+    municipio = Column(String(100), nullable=False)
+    municipio_norm = Column(String(100), Computed("normalizar_municipio(municipio)"))
+    homicidio_doloso = Column(Integer, default=0)
+    homicidio_culposo = Column(Integer, default=0)
+    secuestro = Column(Integer, default=0)
+    extorsion = Column(Integer, default=0)
+    robo_total = Column(Integer, default=0)
+    robo_con_violencia = Column(Integer, default=0)
+    robo_sin_violencia = Column(Integer, default=0)
+    robo_vehiculo = Column(Integer, default=0)
+    robo_negocio = Column(Integer, default=0)
+    robo_casa_habitacion = Column(Integer, default=0)
+    robo_transeúnte = Column(Integer, default=0)
+    robo_transporte = Column(Integer, default=0)
+    robo_mercancia = Column(Integer, default=0)
+    violencia_familiar = Column(Integer, default=0)
+    violacion = Column(Integer, default=0)
+    lesiones = Column(Integer, default=0)
+    daño_propiedad = Column(Integer, default=0)
+    fuente = Column(String(100), default='SESNSP')
+    fecha_carga = Column(DateTime, server_default=func.now())
+
+class RiesgoDelictivoCEDIS(Base):
+    __tablename__ = "riesgo_delictivo_cedis"
+    
+    cedis_id = Column(Integer, ForeignKey("cedis.id"), primary_key=True)
+    año = Column(Integer, primary_key=True)
+    mes = Column(Integer, primary_key=True)
+    delitos_relevantes = Column(Integer, default=0)
+    indice_impacto = Column(Integer, default=0)
+    suma_3m = Column(Integer, default=0)
+    suma_6m = Column(Integer, default=0)
+    suma_12m = Column(Integer, default=0)
+    suma_12m_anterior = Column(Integer)
+    variacion_anual = Column(DECIMAL(8, 2))
+    variacion_mes_anual = Column(DECIMAL(8, 2))
+    nivel_riesgo = Column(String(20))
+    actualizado_en = Column(DateTime, server_default=func.now())
+
+class FuenteMonitoreo(Base):
+    __tablename__ = "fuentes_monitoreo"
+    
+    id = Column(Integer, primary_key=True)
+    nombre = Column(String(200), nullable=False)
+    tipo = Column(String(50), nullable=False)
+    url = Column(Text, nullable=False)
+    estado_id = Column(Integer, ForeignKey("estados.id"))
+    activo = Column(Boolean, default=True)
+    frecuencia_minutos = Column(Integer, default=60)
+    ultima_consulta = Column(DateTime)
+    configuracion = Column(JSON)
+    created_at = Column(DateTime, server_default=func.now())
+
+class NoticiaMonitoreada(Base):
+    __tablename__ = "noticias_monitoreadas"
+    
+    id = Column(Integer, primary_key=True)
+    fuente_id = Column(Integer, ForeignKey("fuentes_monitoreo.id"))
+    fuente_nombre = Column(String(200))
+    tipo_fuente = Column(String(50))
+    url = Column(Text)
+    titulo = Column(Text, nullable=False)
+    contenido = Column(Text)
+    fecha_publicacion = Column(DateTime)
+    fecha_deteccion = Column(DateTime, server_default=func.now())
+    tipo_alerta = Column(String(50))
+    nivel_criticidad = Column(String(20), default='Informativo')
+    estado_afectado_id = Column(Integer, ForeignKey("estados.id"))
+    municipio_afectado = Column(String(100))
+    cedis_afectados = Column(ARRAY(Integer))
+    palabras_clave = Column(ARRAY(Text))
+    confianza_clasificacion = Column(DECIMAL(3, 2))
+    alertas_enviadas = Column(Boolean, default=False)
+    fecha_alerta = Column(DateTime)
+    revisado = Column(Boolean, default=False)
+    relevante = Column(Boolean, default=True)
+    archivado = Column(Boolean, default=False)
+    # Deduplicación (SimHash)
+    huella_simhash = Column(BigInteger)
+    es_duplicado = Column(Boolean, default=False)
+    noticia_canonica_id = Column(Integer, ForeignKey("noticias_monitoreadas.id"))
+    total_duplicados = Column(Integer, default=0)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class Auditoria(Base):
+    __tablename__ = "auditoria"
+    
+    id = Column(Integer, primary_key=True)
+    usuario_id = Column(Integer)
+    accion = Column(String(100), nullable=False)
+    tabla_afectada = Column(String(100))
+    registro_id = Column(Integer)
+    datos_anteriores = Column(JSONB)
+    datos_nuevos = Column(JSONB)
+    ip_address = Column(String(50))
+    user_agent = Column(Text)
+    timestamp = Column(DateTime, server_default=func.now())
+
+class ReporteGenerado(Base):
+    __tablename__ = "reportes_generados"
+    
+    id = Column(Integer, primary_key=True)
+    uuid = Column(UUID(as_uuid=True), server_default=func.uuid_generate_v4())
+    tipo_reporte = Column(String(100), nullable=False)
+    titulo = Column(String(300))
+    organizacion_id = Column(Integer, ForeignKey("organizaciones.id"))
+    cedis_id = Column(Integer, ForeignKey("cedis.id"))
+    evento_id = Column(Integer)
+    noticia_id = Column(Integer, ForeignKey("noticias_monitoreadas.id"))
+    formato = Column(String(20))
+    url_archivo = Column(Text)
+    tamaño_bytes = Column(BigInteger)
+    estado = Column(String(50), default='Generando')
+    error_mensaje = Column(Text)
+    generado_por_usuario_id = Column(Integer)
+    generado_automaticamente = Column(Boolean, default=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+class ClaveIdempotencia(Base):
+    __tablename__ = "claves_idempotencia"
+    
+    usuario_id = Column(Integer, primary_key=True)
+    clave = Column(String(255), primary_key=True)
+    ambito = Column(String(50), nullable=False)
+    huella = Column(String(64), nullable=False)
+    estado_http = Column(Integer)
+    respuesta = Column(JSONB)
+    expira_en = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+class ModeloGasto(Base):
+    __tablename__ = "modelos_gasto"
+    
+    cedis_id = Column(Integer, primary_key=True)
+    categoria_id = Column(Integer, primary_key=True)
+    organizacion_id = Column(Integer)
+    mes_base = Column(Date, nullable=False)  # primer mes pronosticado (mes en curso al ajustar)
+    meses_historia = Column(Integer, nullable=False)
+    modelo = Column(String(20), nullable=False)
+    coeficientes = Column(ARRAY(Float), nullable=False)
+    sigma = Column(Float, nullable=False)
+    pronostico = Column(ARRAY(Float), nullable=False)
+    error_estandar = Column(ARRAY(Float), nullable=False)
+    ajustado_en = Column(DateTime, server_default=func.now())
+
+class Presupuesto(Base):
+    __tablename__ = "presupuestos"
+    
+    id = Column(Integer, primary_key=True)
+    mes = Column(Date, nullable=False)  # primer día del mes
+    cedis_id = Column(Integer, ForeignKey("cedis.id"), nullable=False)
+    categoria_id = Column(Integer, ForeignKey("categorias_gasto.id"), nullable=False)
+    organizacion_id = Column(Integer, ForeignKey("organizaciones.id"))
+    monto = Column(DECIMAL(14, 2), nullable=False)
+    umbrales = Column(ARRAY(Integer), nullable=False, server_default="{80,100}")
+    notas = Column(Text)
+    usuario_id = Column(Integer)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class GastoAcumulado(Base):
+    """Ejercido por (mes, CEDIS, categoría); lo mantienen los triggers de gastos"""
+    __tablename__ = "gastos_acumulados"
+    
+    mes = Column(Date, primary_key=True)
+    cedis_id = Column(Integer, primary_key=True)
+    categoria_id = Column(Integer, primary_key=True)
+    organizacion_id = Column(Integer)
+    total = Column(DECIMAL(14, 2), nullable=False, default=0)
+    gastos = Column(Integer, nullable=False, default=0)
+    actualizado_en = Column(DateTime, server_default=func.now())
+
+class EventoPresupuesto(Base):
+    __tablename__ = "eventos_presupuesto"
+    
+    id = Column(Integer, primary_key=True)
+    presupuesto_id = Column(Integer, ForeignKey("presupuestos.id", ondelete="CASCADE"), nullable=False)
+    mes = Column(Date, nullable=False)
+    cedis_id = Column(Integer, nullable=False)
+    categoria_id = Column(Integer, nullable=False)
+    organizacion_id = Column(Integer)
+    umbral = Column(Integer, nullable=False)
+    monto = Column(DECIMAL(14, 2), nullable=False)
+    ejercido = Column(DECIMAL(14, 2), nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+class CumplimientoCEDIS(Base):
+    """Score de protección civil por CEDIS; lo escribe recalcular_cumplimiento() en la base"""
+    __tablename__ = "cumplimiento_cedis"
+    
+    cedis_id = Column(Integer, ForeignKey("cedis.id", ondelete="CASCADE"), primary_key=True)
+    organizacion_id = Column(Integer)
+    extintores_cumple = Column(Boolean, nullable=False)
+    pipc_vigente = Column(Boolean, nullable=False)
+    dictamen_estructural = Column(Boolean, nullable=False)
+    dictamen_electrico = Column(Boolean, nullable=False)
+    score = Column(Integer, nullable=False)
+    proximo_vencimiento = Column(Date)
+    evaluado_el = Column(Date, nullable=False)
+    actualizado_en = Column(DateTime, server_default=func.now())
+
+class CumplimientoHistorico(Base):
+    """Foto diaria de cumplimiento_cedis (particionada por año de `fecha`)"""
+    __tablename__ = "cumplimiento_historico"
+    
+    cedis_id = Column(Integer, primary_key=True)
+    fecha = Column(Date, primary_key=True)
+    organizacion_id = Column(Integer)
+    extintores_cumple = Column(Boolean, nullable=False)
+    pipc_vigente = Column(Boolean, nullable=False)
+    dictamen_estructural = Column(Boolean, nullable=False)
+    dictamen_electrico = Column(Boolean, nullable=False)
+    score = Column(Integer, nullable=False)
@@ -1,7 +1,7 @@
 """
 Modelo de Usuario
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, ARRAY
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -17,7 +17,7 @@ class Usuario(Base):
     # Roles: Administrador, Supervisor, Gerente CEDIS, Consultor
     
     organizacion_id = Column(Integer, nullable=True)
-    cedis_asignados = Column(String, nullable=True)
+    cedis_asignados = Column(ARRAY(Integer), nullable=True)
     
     permisos = Column(String, nullable=True)
     
@@ -26,3 +26,15 @@ class Usuario(Base):
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class Sesion(Base):
+    __tablename__ = "sesiones"
+    
+    id = Column(Integer, primary_key=True)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"))
+    token_hash = Column(Text, nullable=False)
+    ip_address = Column(String(50))
+    user_agent = Column(Text)
+    valido_hasta = Column(DateTime, nullable=False)
+    revocado_en = Column(DateTime)
+    created_at = Column(DateTime, server_default=func.now())
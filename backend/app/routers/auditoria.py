@@ -0,0 +1,68 @@
+"""
+Router de Auditoría
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime
+
+from app.core.replicas import get_db_lectura
+from app.core.security import get_current_user
+from app.models import Auditoria
+from app.models.usuario import Usuario
+from app.schemas import AuditoriaPagina
+
+router = APIRouter()
+
+@router.get("/", response_model=AuditoriaPagina)
+def get_auditoria(
+    tabla: Optional[str] = None,
+    registro_id: Optional[int] = None,
+    usuario_id: Optional[int] = None,
+    accion: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    antes_timestamp: Optional[datetime] = None,
+    antes_id: Optional[int] = None,
+    limite: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db_lectura),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Consultar la bitácora de auditoría, del más reciente al más antiguo.
+    
+    Paginación por llave: para la siguiente página enviar `antes_timestamp` y
+    `antes_id` con los valores `siguiente_*` de la respuesta anterior.
+    """
+    if current_user.rol != "Administrador":
+        raise HTTPException(status_code=403, detail="Sin permisos")
+    
+    if (antes_timestamp is None) != (antes_id is None):
+        raise HTTPException(status_code=400, detail="antes_timestamp y antes_id van juntos")
+    
+    query = db.query(Auditoria)
+    
+    if tabla:
+        query = query.filter(Auditoria.tabla_afectada == tabla)
+    if registro_id is not None:
+        query = query.filter(Auditoria.registro_id == registro_id)
+    if usuario_id is not None:
+        query = query.filter(Auditoria.usuario_id == usuario_id)
+    if accion:
+        query = query.filter(Auditoria.accion == accion)
+    if desde:
+        query = query.filter(Auditoria.timestamp >= desde)
+    if hasta:
+        query = query.filter(Auditoria.timestamp <= hasta)
+    if antes_timestamp is not None:
+        query = query.filter(tuple_(Auditoria.timestamp, Auditoria.id) < tuple_(antes_timestamp, antes_id))
+    
+    registros = query.order_by(Auditoria.timestamp.desc(), Auditoria.id.desc()).limit(limite + 1).all()
+    
+    siguiente = registros[limite - 1] if len(registros) > limite else None
+    return {
+        "items": registros[:limite],
+        "siguiente_timestamp": siguiente.timestamp if siguiente else None,
+        "siguiente_id": siguiente.id if siguiente else None
+    }
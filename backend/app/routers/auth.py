@@ -1,19 +1,23 @@
 """
 Router de Autenticación - CORREGIDO
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from datetime import datetime
+from typing import List, Optional
+from datetime import datetime, timedelta
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.security import (
     verify_password,
     get_password_hash,
     create_access_token,
-    get_current_user
+    get_current_user,
+    oauth2_scheme
 )
-from app.models.usuario import Usuario
-from app.schemas import UserLogin, UserCreate, UserResponse, Token
+from app.models.usuario import Usuario, Sesion
+from app.schemas import UserLogin, UserCreate, UserResponse, Token, SesionResponse
+from app.services.sesiones import registrar_sesion, revocar_token, revocar_sesion, revocar_sesiones_usuario
 
 router = APIRouter()
 
@@ -36,6 +40,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
             password_hash=hashed_password,
             rol=user_data.rol,
             organizacion_id=user_data.organizacion_id,
+            cedis_asignados=user_data.cedis_asignados,
             activo=True
         )
         
@@ -57,6 +62,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 @router.post("/login", response_model=Token)
 def login(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
@@ -83,13 +89,22 @@ def login(
         if not user.activo:
             raise HTTPException(status_code=400, detail="Usuario inactivo")
         
-        # Actualizar último login
+        # Crear token
+        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        access_token = create_access_token(data={"sub": user.email}, expire=expire)
+        
+        # Registrar sesión (vence con el mismo `exp` del token) y actualizar último login
+        registrar_sesion(
+            db,
+            user.id,
+            access_token,
+            expire,
+            ip_address=request.client.host if request.client else None,
+            user_agent=request.headers.get("user-agent")
+        )
         user.ultimo_login = datetime.utcnow()
         db.commit()
         
-        # Crear token
-        access_token = create_access_token(data={"sub": user.email})
-        
         return {
             "access_token": access_token,
             "token_type": "bearer",
@@ -111,6 +126,57 @@ def get_me(current_user: Usuario = Depends(get_current_user)):
     return current_user
 
 @router.post("/logout")
-def logout(current_user: Usuario = Depends(get_current_user)):
-    """Logout (invalidar token en el cliente)"""
+def logout(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Logout (revoca la sesión del token actual)"""
+    revocar_token(db, token)
     return {"mensaje": "Logout exitoso"}
+
+@router.get("/sesiones", response_model=List[SesionResponse])
+def get_sesiones(
+    usuario_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Sesiones vigentes del usuario actual (o de otro usuario, solo administrador)"""
+    if usuario_id is not None and usuario_id != current_user.id and current_user.rol != "Administrador":
+        raise HTTPException(status_code=403, detail="Sin permisos")
+    
+    return db.query(Sesion).filter(
+        Sesion.usuario_id == (usuario_id or current_user.id),
+        Sesion.revocado_en.is_(None),
+        Sesion.valido_hasta > datetime.utcnow()
+    ).order_by(Sesion.created_at.desc()).all()
+
+@router.delete("/sesiones/{sesion_id}")
+def delete_sesion(
+    sesion_id: int,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Revocar una sesión"""
+    sesion = db.query(Sesion).filter(Sesion.id == sesion_id).first()
+    if not sesion:
+        raise HTTPException(status_code=404, detail="Sesión no encontrada")
+    
+    if sesion.usuario_id != current_user.id and current_user.rol != "Administrador":
+        raise HTTPException(status_code=403, detail="Sin permisos")
+    
+    revocar_sesion(db, sesion_id)
+    return {"mensaje": "Sesión revocada"}
+
+@router.post("/usuarios/{usuario_id}/revocar-sesiones")
+def revocar_sesiones(
+    usuario_id: int,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Revocar todas las sesiones de un usuario (p. ej. cuenta comprometida)"""
+    if current_user.rol != "Administrador":
+        raise HTTPException(status_code=403, detail="Sin permisos")
+    
+    revocadas = revocar_sesiones_usuario(db, usuario_id)
+    return {"mensaje": "Sesiones revocadas", "total": len(revocadas)}
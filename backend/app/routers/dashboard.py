@@ -8,43 +8,39 @@ from sqlalchemy import func
 from decimal import Decimal
 from datetime import datetime, timedelta
 
-from app.core.database import get_db
-from app.core.security import get_current_user
-from app.models import CEDIS, EventoSeguridad, Gasto, Estado, Extintor, PIPC
-from app.models.usuario import Usuario
+from app.core.alcance import Alcance, get_alcance
+from app.core.replicas import get_db_lectura
+from app.models import CEDIS, EventoSeguridad, Gasto, Estado, Extintor, PIPC, CumplimientoCEDIS
 from app.schemas import DashboardStats, CEDISMapa
 
 router = APIRouter()
 
 @router.get("/stats", response_model=DashboardStats)
 def get_dashboard_stats(
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
 ):
     """Obtener estadísticas principales del dashboard"""
     
     # Total CEDIS
     cedis_query = db.query(CEDIS)
-    if current_user.rol != "Administrador" and current_user.organizacion_id:
-        cedis_query = cedis_query.filter(CEDIS.organizacion_id == current_user.organizacion_id)
+    cedis_query = alcance.filtrar(cedis_query, CEDIS)
     total_cedis = cedis_query.count()
     
     # Total eventos
     eventos_query = db.query(EventoSeguridad)
-    if current_user.rol != "Administrador" and current_user.organizacion_id:
-        eventos_query = eventos_query.filter(EventoSeguridad.organizacion_id == current_user.organizacion_id)
+    eventos_query = alcance.filtrar(eventos_query, EventoSeguridad)
     total_eventos = eventos_query.count()
     
     # Total gastos (mes actual)
     inicio_mes = datetime.now().replace(day=1)
     gastos_query = db.query(Gasto).filter(Gasto.fecha >= inicio_mes.date())
-    if current_user.rol != "Administrador" and current_user.organizacion_id:
-        gastos_query = gastos_query.filter(Gasto.organizacion_id == current_user.organizacion_id)
+    gastos_query = alcance.filtrar(gastos_query, Gasto)
     total_gastos = gastos_query.with_entities(func.sum(Gasto.monto_total)).scalar() or Decimal(0)
     
     # Alertas activas (vencimientos próximos)
     fecha_limite = (datetime.now() + timedelta(days=30)).date()
-    alertas_query = db.query(PIPC).filter(
+    alertas_query = alcance.filtrar(db.query(PIPC), PIPC).filter(
         PIPC.fecha_vencimiento <= fecha_limite,
         PIPC.fecha_vencimiento >= datetime.now().date()
     )
@@ -59,30 +55,20 @@ def get_dashboard_stats(
 
 @router.get("/mapa")
 def get_mapa_cedis(
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
 ):
     """Obtener CEDIS para mapa con coordenadas"""
     
-    cedis_query = db.query(CEDIS, Estado.nombre.label('estado_nombre')).join(Estado)
+    cedis_query = db.query(CEDIS, Estado.nombre.label('estado_nombre'), CumplimientoCEDIS.score).join(Estado)
+    cedis_query = cedis_query.outerjoin(CumplimientoCEDIS, CumplimientoCEDIS.cedis_id == CEDIS.id)
     
-    if current_user.rol != "Administrador" and current_user.organizacion_id:
-        cedis_query = cedis_query.filter(CEDIS.organizacion_id == current_user.organizacion_id)
+    cedis_query = alcance.filtrar(cedis_query, CEDIS)
     
     cedis_list = cedis_query.all()
     
     resultado = []
-    for cedis, estado_nombre in cedis_list:
-        # Calcular compliance score
-        extintor = db.query(Extintor).filter(Extintor.cedis_id == cedis.id).first()
-        pipc = db.query(PIPC).filter(PIPC.cedis_id == cedis.id).first()
-        
-        score = 0
-        if extintor and extintor.cumple:
-            score += 50
-        if pipc and pipc.fecha_vencimiento and pipc.fecha_vencimiento >= datetime.now().date():
-            score += 50
-        
+    for cedis, estado_nombre, score in cedis_list:
         resultado.append({
             "id": cedis.id,
             "nombre": cedis.nombre,
@@ -90,7 +76,7 @@ def get_mapa_cedis(
             "municipio": cedis.municipio,
             "latitud": float(cedis.latitud) if cedis.latitud else None,
             "longitud": float(cedis.longitud) if cedis.longitud else None,
-            "compliance_score": score,
+            "compliance_score": score or 0,
             "personal_total": cedis.personal_total
         })
     
@@ -98,24 +84,26 @@ def get_mapa_cedis(
 
 @router.get("/tendencias")
 def get_tendencias(
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
 ):
     """Obtener tendencias de eventos y gastos por mes"""
     
     # Eventos por mes (últimos 6 meses)
     seis_meses_atras = datetime.now() - timedelta(days=180)
     
+    # Columnas generadas de calendario (incluidas en los índices por fecha)
+    año_evento = EventoSeguridad.fecha_anio
+    mes_evento = EventoSeguridad.fecha_mes
     eventos_query = db.query(
-        func.extract('year', EventoSeguridad.fecha).label('año'),
-        func.extract('month', EventoSeguridad.fecha).label('mes'),
+        año_evento,
+        mes_evento,
         func.count(EventoSeguridad.id).label('count')
     ).filter(EventoSeguridad.fecha >= seis_meses_atras)
     
-    if current_user.rol != "Administrador" and current_user.organizacion_id:
-        eventos_query = eventos_query.filter(EventoSeguridad.organizacion_id == current_user.organizacion_id)
+    eventos_query = alcance.filtrar(eventos_query, EventoSeguridad)
     
-    eventos_por_mes = eventos_query.group_by('año', 'mes').order_by('año', 'mes').all()
+    eventos_por_mes = eventos_query.group_by(año_evento, mes_evento).order_by(año_evento, mes_evento).all()
     
     # Gastos por mes (últimos 6 meses)
     gastos_query = db.query(
@@ -124,8 +112,7 @@ def get_tendencias(
         func.sum(Gasto.monto_total).label('total')
     ).filter(Gasto.fecha >= seis_meses_atras.date())
     
-    if current_user.rol != "Administrador" and current_user.organizacion_id:
-        gastos_query = gastos_query.filter(Gasto.organizacion_id == current_user.organizacion_id)
+    gastos_query = alcance.filtrar(gastos_query, Gasto)
     
     gastos_por_mes = gastos_query.group_by('año', 'mes').order_by('año', 'mes').all()
     
@@ -143,14 +130,12 @@ def get_tendencias(
 @router.get("/resumen-cedis/{cedis_id}")
 def get_resumen_cedis(
     cedis_id: int,
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
 ):
     """Obtener resumen completo de un CEDIS"""
     
-    cedis = db.query(CEDIS).filter(CEDIS.id == cedis_id).first()
-    if not cedis:
-        return {"error": "CEDIS no encontrado"}
+    cedis = alcance.verificar_cedis(db, cedis_id)
     
     # Eventos del CEDIS
     total_eventos = db.query(EventoSeguridad).filter(EventoSeguridad.cedis_id == cedis_id).count()
@@ -165,6 +150,7 @@ def get_resumen_cedis(
     # Protección Civil
     extintor = db.query(Extintor).filter(Extintor.cedis_id == cedis_id).first()
     pipc = db.query(PIPC).filter(PIPC.cedis_id == cedis_id).first()
+    cumplimiento = db.get(CumplimientoCEDIS, cedis_id)
     
     return {
         "cedis": {
@@ -181,6 +167,7 @@ def get_resumen_cedis(
         "proteccion_civil": {
             "extintores_cumple": extintor.cumple if extintor else False,
             "pipc_estatus": pipc.estatus if pipc else "Pendiente",
-            "pipc_vencimiento": pipc.fecha_vencimiento if pipc else None
+            "pipc_vencimiento": pipc.fecha_vencimiento if pipc else None,
+            "compliance_score": cumplimiento.score if cumplimiento else 0
         }
     }
@@ -4,18 +4,30 @@ Router de Eventos de Seguridad
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from sqlalchemy import func
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 
+from app.core.alcance import Alcance, alcance_de, get_alcance
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.replicas import get_db_lectura
 from app.core.security import get_current_user
 from app.models import EventoSeguridad, CEDIS
 from app.models.usuario import Usuario
 from app.schemas import EventoCreate, EventoResponse
+from app.services.anomalias import DIAS_REPORTE, detector_anomalias
+from app.services.idempotencia import clave_idempotencia, guardar_respuesta, reclamar
 
 router = APIRouter()
 
+# Nombres fijos (no dependen del locale del servidor)
+MESES = [
+    "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
+    "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"
+]
+DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
 @router.get("/", response_model=List[EventoResponse])
 def get_eventos(
     skip: int = 0,
@@ -24,16 +36,13 @@ def get_eventos(
     tipo_evento: Optional[str] = None,
     fecha_inicio: Optional[datetime] = None,
     fecha_fin: Optional[datetime] = None,
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
 ):
     """Obtener lista de eventos"""
-    query = db.query(EventoSeguridad)
+    query = alcance.filtrar(db.query(EventoSeguridad), EventoSeguridad)
     
     # Filtros
-    if current_user.rol != "Administrador" and current_user.organizacion_id:
-        query = query.filter(EventoSeguridad.organizacion_id == current_user.organizacion_id)
-    
     if cedis_id:
         query = query.filter(EventoSeguridad.cedis_id == cedis_id)
     
@@ -53,53 +62,146 @@ def get_eventos(
 def create_evento(
     evento_data: EventoCreate,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Usuario = Depends(get_current_user),
+    idempotency_key: Optional[str] = Depends(clave_idempotencia)
 ):
-    """Crear nuevo evento"""
+    """Crear nuevo evento (con Idempotency-Key, un reintento regresa el evento original)"""
+    if idempotency_key:
+        repetida = reclamar(db, current_user.id, idempotency_key, "eventos", evento_data)
+        if repetida is not None:
+            return repetida
+    
+    alcance = alcance_de(current_user)
+    alcance.verificar_organizacion(evento_data.organizacion_id)
+    alcance.verificar_cedis(db, evento_data.cedis_id)
+    
     # Extraer fecha para campos adicionales
     fecha = evento_data.fecha
     
     db_evento = EventoSeguridad(
         **evento_data.dict(),
         usuario_registro_id=current_user.id,
-        mes=fecha.strftime("%B"),
-        dia_semana=fecha.strftime("%A"),
+        mes=MESES[fecha.month - 1],
+        dia_semana=DIAS_SEMANA[fecha.weekday()],
         hora=fecha.strftime("%H:%M")
     )
     
     db.add(db_evento)
-    db.commit()
+    db.flush()
     db.refresh(db_evento)
     
-    return db_evento
+    # La respuesta se guarda con la clave en la misma transacción
+    respuesta = EventoResponse.model_validate(db_evento)
+    if idempotency_key:
+        guardar_respuesta(db, current_user.id, idempotency_key, respuesta)
+    db.commit()
+    detector_anomalias.registrar(respuesta.cedis_id, respuesta.tipo_evento, respuesta.fecha)
+    
+    return respuesta
 
 @router.get("/stats")
 def get_eventos_stats(
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
 ):
     """Obtener estadísticas de eventos"""
-    query = db.query(EventoSeguridad)
-    
-    if current_user.rol != "Administrador" and current_user.organizacion_id:
-        query = query.filter(EventoSeguridad.organizacion_id == current_user.organizacion_id)
+    query = alcance.filtrar(db.query(EventoSeguridad), EventoSeguridad)
     
     total = query.count()
     
     # Por tipo
-    por_tipo = db.query(
+    por_tipo = alcance.filtrar(db.query(
         EventoSeguridad.tipo_evento,
         func.count(EventoSeguridad.id).label('count')
-    ).group_by(EventoSeguridad.tipo_evento).all()
+    ), EventoSeguridad).group_by(EventoSeguridad.tipo_evento).all()
     
-    # Por mes
-    por_mes = db.query(
-        extract('month', EventoSeguridad.fecha).label('mes'),
+    # Por mes (columna generada incluida en los índices por organización y CEDIS)
+    por_mes = alcance.filtrar(db.query(
+        EventoSeguridad.fecha_mes,
         func.count(EventoSeguridad.id).label('count')
-    ).group_by('mes').all()
+    ), EventoSeguridad).group_by(EventoSeguridad.fecha_mes).all()
     
     return {
         "total": total,
         "por_tipo": [{"tipo": t, "count": c} for t, c in por_tipo],
         "por_mes": [{"mes": int(m), "count": c} for m, c in por_mes]
     }
+
+@router.get("/heatmap")
+def get_heatmap(
+    cedis_id: Optional[int] = None,
+    organizacion_id: Optional[int] = None,
+    tipo_evento: Optional[str] = None,
+    dias: int = Query(90, ge=1, le=3650),
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
+):
+    """Matriz 7×24 de eventos por día de la semana (lunes a domingo) y hora
+
+    Se agrega con un Index Only Scan del índice por CEDIS u organización
+    sobre el rango de fechas (las columnas de calendario están incluidas).
+    """
+    if cedis_id:
+        alcance.verificar_cedis(db, cedis_id)
+    if organizacion_id:
+        alcance.verificar_organizacion(organizacion_id)
+    
+    desde = datetime.now() - timedelta(days=dias)
+    query = alcance.filtrar(db.query(
+        EventoSeguridad.fecha_dia_semana,
+        EventoSeguridad.fecha_hora,
+        func.count()
+    ), EventoSeguridad).filter(EventoSeguridad.fecha >= desde)
+    
+    if cedis_id:
+        query = query.filter(EventoSeguridad.cedis_id == cedis_id)
+    if organizacion_id:
+        query = query.filter(EventoSeguridad.organizacion_id == organizacion_id)
+    if tipo_evento:
+        query = query.filter(EventoSeguridad.tipo_evento == tipo_evento)
+    
+    matriz = [[0] * 24 for _ in DIAS_SEMANA]
+    for dia, hora, total in query.group_by(EventoSeguridad.fecha_dia_semana, EventoSeguridad.fecha_hora):
+        matriz[dia - 1][hora] = total
+    
+    return {
+        "cedis_id": cedis_id,
+        "organizacion_id": organizacion_id,
+        "tipo_evento": tipo_evento,
+        "desde": desde.date(),
+        "dias": DIAS_SEMANA,
+        "horas": list(range(24)),
+        "matriz": matriz,
+        "total": sum(map(sum, matriz)),
+        "maximo": max(map(max, matriz))
+    }
+
+@router.get("/anomalias")
+def get_anomalias(
+    dias: int = Query(7, ge=1, le=DIAS_REPORTE),
+    umbral: float = Query(settings.ANOMALIAS_UMBRAL_Z, gt=0),
+    cedis_id: Optional[int] = None,
+    organizacion_id: Optional[int] = None,
+    tipo_evento: Optional[str] = None,
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
+):
+    """Días en que un CEDIS se desvía de su propia línea base por tipo de evento
+
+    `motivo` es "pico" (z robusta ≥ umbral) o "tendencia" (EWMA sobre su
+    límite de control). Más reciente primero.
+    """
+    if alcance.vacio:
+        return []
+    if cedis_id:
+        alcance.verificar_cedis(db, cedis_id)
+    
+    detector_anomalias.actualizar(db)
+    return detector_anomalias.anomalias(
+        dias=dias,
+        umbral=umbral,
+        cedis_permitidos=None if alcance.total else alcance.cedis_ids,
+        organizacion_id=organizacion_id if alcance.total else alcance.organizacion_id,
+        cedis_id=cedis_id,
+        tipo_evento=tipo_evento
+    )
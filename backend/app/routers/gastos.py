@@ -2,18 +2,30 @@
 Router de Gastos
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
 from sqlalchemy import func, extract
 from typing import List, Optional
 from datetime import date
 from decimal import Decimal
+from statistics import NormalDist
+import numpy as np
+import os
+import tempfile
 
+from app.core.alcance import Alcance, alcance_de, get_alcance
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.replicas import get_db_lectura
 from app.core.security import get_current_user
-from app.models import Gasto, CategoriaGasto, CEDIS
+from app.models import Gasto, CategoriaGasto, CEDIS, ModeloGasto
 from app.models.usuario import Usuario
 from app.schemas import GastoCreate, GastoResponse
+from app.services.idempotencia import clave_idempotencia, guardar_respuesta, reclamar
+from app.services.exportacion import exportar_gastos_xlsx
+from app.services.pronosticos import fecha_mes, numero_mes
 
 router = APIRouter()
 
@@ -25,16 +37,14 @@ def get_gastos(
     categoria_id: Optional[int] = None,
     fecha_inicio: Optional[date] = None,
     fecha_fin: Optional[date] = None,
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    estado: Optional[str] = None,
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
 ):
     """Obtener lista de gastos"""
-    query = db.query(Gasto)
+    query = alcance.filtrar(db.query(Gasto), Gasto)
     
     # Filtros
-    if current_user.rol != "Administrador" and current_user.organizacion_id:
-        query = query.filter(Gasto.organizacion_id == current_user.organizacion_id)
-    
     if cedis_id:
         query = query.filter(Gasto.cedis_id == cedis_id)
     
@@ -47,6 +57,9 @@ def get_gastos(
     if fecha_fin:
         query = query.filter(Gasto.fecha <= fecha_fin)
     
+    if estado:
+        query = query.filter(Gasto.estado == estado)
+    
     gastos = query.order_by(Gasto.fecha.desc()).offset(skip).limit(limit).all()
     return gastos
 
@@ -54,51 +67,64 @@ def get_gastos(
 def create_gasto(
     gasto_data: GastoCreate,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Usuario = Depends(get_current_user),
+    idempotency_key: Optional[str] = Depends(clave_idempotencia)
 ):
-    """Crear nuevo gasto"""
+    """Crear nuevo gasto (con Idempotency-Key, un reintento regresa el gasto original)"""
+    if idempotency_key:
+        repetida = reclamar(db, current_user.id, idempotency_key, "gastos", gasto_data)
+        if repetida is not None:
+            return repetida
+    
+    alcance = alcance_de(current_user)
+    alcance.verificar_organizacion(gasto_data.organizacion_id)
+    alcance.verificar_cedis(db, gasto_data.cedis_id)
+    
     db_gasto = Gasto(
         **gasto_data.dict(),
         usuario_registro_id=current_user.id
     )
     
     db.add(db_gasto)
-    db.commit()
+    db.flush()
     db.refresh(db_gasto)
     
-    return db_gasto
+    # La respuesta se guarda con la clave en la misma transacción
+    respuesta = GastoResponse.model_validate(db_gasto)
+    if idempotency_key:
+        guardar_respuesta(db, current_user.id, idempotency_key, respuesta)
+    db.commit()
+    
+    return respuesta
 
 @router.get("/stats")
 def get_gastos_stats(
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
 ):
     """Obtener estadísticas de gastos"""
-    query = db.query(Gasto)
-    
-    if current_user.rol != "Administrador" and current_user.organizacion_id:
-        query = query.filter(Gasto.organizacion_id == current_user.organizacion_id)
+    query = alcance.filtrar(db.query(Gasto), Gasto)
     
     # Total
     total = query.with_entities(func.sum(Gasto.monto_total)).scalar() or Decimal(0)
     
     # Por categoría
-    por_categoria = db.query(
+    por_categoria = alcance.filtrar(db.query(
         CategoriaGasto.nombre,
         func.sum(Gasto.monto_total).label('total')
-    ).join(Gasto).group_by(CategoriaGasto.nombre).all()
+    ).join(Gasto), Gasto).group_by(CategoriaGasto.nombre).all()
     
     # Por CEDIS
-    por_cedis = db.query(
+    por_cedis = alcance.filtrar(db.query(
         CEDIS.nombre,
         func.sum(Gasto.monto_total).label('total')
-    ).join(Gasto).group_by(CEDIS.nombre).order_by(func.sum(Gasto.monto_total).desc()).limit(10).all()
+    ).join(Gasto), Gasto).group_by(CEDIS.nombre).order_by(func.sum(Gasto.monto_total).desc()).limit(10).all()
     
     # Por mes
-    por_mes = db.query(
+    por_mes = alcance.filtrar(db.query(
         extract('month', Gasto.fecha).label('mes'),
         func.sum(Gasto.monto_total).label('total')
-    ).group_by('mes').all()
+    ), Gasto).group_by('mes').all()
     
     return {
         "total": float(total),
@@ -107,8 +133,99 @@ def get_gastos_stats(
         "por_mes": [{"mes": int(m), "total": float(t)} for m, t in por_mes]
     }
 
+@router.get("/forecast")
+def get_forecast(
+    meses: int = Query(6, ge=1, le=settings.GASTOS_PRONOSTICO_HORIZONTE),
+    nivel: float = Query(0.95, gt=0.5, lt=1),
+    cedis_id: Optional[int] = None,
+    categoria_id: Optional[int] = None,
+    organizacion_id: Optional[int] = None,
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
+):
+    """Pronóstico mensual de gastos con banda de confianza
+
+    Suma los pronósticos de las series (CEDIS × categoría) que cumplen los
+    filtros; el error de la suma supone series independientes.
+    """
+    query = alcance.filtrar(db.query(ModeloGasto), ModeloGasto)
+    if cedis_id:
+        query = query.filter(ModeloGasto.cedis_id == cedis_id)
+    if categoria_id:
+        query = query.filter(ModeloGasto.categoria_id == categoria_id)
+    if organizacion_id:
+        query = query.filter(ModeloGasto.organizacion_id == organizacion_id)
+    
+    modelos = query.with_entities(
+        ModeloGasto.mes_base,
+        ModeloGasto.ajustado_en,
+        ModeloGasto.pronostico,
+        ModeloGasto.error_estandar
+    ).all()
+    if not modelos:
+        return {"mes_base": None, "ajustado_en": None, "series": 0, "nivel": nivel, "meses": []}
+    
+    pronostico = np.array([m.pronostico[:meses] for m in modelos]).sum(axis=0)
+    error = np.sqrt((np.array([m.error_estandar[:meses] for m in modelos]) ** 2).sum(axis=0))
+    z = NormalDist().inv_cdf(0.5 + nivel / 2)
+    mes_base = min(m.mes_base for m in modelos)
+    
+    return {
+        "mes_base": mes_base,
+        "ajustado_en": max(m.ajustado_en for m in modelos),
+        "series": len(modelos),
+        "nivel": nivel,
+        "meses": [
+            {
+                "mes": fecha_mes(numero_mes(mes_base) + h).strftime("%Y-%m"),
+                "pronostico": round(float(pronostico[h]), 2),
+                "inferior": round(max(float(pronostico[h] - z * error[h]), 0.0), 2),
+                "superior": round(float(pronostico[h] + z * error[h]), 2)
+            }
+            for h in range(len(pronostico))
+        ]
+    }
+
+@router.get("/exportar")
+def exportar_gastos(
+    cedis_id: Optional[int] = None,
+    categoria_id: Optional[int] = None,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    por_categoria: bool = False,
+    subtotales: bool = True,
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
+):
+    """Exportar gastos a Excel (XLSX), opcionalmente con una hoja por categoría y subtotales"""
+    descriptor, ruta = tempfile.mkstemp(suffix=".xlsx")
+    os.close(descriptor)
+    try:
+        exportar_gastos_xlsx(
+            db,
+            ruta,
+            alcance,
+            cedis_id=cedis_id,
+            categoria_id=categoria_id,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            por_categoria=por_categoria,
+            subtotales=subtotales
+        )
+    except Exception:
+        os.remove(ruta)
+        raise
+    
+    nombre = f"gastos_{fecha_inicio or 'inicio'}_{fecha_fin or date.today()}.xlsx"
+    return FileResponse(
+        ruta,
+        filename=nombre,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        background=BackgroundTask(os.remove, ruta)
+    )
+
 @router.get("/categorias", response_model=List[dict])
-def get_categorias(db: Session = Depends(get_db)):
+def get_categorias(db: Session = Depends(get_db_lectura)):
     """Obtener categorías de gasto"""
     categorias = db.query(CategoriaGasto).filter(CategoriaGasto.activo == True).all()
     return [{"id": c.id, "nombre": c.nombre, "color": c.color} for c in categorias]
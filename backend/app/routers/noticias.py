@@ -0,0 +1,79 @@
+"""
+Router de Noticias Monitoreadas
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.core.database import get_db
+from app.core.replicas import get_db_lectura
+from app.core.security import get_current_user
+from app.models import NoticiaMonitoreada
+from app.models.usuario import Usuario
+from app.schemas import NoticiaCreate, NoticiaResponse
+from app.services.noticias import procesar_noticia, reclasificar_noticias
+
+router = APIRouter()
+
+@router.get("/", response_model=List[NoticiaResponse])
+def get_noticias(
+    skip: int = 0,
+    limit: int = 100,
+    tipo_alerta: Optional[str] = None,
+    nivel_criticidad: Optional[str] = None,
+    incluir_duplicados: bool = False,
+    db: Session = Depends(get_db_lectura),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Obtener lista de noticias (solo canónicas por defecto)"""
+    query = db.query(NoticiaMonitoreada)
+    
+    if not incluir_duplicados:
+        query = query.filter(NoticiaMonitoreada.es_duplicado == False)
+    
+    if tipo_alerta:
+        query = query.filter(NoticiaMonitoreada.tipo_alerta == tipo_alerta)
+    
+    if nivel_criticidad:
+        query = query.filter(NoticiaMonitoreada.nivel_criticidad == nivel_criticidad)
+    
+    noticias = query.order_by(NoticiaMonitoreada.fecha_deteccion.desc()).offset(skip).limit(limit).all()
+    return noticias
+
+@router.post("/", response_model=NoticiaResponse)
+def create_noticia(
+    noticia_data: NoticiaCreate,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Registrar noticia detectada (los duplicados se ligan a la canónica)"""
+    if current_user.rol not in ["Administrador", "Supervisor"]:
+        raise HTTPException(status_code=403, detail="Sin permisos")
+    
+    return procesar_noticia(db, noticia_data)
+
+@router.post("/reclasificar")
+def reclasificar(
+    solo_pendientes: bool = True,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Reclasificar noticias con los diccionarios vigentes"""
+    if current_user.rol != "Administrador":
+        raise HTTPException(status_code=403, detail="Sin permisos")
+    
+    total = reclasificar_noticias(db, solo_pendientes)
+    return {"mensaje": "Reclasificación completada", "noticias": total}
+
+@router.get("/{noticia_id}/duplicados", response_model=List[NoticiaResponse])
+def get_duplicados(
+    noticia_id: int,
+    db: Session = Depends(get_db_lectura),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Obtener las publicaciones ligadas a una noticia canónica"""
+    duplicados = db.query(NoticiaMonitoreada).filter(
+        NoticiaMonitoreada.noticia_canonica_id == noticia_id
+    ).order_by(NoticiaMonitoreada.fecha_deteccion).all()
+    return duplicados
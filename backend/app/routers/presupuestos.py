@@ -0,0 +1,153 @@
+"""
+Router de Presupuestos (presupuesto vs. ejercido por CEDIS, categoría y mes)
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import func, literal_column
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import date
+from decimal import Decimal
+
+from app.core.alcance import Alcance, alcance_de, get_alcance
+from app.core.database import get_db
+from app.core.replicas import get_db_lectura
+from app.core.security import get_current_user
+from app.models import CategoriaGasto, CEDIS, EventoPresupuesto, GastoAcumulado, Presupuesto
+from app.models.usuario import Usuario
+from app.schemas import EventoPresupuestoResponse, PresupuestoCreate, PresupuestoResponse
+from app.services.auditoria import registrar_upsert
+
+router = APIRouter()
+
+def _mes(mes: Optional[date]) -> date:
+    return (mes or date.today()).replace(day=1)
+
+def _estado(porcentaje: Optional[float], umbrales: List[int]) -> str:
+    if porcentaje is None:
+        return "sin_presupuesto"
+    if porcentaje >= 100:
+        return "excedido"
+    if umbrales and porcentaje >= min(umbrales):
+        return "alerta"
+    return "ok"
+
+@router.post("/", response_model=PresupuestoResponse)
+def guardar_presupuesto(
+    datos: PresupuestoCreate,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Crear o reemplazar el presupuesto de una celda (mes, CEDIS, categoría)"""
+    if current_user.rol not in ["Administrador", "Supervisor"]:
+        raise HTTPException(status_code=403, detail="Sin permisos")
+    if datos.monto < 0 or any(not 0 < u <= 1000 for u in datos.umbrales):
+        raise HTTPException(status_code=422, detail="Monto negativo o umbral fuera de 1-1000%")
+
+    cedis = alcance_de(current_user).verificar_cedis(db, datos.cedis_id)
+    if not db.query(CategoriaGasto.id).filter(CategoriaGasto.id == datos.categoria_id).first():
+        raise HTTPException(status_code=404, detail="Categoría no encontrada")
+    valores = {
+        **datos.dict(),
+        "mes": _mes(datos.mes),
+        "umbrales": sorted(set(datos.umbrales)),
+        "organizacion_id": cedis.organizacion_id,
+        "usuario_id": current_user.id
+    }
+
+    # El trigger de presupuestos registra los umbrales que el ejercido ya alcanzó
+    sentencia = insert(Presupuesto).values(**valores)
+    sentencia = sentencia.on_conflict_do_update(
+        index_elements=[Presupuesto.mes, Presupuesto.cedis_id, Presupuesto.categoria_id],
+        set_={campo: sentencia.excluded[campo] for campo in ("monto", "umbrales", "notas", "usuario_id")}
+        | {"updated_at": func.now()}
+    ).returning(Presupuesto, literal_column("xmax = 0"))
+    presupuesto, insertado = db.execute(sentencia, execution_options={"populate_existing": True}).one()
+    registrar_upsert(db, [(presupuesto, insertado)])
+    respuesta = PresupuestoResponse.model_validate(presupuesto)
+    db.commit()
+
+    return respuesta
+
+@router.get("/estado")
+def get_estado(
+    mes: Optional[date] = None,
+    cedis_id: Optional[int] = None,
+    categoria_id: Optional[int] = None,
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
+):
+    """Presupuesto vs. ejercido del mes por celda
+
+    Lee las filas de presupuestos y de gastos_acumulados del mes (llave
+    primaria), sin sumar gastos. Las celdas con gasto y sin presupuesto
+    aparecen con estado "sin_presupuesto".
+    """
+    mes = _mes(mes)
+
+    presupuestos = alcance.filtrar(db.query(Presupuesto), Presupuesto).filter(Presupuesto.mes == mes)
+    acumulados = alcance.filtrar(db.query(GastoAcumulado), GastoAcumulado).filter(GastoAcumulado.mes == mes)
+    if cedis_id:
+        presupuestos = presupuestos.filter(Presupuesto.cedis_id == cedis_id)
+        acumulados = acumulados.filter(GastoAcumulado.cedis_id == cedis_id)
+    if categoria_id:
+        presupuestos = presupuestos.filter(Presupuesto.categoria_id == categoria_id)
+        acumulados = acumulados.filter(GastoAcumulado.categoria_id == categoria_id)
+
+    por_celda = {(p.cedis_id, p.categoria_id): p for p in presupuestos}
+    ejercido = {(a.cedis_id, a.categoria_id): a for a in acumulados}
+    celdas_ids = por_celda.keys() | {celda for celda, a in ejercido.items() if a.gastos}
+
+    cedis_ids = {c for c, _ in celdas_ids}
+    nombres_cedis = dict(db.query(CEDIS.id, CEDIS.nombre).filter(CEDIS.id.in_(cedis_ids))) if cedis_ids else {}
+    nombres_categorias = dict(db.query(CategoriaGasto.id, CategoriaGasto.nombre))
+
+    celdas = []
+    for celda in celdas_ids:
+        presupuesto, acumulado = por_celda.get(celda), ejercido.get(celda)
+        total = acumulado.total if acumulado else Decimal(0)
+        porcentaje = float(total / presupuesto.monto * 100) if presupuesto and presupuesto.monto else None
+        celdas.append({
+            "presupuesto_id": presupuesto.id if presupuesto else None,
+            "cedis_id": celda[0],
+            "cedis": nombres_cedis.get(celda[0]),
+            "categoria_id": celda[1],
+            "categoria": nombres_categorias.get(celda[1]),
+            "presupuesto": float(presupuesto.monto) if presupuesto else None,
+            "ejercido": float(total),
+            "gastos": acumulado.gastos if acumulado else 0,
+            "disponible": float(presupuesto.monto - total) if presupuesto else None,
+            "porcentaje": round(porcentaje, 1) if porcentaje is not None else None,
+            "estado": _estado(porcentaje, presupuesto.umbrales if presupuesto else [])
+        })
+    celdas.sort(key=lambda c: (c["porcentaje"] is None, -(c["porcentaje"] or 0), c["cedis_id"], c["categoria_id"]))
+
+    presupuestado = sum(c["presupuesto"] for c in celdas if c["presupuesto"] is not None)
+    ejercido_presupuestado = sum(c["ejercido"] for c in celdas if c["presupuesto"] is not None)
+    return {
+        "mes": mes,
+        "presupuesto": presupuestado,
+        "ejercido": ejercido_presupuestado,
+        "porcentaje": round(ejercido_presupuestado / presupuestado * 100, 1) if presupuestado else None,
+        "sin_presupuesto": sum(c["ejercido"] for c in celdas if c["presupuesto"] is None),
+        "excedidos": sum(1 for c in celdas if c["estado"] == "excedido"),
+        "celdas": celdas
+    }
+
+@router.get("/eventos", response_model=List[EventoPresupuestoResponse])
+def get_eventos_presupuesto(
+    mes: Optional[date] = None,
+    cedis_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
+):
+    """Umbrales de presupuesto alcanzados, más recientes primero"""
+    query = alcance.filtrar(db.query(EventoPresupuesto), EventoPresupuesto)
+    if mes:
+        query = query.filter(EventoPresupuesto.mes == _mes(mes))
+    if cedis_id:
+        query = query.filter(EventoPresupuesto.cedis_id == cedis_id)
+
+    return query.order_by(EventoPresupuesto.created_at.desc(), EventoPresupuesto.id.desc()).limit(limit).all()
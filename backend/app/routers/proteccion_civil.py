@@ -2,146 +2,307 @@
 Router de Protección Civil
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import Date, Integer, cast, func, literal_column
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import date, timedelta
 
+from app.core.alcance import Alcance, get_alcance
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.replicas import get_db_lectura
 from app.core.security import get_current_user
-from app.models import Extintor, PIPC, Dictamen, CEDIS
+from app.models import Extintor, PIPC, CEDIS, CumplimientoCEDIS, CumplimientoHistorico, Dictamen
 from app.models.usuario import Usuario
-from app.schemas import ExtintorCreate, ExtintorResponse, PIPCCreate, PIPCResponse
+from app.schemas import (
+    DictamenCreate, DictamenResponse, ExtintorCreate, ExtintorResponse, PIPCCreate, PIPCResponse, PesosCumplimiento
+)
+from app.services.alertas_vencimiento import ejecutar_ciclo
+from app.services.auditoria import registrar_upsert
+from app.services.cumplimiento import guardar_pesos, obtener_pesos
 
 router = APIRouter()
 
 @router.get("/extintores", response_model=List[ExtintorResponse])
 def get_extintores(
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
 ):
     """Obtener lista de extintores por CEDIS"""
-    query = db.query(Extintor)
+    query = alcance.filtrar(db.query(Extintor), Extintor)
     extintores = query.all()
     return extintores
 
 @router.get("/extintores/{cedis_id}", response_model=ExtintorResponse)
 def get_extintor_cedis(
     cedis_id: int,
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
 ):
     """Obtener extintores de un CEDIS"""
+    alcance.verificar_cedis(db, cedis_id)
     extintor = db.query(Extintor).filter(Extintor.cedis_id == cedis_id).first()
     if not extintor:
         raise HTTPException(status_code=404, detail="No se encontraron extintores para este CEDIS")
     return extintor
 
+# Filas por sentencia: ~10 columnas por fila quedan lejos del límite de
+# 65535 parámetros de PostgreSQL
+FILAS_POR_SENTENCIA = 1000
+
+def _upsert(db: Session, alcance: Alcance, modelo, registros: List[dict], llave: List[str]) -> list:
+    """INSERT ... ON CONFLICT (llave) DO UPDATE de los registros en sentencias de FILAS_POR_SENTENCIA
+
+    Valida el alcance de todos los CEDIS con una consulta y rechaza cargas
+    vacías, mayores a PROTECCION_CIVIL_LOTE_MAX o con llaves repetidas (un
+    upsert no puede tocar dos veces la misma fila). Los triggers de
+    cumplimiento recalculan los CEDIS afectados una vez por sentencia y las
+    filas de RETURNING se registran en la auditoría. Regresa las filas
+    resultantes ordenadas por llave.
+    """
+    if not registros:
+        raise HTTPException(status_code=422, detail="La carga está vacía")
+    if len(registros) > settings.PROTECCION_CIVIL_LOTE_MAX:
+        raise HTTPException(status_code=422, detail=f"Máximo {settings.PROTECCION_CIVIL_LOTE_MAX} registros por carga")
+    llaves = [tuple(registro[campo] for campo in llave) for registro in registros]
+    if len(set(llaves)) != len(llaves):
+        raise HTTPException(status_code=422, detail=f"Registros repetidos por {', '.join(llave)}")
+    alcance.verificar_cedis_ids(db, {registro["cedis_id"] for registro in registros})
+
+    filas = []
+    for inicio in range(0, len(registros), FILAS_POR_SENTENCIA):
+        sentencia = insert(modelo).values(registros[inicio:inicio + FILAS_POR_SENTENCIA])
+        sentencia = sentencia.on_conflict_do_update(
+            index_elements=llave,
+            set_={campo: sentencia.excluded[campo] for campo in registros[0] if campo not in llave}
+            | {"updated_at": func.now()}
+        ).returning(modelo, literal_column("xmax = 0"))
+        filas.extend(db.execute(sentencia, execution_options={"populate_existing": True}).tuples())
+    registrar_upsert(db, filas)
+    return sorted((fila for fila, _ in filas), key=lambda fila: tuple(getattr(fila, campo) for campo in llave))
+
+def _valores_extintor(extintor_data: ExtintorCreate) -> dict:
+    valores = extintor_data.dict()
+    valores["total_extintores"] = valores["extintores_pqs"] + valores["extintores_co2"]
+    valores["cumple"] = valores["total_extintores"] >= valores["extintores_requeridos"]
+    return valores
+
 @router.post("/extintores", response_model=ExtintorResponse)
 def create_extintor(
     extintor_data: ExtintorCreate,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    alcance: Alcance = Depends(get_alcance)
 ):
     """Crear/actualizar registro de extintores"""
-    # Verificar si ya existe
-    existing = db.query(Extintor).filter(Extintor.cedis_id == extintor_data.cedis_id).first()
-    
-    if existing:
-        # Actualizar
-        for key, value in extintor_data.dict().items():
-            setattr(existing, key, value)
-        existing.total_extintores = existing.extintores_pqs + existing.extintores_co2
-        existing.cumple = existing.total_extintores >= existing.extintores_requeridos
-        db.commit()
-        db.refresh(existing)
-        return existing
-    else:
-        # Crear
-        db_extintor = Extintor(**extintor_data.dict())
-        db_extintor.total_extintores = db_extintor.extintores_pqs + db_extintor.extintores_co2
-        db_extintor.cumple = db_extintor.total_extintores >= db_extintor.extintores_requeridos
-        db.add(db_extintor)
-        db.commit()
-        db.refresh(db_extintor)
-        return db_extintor
+    return guardar_extintores([extintor_data], db, alcance)[0]
+
+@router.post("/extintores/lote", response_model=List[ExtintorResponse])
+def guardar_extintores(
+    extintores: List[ExtintorCreate],
+    db: Session = Depends(get_db),
+    alcance: Alcance = Depends(get_alcance)
+):
+    """Crear/actualizar los extintores de varios CEDIS (uno por CEDIS)"""
+    filas = _upsert(db, alcance, Extintor, [_valores_extintor(e) for e in extintores], ["cedis_id"])
+    respuesta = [ExtintorResponse.model_validate(fila) for fila in filas]
+    db.commit()
+    return respuesta
 
 @router.get("/pipc", response_model=List[PIPCResponse])
 def get_pipcs(
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
 ):
     """Obtener lista de PIPC"""
-    pipcs = db.query(PIPC).all()
+    pipcs = alcance.filtrar(db.query(PIPC), PIPC).all()
     return pipcs
 
 @router.post("/pipc", response_model=PIPCResponse)
 def create_pipc(
     pipc_data: PIPCCreate,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    alcance: Alcance = Depends(get_alcance)
 ):
     """Crear/actualizar PIPC"""
-    existing = db.query(PIPC).filter(PIPC.cedis_id == pipc_data.cedis_id).first()
-    
-    if existing:
-        for key, value in pipc_data.dict().items():
-            setattr(existing, key, value)
-        db.commit()
-        db.refresh(existing)
-        return existing
-    else:
-        db_pipc = PIPC(**pipc_data.dict())
-        db.add(db_pipc)
-        db.commit()
-        db.refresh(db_pipc)
-        return db_pipc
+    return guardar_pipcs([pipc_data], db, alcance)[0]
+
+@router.post("/pipc/lote", response_model=List[PIPCResponse])
+def guardar_pipcs(
+    pipcs: List[PIPCCreate],
+    db: Session = Depends(get_db),
+    alcance: Alcance = Depends(get_alcance)
+):
+    """Crear/actualizar el PIPC de varios CEDIS (uno por CEDIS)"""
+    filas = _upsert(db, alcance, PIPC, [p.dict() for p in pipcs], ["cedis_id"])
+    respuesta = [PIPCResponse.model_validate(fila) for fila in filas]
+    db.commit()
+    return respuesta
+
+@router.get("/dictamenes", response_model=List[DictamenResponse])
+def get_dictamenes(
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
+):
+    """Obtener lista de dictámenes (estructural y eléctrico) por CEDIS"""
+    return alcance.filtrar(db.query(Dictamen), Dictamen).order_by(Dictamen.cedis_id, Dictamen.tipo).all()
+
+@router.post("/dictamenes/lote", response_model=List[DictamenResponse])
+def guardar_dictamenes(
+    dictamenes: List[DictamenCreate],
+    db: Session = Depends(get_db),
+    alcance: Alcance = Depends(get_alcance)
+):
+    """Crear/actualizar dictámenes de varios CEDIS (uno por CEDIS y tipo)"""
+    filas = _upsert(db, alcance, Dictamen, [d.dict() for d in dictamenes], ["cedis_id", "tipo"])
+    respuesta = [DictamenResponse.model_validate(fila) for fila in filas]
+    db.commit()
+    return respuesta
 
 @router.get("/compliance")
 def get_compliance_summary(
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
+):
+    """Obtener resumen de compliance por CEDIS (score persistido en cumplimiento_cedis)"""
+    filas = alcance.filtrar(
+        db.query(CEDIS.id, CEDIS.nombre, CumplimientoCEDIS)
+        .outerjoin(CumplimientoCEDIS, CumplimientoCEDIS.cedis_id == CEDIS.id),
+        CEDIS
+    ).order_by(CEDIS.id).all()
+    
+    return [
+        {
+            "cedis_id": cedis_id,
+            "cedis_nombre": nombre,
+            "extintores_cumple": bool(k and k.extintores_cumple),
+            "pipc_vigente": bool(k and k.pipc_vigente),
+            "dictamen_estructural": bool(k and k.dictamen_estructural),
+            "dictamen_electrico": bool(k and k.dictamen_electrico),
+            "compliance_score": k.score if k else 0,
+            "proximo_vencimiento": k.proximo_vencimiento if k else None
+        }
+        for cedis_id, nombre, k in filas
+    ]
+
+@router.get("/cumplimiento/pesos", response_model=PesosCumplimiento)
+def get_pesos_cumplimiento(
+    db: Session = Depends(get_db_lectura),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Pesos de cada requisito en el score de cumplimiento"""
+    return obtener_pesos(db)
+
+@router.put("/cumplimiento/pesos", response_model=PesosCumplimiento)
+def put_pesos_cumplimiento(
+    pesos: PesosCumplimiento,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
-    """Obtener resumen de compliance por CEDIS"""
-    # Obtener todos los CEDIS
-    cedis_list = db.query(CEDIS).all()
+    """Cambiar los pesos y recalcular el score de todos los CEDIS"""
+    if current_user.rol != "Administrador":
+        raise HTTPException(status_code=403, detail="Sin permisos")
+    valores = pesos.dict()
+    if any(v < 0 for v in valores.values()) or not sum(valores.values()):
+        raise HTTPException(status_code=422, detail="Los pesos deben ser no negativos y sumar más de 0")
+    
+    guardar_pesos(db, valores)
+    db.commit()
+    return valores
+
+def _historico(db: Session, alcance: Alcance, desde: Optional[date], hasta: Optional[date],
+               cedis_id: Optional[int], organizacion_id: Optional[int], *columnas):
+    """Consulta sobre cumplimiento_historico con rango de fechas, alcance y filtros"""
+    hasta = hasta or date.today()
+    desde = desde or hasta - timedelta(days=365)
+    query = alcance.filtrar(db.query(*columnas), CumplimientoHistorico).filter(
+        CumplimientoHistorico.fecha >= desde,
+        CumplimientoHistorico.fecha <= hasta
+    )
+    if cedis_id:
+        alcance.verificar_cedis(db, cedis_id)
+        query = query.filter(CumplimientoHistorico.cedis_id == cedis_id)
+    if organizacion_id:
+        query = query.filter(CumplimientoHistorico.organizacion_id == organizacion_id)
+    return query
+
+@router.get("/cumplimiento/tendencia")
+def get_tendencia_cumplimiento(
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    cedis_id: Optional[int] = None,
+    organizacion_id: Optional[int] = None,
+    agrupar: str = Query("dia", pattern="^(dia|semana|mes)$"),
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
+):
+    """Score promedio y proporción de CEDIS que cumplen cada requisito por periodo
+
+    Lee solo las fotos diarias (por defecto los últimos 365 días).
+    """
+    h = CumplimientoHistorico
+    periodo = h.fecha if agrupar == "dia" else cast(func.date_trunc("week" if agrupar == "semana" else "month", h.fecha), Date)
+    filas = _historico(
+        db, alcance, desde, hasta, cedis_id, organizacion_id,
+        periodo.label("periodo"),
+        func.avg(h.score),
+        func.count(func.distinct(h.cedis_id)),
+        *(func.avg(cast(columna, Integer)) for columna in (
+            h.extintores_cumple, h.pipc_vigente, h.dictamen_estructural, h.dictamen_electrico
+        ))
+    ).group_by("periodo").order_by("periodo").all()
     
-    resultado = []
-    for cedis in cedis_list:
-        # Extintores
-        extintor = db.query(Extintor).filter(Extintor.cedis_id == cedis.id).first()
-        extintores_ok = extintor.cumple if extintor else False
-        
-        # PIPC
-        pipc = db.query(PIPC).filter(PIPC.cedis_id == cedis.id).first()
-        pipc_vigente = False
-        if pipc and pipc.fecha_vencimiento:
-            from datetime import date
-            pipc_vigente = pipc.fecha_vencimiento >= date.today()
-        
-        # Dictámenes
-        dictamenes = db.query(Dictamen).filter(Dictamen.cedis_id == cedis.id).all()
-        dictamen_estructural = any(d.tipo == "Estructural" and d.estatus == "Vigente" for d in dictamenes)
-        dictamen_electrico = any(d.tipo == "Eléctrico" and d.estatus == "Vigente" for d in dictamenes)
-        
-        # Score de compliance (0-100)
-        score = 0
-        if extintores_ok:
-            score += 25
-        if pipc_vigente:
-            score += 25
-        if dictamen_estructural:
-            score += 25
-        if dictamen_electrico:
-            score += 25
-        
-        resultado.append({
-            "cedis_id": cedis.id,
-            "cedis_nombre": cedis.nombre,
-            "extintores_cumple": extintores_ok,
-            "pipc_vigente": pipc_vigente,
-            "dictamen_estructural": dictamen_estructural,
-            "dictamen_electrico": dictamen_electrico,
-            "compliance_score": score
-        })
+    return [
+        {
+            "periodo": periodo_,
+            "score_promedio": round(float(score), 1),
+            "cedis": total,
+            "extintores_cumple": round(float(extintores), 3),
+            "pipc_vigente": round(float(pipc), 3),
+            "dictamen_estructural": round(float(estructural), 3),
+            "dictamen_electrico": round(float(electrico), 3)
+        }
+        for periodo_, score, total, extintores, pipc, estructural, electrico in filas
+    ]
+
+@router.get("/cumplimiento/historico")
+def get_historico_cumplimiento(
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    cedis_id: Optional[int] = None,
+    organizacion_id: Optional[int] = None,
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
+):
+    """Serie diaria por CEDIS en arreglos paralelos (fechas, score y requisitos en 0/1)"""
+    h = CumplimientoHistorico
+    filas = _historico(
+        db, alcance, desde, hasta, cedis_id, organizacion_id,
+        h.cedis_id, h.fecha, h.score, h.extintores_cumple, h.pipc_vigente, h.dictamen_estructural, h.dictamen_electrico
+    ).order_by(h.fecha, h.cedis_id).all()
+    
+    series = {}
+    for fila in filas:
+        serie = series.get(fila.cedis_id)
+        if serie is None:
+            serie = series[fila.cedis_id] = {
+                "cedis_id": fila.cedis_id, "fechas": [], "score": [], "extintores_cumple": [],
+                "pipc_vigente": [], "dictamen_estructural": [], "dictamen_electrico": []
+            }
+        serie["fechas"].append(fila.fecha)
+        serie["score"].append(fila.score)
+        for requisito in ("extintores_cumple", "pipc_vigente", "dictamen_estructural", "dictamen_electrico"):
+            serie[requisito].append(int(getattr(fila, requisito)))
+    
+    return sorted(series.values(), key=lambda serie: serie["cedis_id"])
+
+@router.post("/alertas-vencimiento/ejecutar")
+async def ejecutar_alertas_vencimiento(
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Ejecutar un ciclo de alertas de vencimiento (normalmente corre en segundo plano)"""
+    if current_user.rol != "Administrador":
+        raise HTTPException(status_code=403, detail="Sin permisos")
     
-    return resultado
+    return await ejecutar_ciclo()
@@ -0,0 +1,139 @@
+"""
+Router de Reportes
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from typing import List, Optional
+import os
+
+from app.core.alcance import Alcance, alcance_de, get_alcance
+from app.core.database import get_db
+from app.core.security import get_current_user
+from app.models import Organizacion, ReporteGenerado
+from app.models.usuario import Usuario
+from app.schemas import ReporteSolicitud, ReporteResponse
+from app.services.reportes import (
+    FORMATOS,
+    TIPOS_REPORTE,
+    ColaReportesLlena,
+    cola_reportes,
+    ruta_reporte,
+    titulo_reporte
+)
+
+router = APIRouter()
+
+def _obtener_reporte(db: Session, reporte_id: int, alcance: Alcance) -> ReporteGenerado:
+    """Reporte dentro del alcance del usuario (404 si no existe o no es visible)"""
+    reporte = alcance.filtrar(db.query(ReporteGenerado), ReporteGenerado).filter(
+        ReporteGenerado.id == reporte_id
+    ).first()
+    if not reporte:
+        raise HTTPException(status_code=404, detail="Reporte no encontrado")
+    return reporte
+
+@router.post("/", response_model=ReporteResponse, status_code=202)
+def solicitar_reporte(
+    solicitud: ReporteSolicitud,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Solicitar un reporte; se genera en segundo plano (consultar el estado con GET /{id})"""
+    if solicitud.tipo_reporte not in TIPOS_REPORTE:
+        raise HTTPException(status_code=400, detail=f"Tipo de reporte inválido: {', '.join(TIPOS_REPORTE)}")
+    if solicitud.formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: {', '.join(FORMATOS)}")
+    if not 1 <= solicitud.mes <= 12:
+        raise HTTPException(status_code=400, detail="Mes inválido")
+    
+    alcance = alcance_de(current_user)
+    
+    if solicitud.tipo_reporte == "Ejecutivo CEDIS":
+        if not solicitud.cedis_id:
+            raise HTTPException(status_code=400, detail="cedis_id requerido")
+        cedis = alcance.verificar_cedis(db, solicitud.cedis_id)
+        organizacion_id, cedis_id, nombre = cedis.organizacion_id, cedis.id, cedis.nombre
+    else:
+        # Un usuario limitado a ciertos CEDIS no puede pedir el reporte de toda la organización
+        if not alcance.total and alcance.cedis_ids is not None:
+            raise HTTPException(status_code=403, detail="Sin permisos")
+        organizacion_id = alcance.organizacion_id
+        if alcance.total and solicitud.organizacion_id:
+            organizacion_id = solicitud.organizacion_id
+        organizacion = db.query(Organizacion).filter(Organizacion.id == organizacion_id).first()
+        if not organizacion:
+            raise HTTPException(status_code=404, detail="Organización no encontrada")
+        cedis_id, nombre = None, organizacion.nombre
+    
+    try:
+        reporte, reutilizado = cola_reportes.solicitar(
+            db,
+            solicitud.tipo_reporte,
+            solicitud.formato,
+            titulo_reporte(nombre, solicitud.año, solicitud.mes),
+            solicitud.año,
+            solicitud.mes,
+            organizacion_id,
+            cedis_id,
+            current_user.id
+        )
+    except ColaReportesLlena:
+        raise HTTPException(
+            status_code=429,
+            detail="Demasiados reportes en proceso, intente más tarde",
+            headers={"Retry-After": "30"}
+        )
+    
+    if reutilizado:
+        response.headers["X-Reporte-Reutilizado"] = "true"
+    return reporte
+
+@router.get("/", response_model=List[ReporteResponse])
+def get_reportes(
+    estado: Optional[str] = None,
+    cedis_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 50,
+    db: Session = Depends(get_db),
+    alcance: Alcance = Depends(get_alcance)
+):
+    """Listar reportes generados"""
+    query = alcance.filtrar(db.query(ReporteGenerado), ReporteGenerado)
+    
+    if estado:
+        query = query.filter(ReporteGenerado.estado == estado)
+    if cedis_id:
+        query = query.filter(ReporteGenerado.cedis_id == cedis_id)
+    
+    return query.order_by(ReporteGenerado.created_at.desc()).offset(skip).limit(limit).all()
+
+@router.get("/{reporte_id}", response_model=ReporteResponse)
+def get_reporte(
+    reporte_id: int,
+    db: Session = Depends(get_db),
+    alcance: Alcance = Depends(get_alcance)
+):
+    """Estado de un reporte"""
+    reporte = _obtener_reporte(db, reporte_id, alcance)
+    return reporte
+
+@router.get("/{reporte_id}/descarga")
+def descargar_reporte(
+    reporte_id: int,
+    db: Session = Depends(get_db),
+    alcance: Alcance = Depends(get_alcance)
+):
+    """Descargar el archivo de un reporte completado"""
+    reporte = _obtener_reporte(db, reporte_id, alcance)
+    
+    if reporte.estado != "Completado":
+        raise HTTPException(status_code=409, detail=f"Reporte en estado {reporte.estado}")
+    
+    ruta = ruta_reporte(reporte)
+    if not os.path.exists(ruta):
+        raise HTTPException(status_code=410, detail="El archivo del reporte ya no está disponible")
+    
+    return FileResponse(ruta, filename=f"{reporte.titulo}.{FORMATOS[reporte.formato]}")
@@ -0,0 +1,107 @@
+"""
+Router de Riesgo Delictivo por CEDIS
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.core.alcance import Alcance, get_alcance
+from app.core.database import get_db
+from app.core.replicas import get_db_lectura
+from app.core.security import get_current_user
+from app.models import CEDIS, Estado, RiesgoDelictivoCEDIS
+from app.models.usuario import Usuario
+from app.services.riesgo import recalcular_riesgo
+
+router = APIRouter()
+
+def _serializar(riesgo: RiesgoDelictivoCEDIS) -> dict:
+    return {
+        "año": riesgo.año,
+        "mes": riesgo.mes,
+        "delitos_relevantes": riesgo.delitos_relevantes,
+        "indice_impacto": riesgo.indice_impacto,
+        "suma_3m": riesgo.suma_3m,
+        "suma_6m": riesgo.suma_6m,
+        "suma_12m": riesgo.suma_12m,
+        "suma_12m_anterior": riesgo.suma_12m_anterior,
+        "variacion_anual": float(riesgo.variacion_anual) if riesgo.variacion_anual is not None else None,
+        "variacion_mes_anual": float(riesgo.variacion_mes_anual) if riesgo.variacion_mes_anual is not None else None,
+        "nivel_riesgo": riesgo.nivel_riesgo
+    }
+
+@router.get("/")
+def get_riesgo_cedis(
+    año: Optional[int] = None,
+    mes: Optional[int] = None,
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
+):
+    """Obtener riesgo delictivo precalculado de cada CEDIS (último mes cargado por defecto)"""
+    if año is None or mes is None:
+        ultimo = db.query(RiesgoDelictivoCEDIS.año, RiesgoDelictivoCEDIS.mes).order_by(
+            RiesgoDelictivoCEDIS.año.desc(), RiesgoDelictivoCEDIS.mes.desc()
+        ).first()
+        if not ultimo:
+            return []
+        año, mes = ultimo
+    
+    query = db.query(
+        RiesgoDelictivoCEDIS,
+        CEDIS.nombre,
+        CEDIS.municipio,
+        Estado.nombre.label('estado_nombre')
+    ).join(CEDIS, CEDIS.id == RiesgoDelictivoCEDIS.cedis_id).join(Estado, Estado.id == CEDIS.estado_id).filter(
+        RiesgoDelictivoCEDIS.año == año,
+        RiesgoDelictivoCEDIS.mes == mes
+    )
+    
+    query = alcance.filtrar(query, CEDIS)
+    
+    filas = query.order_by(RiesgoDelictivoCEDIS.suma_12m.desc()).all()
+    
+    return [
+        {
+            "cedis_id": riesgo.cedis_id,
+            "cedis": nombre,
+            "estado": estado_nombre,
+            "municipio": municipio,
+            **_serializar(riesgo)
+        }
+        for riesgo, nombre, municipio, estado_nombre in filas
+    ]
+
+@router.post("/recalcular")
+def recalcular(
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Recalcular riesgo por CEDIS (después de cargar datos del SESNSP)"""
+    if current_user.rol != "Administrador":
+        raise HTTPException(status_code=403, detail="Sin permisos")
+    
+    total = recalcular_riesgo(db)
+    return {"mensaje": "Riesgo recalculado", "registros": total}
+
+@router.get("/{cedis_id}")
+def get_riesgo_historico(
+    cedis_id: int,
+    meses: int = 24,
+    db: Session = Depends(get_db_lectura),
+    alcance: Alcance = Depends(get_alcance)
+):
+    """Obtener la serie mensual de riesgo de un CEDIS (más reciente primero)"""
+    cedis = alcance.verificar_cedis(db, cedis_id)
+    
+    serie = db.query(RiesgoDelictivoCEDIS).filter(
+        RiesgoDelictivoCEDIS.cedis_id == cedis_id
+    ).order_by(
+        RiesgoDelictivoCEDIS.año.desc(), RiesgoDelictivoCEDIS.mes.desc()
+    ).limit(meses).all()
+    
+    return {
+        "cedis_id": cedis.id,
+        "cedis": cedis.nombre,
+        "serie": [_serializar(r) for r in serie]
+    }
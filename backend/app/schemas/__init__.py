@@ -3,7 +3,7 @@ Schemas de Pydantic para validación de datos
 """
 
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Literal
 from datetime import datetime, date
 from decimal import Decimal
 
@@ -18,6 +18,7 @@ class UserCreate(BaseModel):
     password: str
     rol: str = "Usuario"
     organizacion_id: Optional[int] = None
+    cedis_asignados: Optional[List[int]] = None
 
 class UserResponse(BaseModel):
     id: int
@@ -25,11 +26,22 @@ class UserResponse(BaseModel):
     email: str
     rol: str
     organizacion_id: Optional[int]
+    cedis_asignados: Optional[List[int]] = None
     activo: bool
     
     class Config:
         from_attributes = True
 
+class SesionResponse(BaseModel):
+    id: int
+    ip_address: Optional[str] = None
+    user_agent: Optional[str] = None
+    valido_hasta: datetime
+    created_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -107,6 +119,40 @@ class GastoResponse(GastoBase):
     class Config:
         from_attributes = True
 
+# ============ PRESUPUESTOS ============
+class PresupuestoBase(BaseModel):
+    mes: date  # se normaliza al primer día del mes
+    cedis_id: int
+    categoria_id: int
+    monto: Decimal
+    umbrales: List[int] = [80, 100]  # porcentaje del monto que genera un evento
+    notas: Optional[str] = None
+
+class PresupuestoCreate(PresupuestoBase):
+    pass
+
+class PresupuestoResponse(PresupuestoBase):
+    id: int
+    organizacion_id: Optional[int] = None
+    updated_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class EventoPresupuestoResponse(BaseModel):
+    id: int
+    presupuesto_id: int
+    mes: date
+    cedis_id: int
+    categoria_id: int
+    umbral: int
+    monto: Decimal
+    ejercido: Decimal
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
 # ============ PROTECCION CIVIL ============
 class ExtintorBase(BaseModel):
     cedis_id: int
@@ -148,6 +194,102 @@ class PIPCResponse(PIPCBase):
     class Config:
         from_attributes = True
 
+class DictamenBase(BaseModel):
+    cedis_id: int
+    tipo: Literal["Estructural", "Eléctrico"]
+    tiene_dictamen: bool = False
+    estatus: Optional[str] = None
+    fecha_emision: Optional[date] = None
+    fecha_vencimiento: Optional[date] = None
+    proveedor: Optional[str] = None
+    costo: Optional[Decimal] = None
+
+class DictamenCreate(DictamenBase):
+    pass
+
+class DictamenResponse(DictamenBase):
+    id: int
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+# ============ NOTICIAS ============
+class NoticiaCreate(BaseModel):
+    titulo: str
+    contenido: Optional[str] = None
+    url: Optional[str] = None
+    fuente_id: Optional[int] = None
+    fuente_nombre: Optional[str] = None
+    tipo_fuente: Optional[str] = None
+    fecha_publicacion: Optional[datetime] = None
+
+class NoticiaResponse(NoticiaCreate):
+    id: int
+    fecha_deteccion: datetime
+    tipo_alerta: Optional[str] = None
+    nivel_criticidad: Optional[str] = None
+    palabras_clave: Optional[List[str]] = None
+    confianza_clasificacion: Optional[Decimal] = None
+    es_duplicado: bool = False
+    noticia_canonica_id: Optional[int] = None
+    total_duplicados: int = 0
+    
+    class Config:
+        from_attributes = True
+
+# ============ REPORTES ============
+class ReporteSolicitud(BaseModel):
+    tipo_reporte: str = "Ejecutivo CEDIS"
+    formato: str = "XLSX"
+    año: int
+    mes: int
+    cedis_id: Optional[int] = None
+    organizacion_id: Optional[int] = None
+
+class ReporteResponse(BaseModel):
+    id: int
+    tipo_reporte: str
+    titulo: Optional[str] = None
+    organizacion_id: Optional[int] = None
+    cedis_id: Optional[int] = None
+    formato: Optional[str] = None
+    url_archivo: Optional[str] = None
+    tamaño_bytes: Optional[int] = None
+    estado: Optional[str] = None
+    error_mensaje: Optional[str] = None
+    created_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class PesosCumplimiento(BaseModel):
+    extintores: float = 25
+    pipc: float = 25
+    dictamen_estructural: float = 25
+    dictamen_electrico: float = 25
+
+# ============ AUDITORIA ============
+class AuditoriaResponse(BaseModel):
+    id: int
+    usuario_id: Optional[int] = None
+    accion: str
+    tabla_afectada: Optional[str] = None
+    registro_id: Optional[int] = None
+    datos_anteriores: Optional[dict] = None
+    datos_nuevos: Optional[dict] = None
+    ip_address: Optional[str] = None
+    user_agent: Optional[str] = None
+    timestamp: datetime
+    
+    class Config:
+        from_attributes = True
+
+class AuditoriaPagina(BaseModel):
+    items: List[AuditoriaResponse]
+    siguiente_timestamp: Optional[datetime] = None
+    siguiente_id: Optional[int] = None
+
 # ============ DASHBOARD ============
 class DashboardStats(BaseModel):
     total_cedis: int
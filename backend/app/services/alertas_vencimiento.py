@@ -0,0 +1,236 @@
+"""
+Alertas de vencimiento de Protección Civil por email
+
+Cada ciclo hace una sola consulta (rangos indexados sobre
+pipc/dictamenes.fecha_vencimiento y extintores.fecha_recarga) para obtener
+los registros próximos a vencer o vencidos que algún destinatario aún no
+ha recibido (los de `alertas.emails` y el gerente del CEDIS), arma un
+resumen por destinatario y los envía por una sola conexión SMTP con
+reintentos. Lo entregado se registra en alertas_vencimiento por
+destinatario: un resumen que falla se reintenta en el siguiente ciclo solo
+para quien no lo recibió.
+
+Para probar localmente con un servidor SMTP de prueba:
+    python -m aiosmtpd -n -l localhost:1025
+    SMTP_HOST=localhost SMTP_PORT=1025 SMTP_STARTTLS=false ...
+"""
+
+import asyncio
+from datetime import date, timedelta
+from email.message import EmailMessage
+from typing import Dict, List, Optional, Tuple
+
+import aiosmtplib
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+
+# Llave del advisory lock: solo un worker ejecuta el ciclo a la vez
+_LOCK_ALERTAS = 730_001
+
+_SQL_PENDIENTES = text("""
+    WITH pendientes AS (
+        SELECT 'PIPC' AS tipo_registro, p.id AS registro_id, p.cedis_id,
+               p.fecha_vencimiento AS vence
+        FROM pipc p
+        WHERE p.fecha_vencimiento <= :limite
+        UNION ALL
+        SELECT 'Dictamen ' || d.tipo, d.id, d.cedis_id, d.fecha_vencimiento
+        FROM dictamenes d
+        WHERE d.fecha_vencimiento <= :limite
+        UNION ALL
+        SELECT 'Recarga extintores', e.id, e.cedis_id,
+               e.fecha_recarga + CAST(:vigencia_extintores AS INTEGER)
+        FROM extintores e
+        WHERE e.fecha_recarga <= :limite_recarga
+    ), clasificados AS (
+        SELECT pendientes.*,
+               CASE WHEN vence < :hoy THEN 'Vencido' ELSE 'Próximo' END AS nivel
+        FROM pendientes
+    ), generales AS (
+        SELECT DISTINCT trim(correo) AS correo
+        FROM configuraciones, unnest(string_to_array(valor, ',')) AS correo
+        WHERE clave = 'alertas.emails' AND trim(correo) <> ''
+    )
+    SELECT c.tipo_registro, c.registro_id, c.cedis_id, c.vence, c.nivel,
+           cd.codigo, cd.nombre, d.destinatario, d.general
+    FROM clasificados c
+    JOIN cedis cd ON cd.id = c.cedis_id AND cd.activo = TRUE
+    CROSS JOIN LATERAL (
+        SELECT correo AS destinatario, TRUE AS general FROM generales
+        UNION ALL
+        SELECT cd.correo, FALSE
+        WHERE cd.correo <> '' AND cd.correo NOT IN (SELECT correo FROM generales)
+    ) d
+    WHERE NOT EXISTS (
+        SELECT 1 FROM alertas_vencimiento a
+        WHERE a.tipo_registro = c.tipo_registro
+          AND a.registro_id = c.registro_id
+          AND a.fecha_vencimiento = c.vence
+          AND a.nivel = c.nivel
+          AND a.destinatario = d.destinatario
+    )
+    ORDER BY c.vence, cd.nombre
+""")
+
+def buscar_pendientes(db: Session, hoy: date) -> List[dict]:
+    """(registro, destinatario) por vencer o vencidos aún no notificados (una sola consulta)"""
+    limite = hoy + timedelta(days=settings.ALERTAS_DIAS_ANTICIPACION)
+    filas = db.execute(_SQL_PENDIENTES, {
+        "hoy": hoy,
+        "limite": limite,
+        "limite_recarga": limite - timedelta(days=settings.EXTINTORES_VIGENCIA_DIAS),
+        "vigencia_extintores": settings.EXTINTORES_VIGENCIA_DIAS
+    }).mappings().all()
+    return [dict(f) for f in filas]
+
+def _cuerpo_resumen(pendientes: List[dict]) -> str:
+    lineas = ["Resumen de vencimientos - Protección Civil", ""]
+    for nivel, titulo in (("Vencido", "VENCIDOS"), ("Próximo", "PRÓXIMOS A VENCER")):
+        grupo = [p for p in pendientes if p["nivel"] == nivel]
+        if not grupo:
+            continue
+        lineas.append(f"{titulo} ({len(grupo)})")
+        for p in grupo:
+            verbo = "venció" if nivel == "Vencido" else "vence"
+            lineas.append(f"  - {p['nombre']} ({p['codigo']}): {p['tipo_registro']} {verbo} el {p['vence']:%d/%m/%Y}")
+        lineas.append("")
+    lineas.append("Sistema Integral de Protección de Activos")
+    return "\n".join(lineas)
+
+def construir_resumenes(pendientes: List[dict]) -> List[Tuple[EmailMessage, List[dict]]]:
+    """Un resumen por destinatario: general para alertas.emails, por CEDIS para gerentes"""
+    por_correo: Dict[str, List[dict]] = {}
+    for p in pendientes:
+        por_correo.setdefault(p["destinatario"], []).append(p)
+
+    mensajes = []
+    for correo, grupo in por_correo.items():
+        if grupo[0]["general"]:
+            asunto = "Alertas de vencimiento - Protección Civil"
+        else:
+            asunto = f"Alertas de vencimiento - CEDIS {grupo[0]['nombre']}"
+        mensaje = EmailMessage()
+        mensaje["From"] = settings.SMTP_FROM
+        mensaje["To"] = correo
+        mensaje["Subject"] = asunto
+        mensaje.set_content(_cuerpo_resumen(grupo))
+        mensajes.append((mensaje, grupo))
+    return mensajes
+
+async def enviar_resumenes(mensajes: List[Tuple[EmailMessage, List[dict]]]) -> List[Tuple[EmailMessage, List[dict]]]:
+    """Enviar por una sola conexión SMTP con reintentos y backoff exponencial"""
+    pendientes = list(mensajes)
+    entregados = []
+
+    for intento in range(settings.SMTP_REINTENTOS + 1):
+        if not pendientes:
+            break
+        if intento:
+            await asyncio.sleep(2 ** intento)
+
+        try:
+            smtp = aiosmtplib.SMTP(
+                hostname=settings.SMTP_HOST,
+                port=settings.SMTP_PORT,
+                start_tls=settings.SMTP_STARTTLS,
+                timeout=30
+            )
+            async with smtp:
+                if settings.SMTP_USER:
+                    await smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+                while pendientes:
+                    try:
+                        await smtp.send_message(pendientes[0][0])
+                    except aiosmtplib.SMTPRecipientsRefused as e:
+                        # Se reintenta en el siguiente ciclo; no detiene a los demás
+                        print(f"⚠️ Destinatario rechazado ({pendientes[0][0]['To']}): {e}")
+                        pendientes.pop(0)
+                        continue
+                    entregados.append(pendientes.pop(0))
+        except (aiosmtplib.SMTPException, OSError) as e:
+            print(f"⚠️ Error SMTP (intento {intento + 1}): {e}")
+
+    return entregados
+
+def registrar_envios(db: Session, entregados: List[Tuple[EmailMessage, List[dict]]]):
+    """Registrar lo notificado a cada destinatario para no volver a enviárselo"""
+    registros = [
+        {
+            "tipo_registro": p["tipo_registro"],
+            "registro_id": p["registro_id"],
+            "cedis_id": p["cedis_id"],
+            "fecha_vencimiento": p["vence"],
+            "nivel": p["nivel"],
+            "destinatario": p["destinatario"]
+        }
+        for _, grupo in entregados for p in grupo
+    ]
+
+    if registros:
+        db.execute(text("""
+            INSERT INTO alertas_vencimiento
+                (tipo_registro, registro_id, cedis_id, fecha_vencimiento, nivel, destinatario)
+            VALUES
+                (:tipo_registro, :registro_id, :cedis_id, :fecha_vencimiento, :nivel, :destinatario)
+            ON CONFLICT (tipo_registro, registro_id, fecha_vencimiento, nivel, destinatario) DO NOTHING
+        """), registros)
+    return len(registros)
+
+def _bloquear(conexion, funcion: str) -> bool:
+    resultado = conexion.execute(text(f"SELECT {funcion}(:llave)"), {"llave": _LOCK_ALERTAS}).scalar()
+    conexion.commit()
+    return resultado
+
+async def ejecutar_ciclo(hoy: Optional[date] = None) -> dict:
+    """Un ciclo completo: consultar, enviar y registrar
+
+    El advisory lock es de sesión sobre una conexión dedicada: la consulta y
+    el registro van en transacciones cortas y el envío SMTP (con reintentos)
+    no deja una transacción abierta.
+    """
+    hoy = hoy or date.today()
+    conexion = await asyncio.to_thread(engine.connect)
+    try:
+        if not await asyncio.to_thread(_bloquear, conexion, "pg_try_advisory_lock"):
+            return {"pendientes": 0, "mensajes": 0, "entregados": 0, "registrados": 0, "omitido": True}
+
+        db = SessionLocal(bind=conexion)
+        try:
+            pendientes = await asyncio.to_thread(buscar_pendientes, db, hoy)
+            await asyncio.to_thread(db.commit)
+            mensajes = construir_resumenes(pendientes)
+            entregados = await enviar_resumenes(mensajes) if mensajes else []
+
+            registrados = await asyncio.to_thread(registrar_envios, db, entregados)
+            await asyncio.to_thread(db.commit)
+        finally:
+            await asyncio.to_thread(db.close)
+            try:
+                await asyncio.to_thread(_bloquear, conexion, "pg_advisory_unlock")
+            except Exception:
+                # Que el candado no regrese al pool con la conexión
+                conexion.invalidate()
+                raise
+
+        return {
+            "pendientes": len(pendientes),
+            "mensajes": len(mensajes),
+            "entregados": len(entregados),
+            "registrados": registrados
+        }
+    finally:
+        await asyncio.to_thread(conexion.close)
+
+async def bucle_alertas():
+    """Tarea de fondo iniciada en el lifespan de la aplicación"""
+    while True:
+        try:
+            resultado = await ejecutar_ciclo()
+            if resultado.get("registrados"):
+                print(f"📧 Alertas de vencimiento enviadas: {resultado}")
+        except Exception as e:
+            print(f"❌ Error en ciclo de alertas: {e}")
+        await asyncio.sleep(settings.ALERTAS_INTERVALO_MINUTOS * 60)
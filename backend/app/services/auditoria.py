@@ -0,0 +1,376 @@
+"""
+Bitácora de auditoría con escritura diferida
+
+Los cambios se capturan de los eventos de sesión de SQLAlchemy (valores
+anteriores/nuevos de cada objeto insertado, modificado o eliminado) y solo
+se encolan cuando la transacción hace commit; si hay rollback se descartan.
+Un hilo de fondo vacía la cola por lotes con COPY, de modo que las
+escrituras de la API no esperan a la bitácora.
+
+La cola es acotada: si el escritor no alcanza y la cola se llena, el
+productor espera un máximo de AUDITORIA_ESPERA_MAX_SEGUNDOS y después
+escribe su lote directamente. Un lote que no se puede escribir (base caída)
+se guarda en AUDITORIA_RESPALDO_DIR y el escritor lo reintenta hasta
+lograrlo: nunca se descartan registros. Al detener la aplicación se vacía
+todo lo pendiente.
+
+after_flush solo ve objetos de la sesión. Las escrituras con sentencias
+Core (insert/update/ON CONFLICT, query.update, bulk_*) no pasan por ahí: las
+que hace un usuario se registran con `registrar()` a partir de las filas de
+RETURNING (presupuestos, protección civil, pesos de cumplimiento). Las
+tablas derivadas que mantienen procesos o triggers (riesgo precalculado,
+modelos de pronóstico, acumulados, cumplimiento, contadores de duplicados)
+no se auditan.
+"""
+
+import atexit
+import csv
+import io
+import json
+import os
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Optional
+
+from sqlalchemy import event, inspect
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+
+TABLAS_EXCLUIDAS = {"auditoria"}
+CAMPOS_OCULTOS = {"password_hash", "token_hash"}
+
+_COLUMNAS = (
+    "usuario_id", "accion", "tabla_afectada", "registro_id", "datos_anteriores",
+    "datos_nuevos", "ip_address", "user_agent", "timestamp"
+)
+_SQL_COPY = f"COPY auditoria ({', '.join(_COLUMNAS)}) FROM STDIN WITH (FORMAT csv)"
+_REINTENTOS_COPY = 3
+_FIN = object()
+
+# Contexto de la petición actual: usuario, IP y user agent. Es un dict
+# mutable para que el usuario asignado dentro de una dependencia (que corre
+# en otro hilo con una copia del contexto) sea visible para el endpoint.
+_contexto: ContextVar[Optional[dict]] = ContextVar("contexto_auditoria", default=None)
+
+class ContextoAuditoriaMiddleware:
+    """Middleware ASGI que registra IP y user agent de cada petición"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        reenviado = headers.get(b"x-forwarded-for", b"").decode("latin-1").split(",")[0].strip()
+        cliente = scope.get("client")
+        token = _contexto.set({
+            "usuario_id": None,
+            "ip_address": reenviado or (cliente[0] if cliente else None),
+            "user_agent": headers.get(b"user-agent", b"").decode("latin-1") or None
+        })
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _contexto.reset(token)
+
+def asignar_usuario(usuario_id: int):
+    """Asociar el usuario autenticado a la petición en curso"""
+    contexto = _contexto.get()
+    if contexto is not None:
+        contexto["usuario_id"] = usuario_id
+
+def usuario_actual() -> Optional[int]:
+    """Usuario autenticado de la petición en curso (None fuera de una petición)"""
+    contexto = _contexto.get()
+    return contexto["usuario_id"] if contexto else None
+
+def _json_default(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return str(valor)
+
+def _a_json(datos: Optional[dict]) -> Optional[str]:
+    if not datos:
+        return None
+    return json.dumps(datos, default=_json_default, ensure_ascii=False)
+
+def _valores_cargados(estado) -> dict:
+    """Columnas ya cargadas del objeto (sin disparar consultas durante el flush)"""
+    return {
+        atributo.key: estado.dict[atributo.key]
+        for atributo in estado.mapper.column_attrs
+        if atributo.key in estado.dict and atributo.key not in CAMPOS_OCULTOS
+    }
+
+def _cambios(estado):
+    """Valores anteriores y nuevos de las columnas modificadas"""
+    anteriores, nuevos = {}, {}
+    for atributo in estado.mapper.column_attrs:
+        if atributo.key in CAMPOS_OCULTOS:
+            continue
+        historial = estado.attrs[atributo.key].history
+        if not historial.has_changes():
+            continue
+        anteriores[atributo.key] = historial.deleted[0] if historial.deleted else None
+        nuevos[atributo.key] = historial.added[0] if historial.added else None
+    return anteriores, nuevos
+
+def _registro_id(estado) -> Optional[int]:
+    llave = estado.mapper.primary_key_from_instance(estado.obj())
+    if len(llave) == 1 and isinstance(llave[0], int):
+        return llave[0]
+    return None
+
+def _registro(contexto: dict, accion: str, tabla: str, registro_id: Optional[int],
+              anteriores: Optional[dict], nuevos: Optional[dict], ahora: datetime) -> tuple:
+    return (
+        contexto.get("usuario_id"),
+        accion,
+        tabla,
+        registro_id,
+        _a_json(anteriores),
+        _a_json(nuevos),
+        contexto.get("ip_address"),
+        contexto.get("user_agent"),
+        ahora.isoformat(sep=" ")
+    )
+
+def registrar(session, accion: str, tabla: str, filas: List[dict], llave: str = "id"):
+    """Auditar escrituras Core con los valores de RETURNING
+
+    Como lo capturado en after_flush, se encola al hacer commit y se
+    descarta con rollback. `accion` es INSERT, UPDATE o DELETE (datos
+    anteriores para DELETE, nuevos para las demás).
+    """
+    contexto = _contexto.get() or {}
+    ahora = datetime.now()
+    pendientes = session.info.setdefault("auditoria_pendiente", [])
+    for fila in filas:
+        datos = {campo: valor for campo, valor in fila.items() if campo not in CAMPOS_OCULTOS}
+        anteriores, nuevos = (datos, None) if accion == "DELETE" else (None, datos)
+        registro_id = fila.get(llave)
+        pendientes.append(_registro(
+            contexto, accion, tabla, registro_id if isinstance(registro_id, int) else None, anteriores, nuevos, ahora
+        ))
+
+def registrar_upsert(session, filas: List[tuple]):
+    """Auditar un INSERT ... ON CONFLICT DO UPDATE ... RETURNING (objeto, xmax = 0)
+
+    `filas` son pares (objeto ORM devuelto, si se insertó); las filas que ya
+    existían se registran como UPDATE con sus valores nuevos.
+    """
+    for insertado in (True, False):
+        objetos = [objeto for objeto, fue_insertado in filas if fue_insertado is insertado]
+        if not objetos:
+            continue
+        estado = inspect(objetos[0])
+        registrar(
+            session, "INSERT" if insertado else "UPDATE", estado.mapper.local_table.name,
+            [{atributo.key: getattr(objeto, atributo.key) for atributo in estado.mapper.column_attrs} for objeto in objetos]
+        )
+
+def _capturar(session, flush_context):
+    """after_flush: armar los registros de auditoría de este flush"""
+    contexto = _contexto.get() or {}
+    ahora = datetime.now()
+    pendientes = session.info.setdefault("auditoria_pendiente", [])
+
+    operaciones = (
+        [("INSERT", o) for o in session.new] +
+        [("UPDATE", o) for o in session.dirty] +
+        [("DELETE", o) for o in session.deleted]
+    )
+    for accion, objeto in operaciones:
+        estado = inspect(objeto)
+        tabla = estado.mapper.local_table.name
+        if tabla in TABLAS_EXCLUIDAS:
+            continue
+
+        if accion == "INSERT":
+            anteriores, nuevos = None, _valores_cargados(estado)
+        elif accion == "DELETE":
+            anteriores, nuevos = _valores_cargados(estado), None
+        else:
+            anteriores, nuevos = _cambios(estado)
+            if not nuevos:
+                continue
+
+        pendientes.append(_registro(contexto, accion, tabla, _registro_id(estado), anteriores, nuevos, ahora))
+
+def _confirmar(session):
+    """after_commit: pasar lo capturado a la cola del escritor"""
+    pendientes = session.info.pop("auditoria_pendiente", None)
+    if pendientes:
+        escritor_auditoria.encolar(pendientes)
+
+def _descartar(session):
+    """after_rollback: lo capturado nunca llegó a la base de datos"""
+    session.info.pop("auditoria_pendiente", None)
+
+class EscritorAuditoria:
+    """Cola acotada + hilo que escribe los registros por lotes con COPY"""
+
+    def __init__(self, cola_max: int, lote: int, intervalo: float, espera_max: float, respaldo_dir: str):
+        self.lote = lote
+        self.intervalo = intervalo
+        self.espera_max = espera_max
+        self.respaldo_dir = respaldo_dir
+        self._cola: queue.Queue = queue.Queue(maxsize=cola_max)
+        self._hilo: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.escritos = 0
+        self.escritos_en_linea = 0
+        self.respaldados = 0
+        self._ultimo_reintento = 0.0
+
+    def iniciar(self):
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._hilo = threading.Thread(target=self._ejecutar, name="escritor-auditoria", daemon=True)
+            self._hilo.start()
+            atexit.register(self.detener)
+
+    def detener(self, timeout: float = 30.0):
+        """Vaciar la cola y detener el hilo"""
+        with self._lock:
+            hilo = self._hilo
+            self._hilo = None
+        if hilo is None or not hilo.is_alive():
+            return
+        self._cola.put(_FIN)
+        hilo.join(timeout)
+
+    def pendientes(self) -> int:
+        return self._cola.qsize()
+
+    def encolar(self, registros: List[tuple]):
+        if self._hilo is None:
+            self.iniciar()
+        for i, registro in enumerate(registros):
+            try:
+                self._cola.put(registro, timeout=self.espera_max)
+            except queue.Full:
+                # Contrapresión: el escritor no alcanza, este lote se escribe en línea
+                self._escribir(registros[i:])
+                self.escritos_en_linea += len(registros) - i
+                return
+
+    def _ejecutar(self):
+        terminar = False
+        while not terminar:
+            if time.monotonic() - self._ultimo_reintento >= self.intervalo * 30:
+                self.reintentar_respaldos()
+            try:
+                primero = self._cola.get(timeout=self.intervalo)
+            except queue.Empty:
+                continue
+
+            lote = []
+            if primero is _FIN:
+                terminar = True
+            else:
+                lote.append(primero)
+            while terminar or len(lote) < self.lote:
+                try:
+                    registro = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if registro is _FIN:
+                    terminar = True
+                else:
+                    lote.append(registro)
+
+            if lote:
+                self._escribir(lote)
+
+    def _copiar(self, datos: str):
+        conexion = engine.raw_connection()
+        try:
+            conexion.cursor().copy_expert(_SQL_COPY, io.StringIO(datos))
+            conexion.commit()
+        except Exception:
+            conexion.rollback()
+            raise
+        finally:
+            conexion.close()
+
+    def _escribir(self, lote: List[tuple]):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(lote)
+        datos = buffer.getvalue()
+
+        for intento in range(_REINTENTOS_COPY):
+            try:
+                self._copiar(datos)
+                self.escritos += len(lote)
+                return
+            except Exception as e:
+                print(f"⚠️ Error escribiendo auditoría (intento {intento + 1}): {e}")
+                if intento + 1 < _REINTENTOS_COPY:
+                    time.sleep(2 ** intento)
+
+        self._respaldar(datos)
+        self.respaldados += len(lote)
+        print(f"⚠️ {len(lote)} registros de auditoría guardados en {self.respaldo_dir} para reintento")
+
+    def _respaldar(self, datos: str):
+        """Guardar el lote en disco (escritura atómica: temporal + rename)"""
+        os.makedirs(self.respaldo_dir, exist_ok=True)
+        nombre = f"{time.time_ns()}-{os.getpid()}-{threading.get_ident()}.csv"
+        temporal = os.path.join(self.respaldo_dir, nombre + ".tmp")
+        with open(temporal, "w", encoding="utf-8", newline="") as archivo:
+            archivo.write(datos)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.replace(temporal, os.path.join(self.respaldo_dir, nombre))
+
+    def reintentar_respaldos(self) -> int:
+        """Escribir los lotes respaldados en orden; se detiene en el primer error"""
+        self._ultimo_reintento = time.monotonic()
+        if not os.path.isdir(self.respaldo_dir):
+            return 0
+        escritos = 0
+        for nombre in sorted(n for n in os.listdir(self.respaldo_dir) if n.endswith(".csv")):
+            ruta = os.path.join(self.respaldo_dir, nombre)
+            # Otros workers comparten el directorio: se reclama el archivo con un rename
+            tomado = f"{ruta}.{os.getpid()}"
+            try:
+                os.rename(ruta, tomado)
+            except FileNotFoundError:
+                continue
+            with open(tomado, encoding="utf-8", newline="") as archivo:
+                datos = archivo.read()
+            try:
+                self._copiar(datos)
+            except Exception as e:
+                os.rename(tomado, ruta)
+                print(f"⚠️ Auditoría respaldada aún sin escribir ({nombre}): {e}")
+                break
+            os.remove(tomado)
+            filas = sum(1 for _ in csv.reader(io.StringIO(datos)))
+            self.escritos += filas
+            escritos += filas
+        return escritos
+
+escritor_auditoria = EscritorAuditoria(
+    settings.AUDITORIA_COLA_MAX,
+    settings.AUDITORIA_LOTE,
+    settings.AUDITORIA_INTERVALO_SEGUNDOS,
+    settings.AUDITORIA_ESPERA_MAX_SEGUNDOS,
+    settings.AUDITORIA_RESPALDO_DIR
+)
+
+event.listen(SessionLocal, "after_flush", _capturar)
+event.listen(SessionLocal, "after_commit", _confirmar)
+event.listen(SessionLocal, "after_rollback", _descartar)
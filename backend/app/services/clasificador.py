@@ -0,0 +1,266 @@
+"""
+Clasificador de noticias por reglas (autómata Aho-Corasick)
+
+Los diccionarios ponderados de `app/data/diccionarios_alerta.json` se
+compilan en un solo autómata multi-patrón, de modo que cada titular se
+recorre una sola vez sin importar cuántas palabras clave existan. Un patrón
+terminado en `*` es un prefijo (p. ej. `evacu*` cubre evacuación/evacuan).
+
+El archivo se recarga en caliente: si cambia su fecha de modificación se
+compila un autómata nuevo y se reemplaza sin detener la clasificación.
+
+Uso del benchmark:
+    python -m app.services.clasificador --titulares 20000
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.texto import normalizar_texto
+
+NIVELES_CRITICIDAD = ["Crítico", "Alto", "Medio", "Bajo"]
+MAX_PALABRAS_CLAVE = 10
+
+class AhoCorasick:
+    """Autómata de búsqueda simultánea de patrones sobre texto normalizado"""
+
+    def __init__(self, patrones: Iterable[Tuple[str, bool]]):
+        # Cada estado: transiciones, enlace de falla y patrones que terminan ahí
+        self._goto: List[Dict[str, int]] = [{}]
+        self._falla: List[int] = [0]
+        self._salida: List[List[int]] = [[]]
+        self.patrones: List[Tuple[str, bool]] = []
+
+        for patron, es_prefijo in patrones:
+            self._insertar(patron, es_prefijo)
+        self._construir_fallas()
+
+    def _insertar(self, patron: str, es_prefijo: bool):
+        estado = 0
+        for caracter in patron:
+            siguiente = self._goto[estado].get(caracter)
+            if siguiente is None:
+                siguiente = len(self._goto)
+                self._goto[estado][caracter] = siguiente
+                self._goto.append({})
+                self._falla.append(0)
+                self._salida.append([])
+            estado = siguiente
+        self._salida[estado].append(len(self.patrones))
+        self.patrones.append((patron, es_prefijo))
+
+    def _construir_fallas(self):
+        cola = deque(self._goto[0].values())
+        while cola:
+            estado = cola.popleft()
+            for caracter, siguiente in self._goto[estado].items():
+                cola.append(siguiente)
+                falla = self._falla[estado]
+                while falla and caracter not in self._goto[falla]:
+                    falla = self._falla[falla]
+                destino = self._goto[falla].get(caracter, 0)
+                self._falla[siguiente] = destino if destino != siguiente else 0
+                self._salida[siguiente] = self._salida[siguiente] + self._salida[self._falla[siguiente]]
+
+    def buscar(self, texto: str) -> List[Tuple[int, int, int]]:
+        """Regresar (indice_patron, inicio, fin) de cada coincidencia de palabra completa"""
+        coincidencias = []
+        goto, falla, salida = self._goto, self._falla, self._salida
+        longitud = len(texto)
+        estado = 0
+
+        for posicion, caracter in enumerate(texto):
+            while estado and caracter not in goto[estado]:
+                estado = falla[estado]
+            estado = goto[estado].get(caracter, 0)
+            if not salida[estado]:
+                continue
+
+            for indice in salida[estado]:
+                patron, es_prefijo = self.patrones[indice]
+                inicio = posicion - len(patron) + 1
+                if inicio > 0 and texto[inicio - 1] != " ":
+                    continue
+                fin = posicion + 1
+                if es_prefijo:
+                    # Extender hasta el final de la palabra
+                    while fin < longitud and texto[fin] != " ":
+                        fin += 1
+                elif fin < longitud and texto[fin] != " ":
+                    continue
+                coincidencias.append((indice, inicio, fin))
+
+        return coincidencias
+
+class Diccionarios:
+    """Diccionarios compilados: autómata + pesos por categoría"""
+
+    def __init__(self, datos: dict):
+        # patrón normalizado -> [(categoria, peso)]; categoria None = intensificador
+        pesos: Dict[Tuple[str, bool], List[Tuple[Optional[str], float]]] = {}
+
+        for tipo, palabras in datos["tipos"].items():
+            for palabra, peso in palabras.items():
+                pesos.setdefault(self._normalizar_patron(palabra), []).append((tipo, float(peso)))
+
+        for palabra, peso in datos.get("intensificadores", {}).items():
+            pesos.setdefault(self._normalizar_patron(palabra), []).append((None, float(peso)))
+
+        self.automata = AhoCorasick(pesos.keys())
+        self.pesos = [pesos[patron] for patron in self.automata.patrones]
+        self.umbrales = [
+            (nivel, float(datos["umbrales_criticidad"][nivel]))
+            for nivel in NIVELES_CRITICIDAD
+            if nivel in datos["umbrales_criticidad"]
+        ]
+        self.saturacion = float(datos.get("saturacion_confianza", 6))
+
+    @staticmethod
+    def _normalizar_patron(palabra: str) -> Tuple[str, bool]:
+        es_prefijo = palabra.endswith("*")
+        return normalizar_texto(palabra.rstrip("*")), es_prefijo
+
+class Clasificador:
+    """Clasificador de tipo_alerta / nivel_criticidad con recarga en caliente"""
+
+    def __init__(self, ruta: str, intervalo_recarga: float = 5.0):
+        self.ruta = ruta
+        self.intervalo_recarga = intervalo_recarga
+        self._diccionarios: Optional[Diccionarios] = None
+        self._mtime: Optional[float] = None
+        self._ultima_revision = 0.0
+        self._lock = threading.Lock()
+
+    def _recargar_si_cambio(self):
+        """Recompilar el autómata si el archivo de diccionarios cambió"""
+        ahora = time.monotonic()
+        if self._diccionarios is not None and ahora - self._ultima_revision < self.intervalo_recarga:
+            return
+
+        with self._lock:
+            if self._diccionarios is not None and ahora - self._ultima_revision < self.intervalo_recarga:
+                return
+            self._ultima_revision = ahora
+
+            # Archivo ausente (p. ej. a mitad de un despliegue) o inválido:
+            # se sigue clasificando con la última versión cargada
+            try:
+                mtime = os.stat(self.ruta).st_mtime
+                if mtime == self._mtime:
+                    return
+                with open(self.ruta, encoding="utf-8") as archivo:
+                    nuevos = Diccionarios(json.load(archivo))
+            except (OSError, ValueError, KeyError) as e:
+                if self._diccionarios is None:
+                    raise
+                print(f"⚠️ Diccionarios no disponibles o inválidos, se conserva la versión anterior: {e}")
+                return
+
+            self._diccionarios = nuevos
+            self._mtime = mtime
+
+    def clasificar(self, texto: str) -> dict:
+        """Clasificar un texto; regresa los campos de clasificación de la noticia"""
+        self._recargar_si_cambio()
+        return self._clasificar(self._diccionarios, texto)
+
+    def clasificar_lote(self, textos: Iterable[str]) -> List[dict]:
+        """Clasificar varios textos con la misma versión de diccionarios"""
+        self._recargar_si_cambio()
+        diccionarios = self._diccionarios
+        return [self._clasificar(diccionarios, texto) for texto in textos]
+
+    @staticmethod
+    def _clasificar(diccionarios: Diccionarios, texto: str) -> dict:
+        normalizado = normalizar_texto(texto)
+        puntajes: Dict[str, float] = {}
+        intensidad = 0.0
+        palabras_clave: List[str] = []
+
+        for indice, inicio, fin in diccionarios.automata.buscar(normalizado):
+            for categoria, peso in diccionarios.pesos[indice]:
+                if categoria is None:
+                    intensidad += peso
+                else:
+                    puntajes[categoria] = puntajes.get(categoria, 0.0) + peso
+            palabra = normalizado[inicio:fin]
+            if palabra not in palabras_clave and len(palabras_clave) < MAX_PALABRAS_CLAVE:
+                palabras_clave.append(palabra)
+
+        if not puntajes:
+            return {
+                "tipo_alerta": None,
+                "nivel_criticidad": "Informativo",
+                "palabras_clave": palabras_clave,
+                "confianza_clasificacion": Decimal("0.00")
+            }
+
+        tipo_alerta, mejor = max(puntajes.items(), key=lambda item: item[1])
+
+        nivel_criticidad = "Informativo"
+        puntaje_total = mejor + intensidad
+        for nivel, umbral in diccionarios.umbrales:
+            if puntaje_total >= umbral:
+                nivel_criticidad = nivel
+                break
+
+        # Confianza: dominancia del tipo ganador, atenuada si hay poca evidencia
+        dominancia = mejor / sum(puntajes.values())
+        evidencia = min(1.0, mejor / diccionarios.saturacion)
+        confianza = Decimal(dominancia * evidencia).quantize(Decimal("0.01"))
+
+        return {
+            "tipo_alerta": tipo_alerta,
+            "nivel_criticidad": nivel_criticidad,
+            "palabras_clave": palabras_clave,
+            "confianza_clasificacion": confianza
+        }
+
+clasificador = Clasificador(settings.CLASIFICADOR_DICCIONARIOS)
+
+TITULARES_MUESTRA = [
+    "Sismo de magnitud 7.1 sacude Tapachula, Chiapas; reportan daños y evacuación de escuelas",
+    "Huracán categoría 4 se aproxima a Quintana Roo; Protección Civil habilita albergues en Cancún",
+    "Asaltan a transportista y roban tráiler con mercancía en la carretera Villahermosa-Cárdenas",
+    "Bloqueo de transportistas en la autopista Mérida-Cancún por segundo día",
+    "Inundaciones en Tabasco dejan 3 muertos y miles de damnificados",
+    "Sindicato emplaza a huelga a empresa de distribución en Oaxaca",
+    "Incendio en bodega de Salina Cruz moviliza a bomberos; no hay heridos",
+    "Pronóstico del clima: frente frío número 12 traerá lluvias a la península",
+    "Balacera en el centro de Comitán deja dos personas sin vida",
+    "Gobierno inaugura nuevo parque en Campeche",
+]
+
+def medir_rendimiento(titulares: int = 20000, textos: Optional[List[str]] = None) -> dict:
+    """Medir el throughput de clasificación por lotes"""
+    textos = textos or TITULARES_MUESTRA
+    lote = [textos[i % len(textos)] for i in range(titulares)]
+
+    clasificador.clasificar(lote[0])  # compila el autómata fuera de la medición
+    inicio = time.perf_counter()
+    clasificador.clasificar_lote(lote)
+    segundos = time.perf_counter() - inicio
+
+    return {
+        "titulares": titulares,
+        "segundos": round(segundos, 4),
+        "titulares_por_segundo": round(titulares / segundos),
+        "titulares_por_minuto": round(titulares / segundos * 60)
+    }
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark del clasificador de noticias")
+    parser.add_argument("--titulares", type=int, default=20000)
+    args = parser.parse_args()
+
+    resultado = medir_rendimiento(args.titulares)
+    print(f"📰 {resultado['titulares']} titulares en {resultado['segundos']} s")
+    print(f"⚡ {resultado['titulares_por_segundo']:,} titulares/s ({resultado['titulares_por_minuto']:,} por minuto)")
@@ -0,0 +1,124 @@
+"""
+Score de cumplimiento de protección civil por CEDIS
+
+La fórmula vive en la base (función recalcular_cumplimiento, migración
+0007) y el resultado en cumplimiento_cedis; los endpoints solo leen
+esa tabla. Los triggers de extintores, pipc y dictamenes recalculan los
+CEDIS afectados en la misma transacción; la función bloquea antes las filas
+de cedis, así que dos escrituras concurrentes al mismo CEDIS se serializan
+y la segunda calcula con lo que confirmó la primera. Aquí están los pesos,
+el recálculo completo cuando cambia el día (los vencimientos se cruzan sin
+escrituras) y la foto diaria en cumplimiento_historico (particionada por
+año) que leen las gráficas de tendencia.
+"""
+
+import asyncio
+from datetime import date
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.auditoria import registrar
+
+# Llave del advisory lock: solo un worker hace el recálculo diario
+_LOCK_CUMPLIMIENTO = 730_003
+
+PESOS = {
+    "extintores": "cumplimiento.peso_extintores",
+    "pipc": "cumplimiento.peso_pipc",
+    "dictamen_estructural": "cumplimiento.peso_dictamen_estructural",
+    "dictamen_electrico": "cumplimiento.peso_dictamen_electrico",
+}
+
+def obtener_pesos(db: Session) -> Dict[str, float]:
+    valores = dict(db.execute(
+        text("SELECT clave, valor FROM configuraciones WHERE clave = ANY(:claves)"),
+        {"claves": list(PESOS.values())}
+    ).all())
+    return {nombre: float(valores.get(clave) or 25) for nombre, clave in PESOS.items()}
+
+def guardar_pesos(db: Session, pesos: Dict[str, float]) -> int:
+    """Actualizar pesos y recalcular todos los CEDIS (en la transacción de `db`)"""
+    filas = db.execute(text("""
+        INSERT INTO configuraciones (clave, valor, tipo, categoria, updated_at)
+        SELECT clave, valor, 'number', 'cumplimiento', NOW()
+        FROM unnest(CAST(:claves AS varchar[]), CAST(:valores AS text[])) AS p(clave, valor)
+        ON CONFLICT (clave) DO UPDATE SET valor = EXCLUDED.valor, updated_at = NOW()
+        RETURNING id, clave, valor
+    """), {
+        "claves": [PESOS[nombre] for nombre in pesos],
+        "valores": [str(valor) for valor in pesos.values()]
+    }).mappings().all()
+    registrar(db, "UPDATE", "configuraciones", [dict(fila) for fila in filas])
+    return recalcular(db)
+
+def recalcular(db: Session, cedis_ids: Optional[List[int]] = None) -> int:
+    """Recalcular los CEDIS indicados (todos si None); regresa cuántos se evaluaron"""
+    return db.execute(text("SELECT recalcular_cumplimiento(CAST(:ids AS int[]))"), {"ids": cedis_ids}).scalar()
+
+def asegurar_particiones(db: Session, fecha: date):
+    """Crear la partición anual de `fecha` y la del año siguiente si no existen"""
+    for año in (fecha.year, fecha.year + 1):
+        if db.execute(text("SELECT to_regclass(:tabla)"), {"tabla": f"cumplimiento_historico_{año}"}).scalar():
+            continue
+        db.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS cumplimiento_historico_{año} PARTITION OF cumplimiento_historico
+            FOR VALUES FROM ('{año}-01-01') TO ('{año + 1}-01-01')
+        """))
+
+def guardar_historico(db: Session) -> int:
+    """Foto del día: el último estado del día queda en cumplimiento_historico"""
+    asegurar_particiones(db, db.execute(text("SELECT CURRENT_DATE")).scalar())
+    return db.execute(text("""
+        INSERT INTO cumplimiento_historico AS h
+            (fecha, cedis_id, organizacion_id, extintores_cumple, pipc_vigente,
+             dictamen_estructural, dictamen_electrico, score)
+        SELECT CURRENT_DATE, cedis_id, organizacion_id, extintores_cumple, pipc_vigente,
+               dictamen_estructural, dictamen_electrico, score
+        FROM cumplimiento_cedis
+        ON CONFLICT (cedis_id, fecha) DO UPDATE
+        SET organizacion_id = EXCLUDED.organizacion_id,
+            extintores_cumple = EXCLUDED.extintores_cumple,
+            pipc_vigente = EXCLUDED.pipc_vigente,
+            dictamen_estructural = EXCLUDED.dictamen_estructural,
+            dictamen_electrico = EXCLUDED.dictamen_electrico,
+            score = EXCLUDED.score
+        WHERE (h.organizacion_id, h.extintores_cumple, h.pipc_vigente, h.dictamen_estructural,
+               h.dictamen_electrico, h.score)
+              IS DISTINCT FROM (EXCLUDED.organizacion_id, EXCLUDED.extintores_cumple, EXCLUDED.pipc_vigente,
+                                EXCLUDED.dictamen_estructural, EXCLUDED.dictamen_electrico, EXCLUDED.score)
+    """)).rowcount
+
+def recalcular_del_dia() -> dict:
+    """Recalcular todo si algún CEDIS no se ha evaluado hoy (o nunca) y actualizar la foto del día"""
+    db = SessionLocal()
+    try:
+        if not db.execute(text("SELECT pg_try_advisory_xact_lock(:llave)"), {"llave": _LOCK_CUMPLIMIENTO}).scalar():
+            return {"omitido": True}
+        pendiente = db.execute(text("""
+            SELECT EXISTS (
+                SELECT 1 FROM cedis c
+                LEFT JOIN cumplimiento_cedis k ON k.cedis_id = c.id
+                WHERE k.evaluado_el IS NULL OR k.evaluado_el < CURRENT_DATE
+            )
+        """)).scalar()
+        resultado = {"evaluados": recalcular(db) if pendiente else 0}
+        resultado["historico"] = guardar_historico(db)
+        db.commit()
+        return resultado
+    finally:
+        db.close()
+
+async def bucle_cumplimiento():
+    """Tarea de fondo iniciada en el lifespan de la aplicación"""
+    while True:
+        try:
+            resultado = await asyncio.to_thread(recalcular_del_dia)
+            if resultado.get("evaluados"):
+                print(f"🧯 Cumplimiento recalculado: {resultado}")
+        except Exception as e:
+            print(f"❌ Error recalculando cumplimiento: {e}")
+        await asyncio.sleep(settings.CUMPLIMIENTO_VERIFICACION_MINUTOS * 60)
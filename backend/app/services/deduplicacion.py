@@ -0,0 +1,207 @@
+"""
+Detección de noticias casi duplicadas (SimHash + índice LSH)
+
+Cada noticia se resume en una huella SimHash de 64 bits calculada sobre
+bigramas de palabras del título y contenido normalizados. Dos notas de la
+misma historia publicadas por distintos medios quedan a pocos bits de
+distancia de Hamming.
+
+El índice LSH divide la huella en (distancia_max + 1) bandas: si dos huellas
+difieren en como máximo `distancia_max` bits, al menos una banda coincide
+exactamente, así que basta con comparar contra los candidatos de esas
+cubetas en lugar de recorrer todas las noticias recientes.
+
+El índice vive en memoria de cada proceso. Con varios workers, cada uno
+agrega también las canónicas que registraron los demás: antes de buscar,
+si pasaron DEDUP_REFRESCO_SEGUNDOS, lee de noticias_monitoreadas las
+canónicas detectadas desde el último refresco (con un margen para las
+transacciones que confirmaron tarde).
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from hashlib import blake2b
+from typing import Dict, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import NoticiaMonitoreada
+from app.services.texto import normalizar_texto
+
+BITS_HUELLA = 64
+_MASCARA_64 = (1 << BITS_HUELLA) - 1
+_TAMANO_SHINGLE = 2
+# fecha_deteccion es el inicio de la transacción: una fila puede hacerse
+# visible después de un refresco que ya pasó su fecha
+_MARGEN_REFRESCO = timedelta(minutes=1)
+
+def _caracteristicas(texto: str) -> Dict[str, int]:
+    """Bigramas de palabras con su frecuencia (unigramas si el texto es muy corto)"""
+    tokens = normalizar_texto(texto).split()
+    if len(tokens) < _TAMANO_SHINGLE:
+        gramas = tokens
+    else:
+        gramas = [
+            " ".join(tokens[i:i + _TAMANO_SHINGLE])
+            for i in range(len(tokens) - _TAMANO_SHINGLE + 1)
+        ]
+
+    frecuencias: Dict[str, int] = {}
+    for grama in gramas:
+        frecuencias[grama] = frecuencias.get(grama, 0) + 1
+    return frecuencias
+
+def calcular_simhash(texto: str) -> int:
+    """Calcular la huella SimHash (entero sin signo de 64 bits)"""
+    frecuencias = _caracteristicas(texto)
+    if not frecuencias:
+        return 0
+
+    hashes = np.fromiter(
+        (
+            int.from_bytes(blake2b(grama.encode("utf-8"), digest_size=8).digest(), "little")
+            for grama in frecuencias
+        ),
+        dtype="<u8",
+        count=len(frecuencias),
+    )
+    pesos = np.fromiter(frecuencias.values(), dtype=np.int64, count=len(frecuencias))
+
+    # Matriz (n_caracteristicas x 64) de bits; cada bit vota +peso / -peso
+    bits = np.unpackbits(hashes.view(np.uint8), bitorder="little").reshape(-1, BITS_HUELLA)
+    votos = pesos @ (bits.astype(np.int64) * 2 - 1)
+
+    huella = np.packbits(votos > 0, bitorder="little").view("<u8")[0]
+    return int(huella)
+
+def distancia_hamming(a: int, b: int) -> int:
+    """Número de bits distintos entre dos huellas"""
+    return ((a ^ b) & _MASCARA_64).bit_count()
+
+def a_bigint(huella: int) -> int:
+    """Convertir huella sin signo al rango de BIGINT de PostgreSQL"""
+    return huella - (1 << BITS_HUELLA) if huella >= (1 << (BITS_HUELLA - 1)) else huella
+
+def desde_bigint(valor: int) -> int:
+    """Convertir BIGINT de PostgreSQL a huella sin signo"""
+    return valor & _MASCARA_64
+
+class IndiceLSH:
+    """Índice en memoria de huellas recientes, particionado por bandas"""
+
+    def __init__(self, distancia_max: int, ventana: timedelta):
+        self.distancia_max = distancia_max
+        self.ventana = ventana
+        self.num_bandas = distancia_max + 1
+        ancho = BITS_HUELLA // self.num_bandas
+
+        # (desplazamiento, máscara) de cada banda; la última absorbe el residuo
+        self._bandas = []
+        for i in range(self.num_bandas):
+            inicio = i * ancho
+            fin = BITS_HUELLA if i == self.num_bandas - 1 else inicio + ancho
+            self._bandas.append((inicio, (1 << (fin - inicio)) - 1))
+
+        self._cubetas: Dict[Tuple[int, int], Set[int]] = {}
+        self._huellas: Dict[int, int] = {}
+        self._orden: deque = deque()  # (fecha, id) en orden de llegada
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._huellas)
+
+    def _llaves(self, huella: int):
+        for i, (desplazamiento, mascara) in enumerate(self._bandas):
+            yield (i, (huella >> desplazamiento) & mascara)
+
+    def agregar(self, noticia_id: int, huella: int, fecha: datetime):
+        """Agregar una noticia canónica al índice"""
+        with self._lock:
+            if noticia_id in self._huellas:
+                return
+            self._huellas[noticia_id] = huella
+            self._orden.append((fecha, noticia_id))
+            for llave in self._llaves(huella):
+                self._cubetas.setdefault(llave, set()).add(noticia_id)
+
+    def buscar(self, huella: int) -> Optional[Tuple[int, int]]:
+        """Regresar (id, distancia) de la noticia más cercana dentro del umbral"""
+        with self._lock:
+            candidatos: Set[int] = set()
+            for llave in self._llaves(huella):
+                candidatos.update(self._cubetas.get(llave, ()))
+
+            mejor = None
+            for noticia_id in candidatos:
+                distancia = distancia_hamming(huella, self._huellas[noticia_id])
+                if distancia <= self.distancia_max and (mejor is None or distancia < mejor[1]):
+                    mejor = (noticia_id, distancia)
+            return mejor
+
+    def purgar(self, ahora: datetime):
+        """Eliminar noticias fuera de la ventana de tiempo"""
+        limite = ahora - self.ventana
+        with self._lock:
+            while self._orden and self._orden[0][0] < limite:
+                _, noticia_id = self._orden.popleft()
+                huella = self._huellas.pop(noticia_id, None)
+                if huella is None:
+                    continue
+                for llave in self._llaves(huella):
+                    cubeta = self._cubetas.get(llave)
+                    if cubeta is not None:
+                        cubeta.discard(noticia_id)
+                        if not cubeta:
+                            del self._cubetas[llave]
+
+class DetectorDuplicados:
+    """Detector de duplicados que se mantiene al día desde noticias_monitoreadas"""
+
+    def __init__(self, distancia_max: int, ventana_horas: int, refresco_segundos: float = 0):
+        self.indice = IndiceLSH(distancia_max, timedelta(hours=ventana_horas))
+        self.refresco_segundos = refresco_segundos
+        self._desde: Optional[datetime] = None  # fecha del último refresco
+        self._ultimo_refresco = 0.0
+        self._lock_carga = threading.Lock()
+
+    def _refrescar(self, db: Session):
+        """Agregar al índice las canónicas de la ventana detectadas desde el último refresco"""
+        with self._lock_carga:
+            if self._desde is not None and time.monotonic() - self._ultimo_refresco < self.refresco_segundos:
+                return
+            ahora = datetime.now()
+            desde = ahora - self.indice.ventana
+            if self._desde is not None:
+                desde = max(desde, self._desde - _MARGEN_REFRESCO)
+            recientes = db.query(
+                NoticiaMonitoreada.id,
+                NoticiaMonitoreada.huella_simhash,
+                NoticiaMonitoreada.fecha_deteccion
+            ).filter(
+                NoticiaMonitoreada.fecha_deteccion >= desde,
+                NoticiaMonitoreada.es_duplicado == False,
+                NoticiaMonitoreada.huella_simhash.isnot(None)
+            ).order_by(NoticiaMonitoreada.fecha_deteccion).all()
+
+            for noticia_id, huella, fecha in recientes:
+                self.indice.agregar(noticia_id, desde_bigint(huella), fecha)
+            self._desde = ahora
+            self._ultimo_refresco = time.monotonic()
+
+    def buscar_canonica(self, db: Session, huella: int) -> Optional[int]:
+        """Regresar el id de la noticia canónica si la huella es un duplicado"""
+        self._refrescar(db)
+        self.indice.purgar(datetime.now())
+
+        encontrada = self.indice.buscar(huella)
+        return encontrada[0] if encontrada else None
+
+    def registrar(self, noticia_id: int, huella: int):
+        """Registrar una nueva noticia canónica"""
+        self.indice.agregar(noticia_id, huella, datetime.now())
+
+detector = DetectorDuplicados(settings.DEDUP_DISTANCIA_MAX, settings.DEDUP_VENTANA_HORAS, settings.DEDUP_REFRESCO_SEGUNDOS)
@@ -0,0 +1,186 @@
+"""
+Exportación de gastos a Excel con memoria constante
+
+Los gastos se leen con un cursor del lado del servidor (por lotes) y se
+escriben en un libro `write_only` de openpyxl, que vuelca cada fila a disco
+al agregarla. Así la memoria no crece con el número de filas.
+
+Con `por_categoria` las filas se ordenan por categoría y cada una va también
+a su propia hoja; con `subtotales` se agrega una fila de subtotal al cerrar
+cada categoría y un total general al final. Se agrupa por categoria_id (los
+gastos sin categoría son su propio grupo); el nombre solo es la etiqueta.
+"""
+
+import re
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.alcance import Alcance
+from app.models import CEDIS, CategoriaGasto, Gasto
+
+LOTE_LECTURA = 2000
+
+COLUMNAS = [
+    "Fecha", "Código CEDIS", "CEDIS", "Categoría", "Proveedor", "Descripción",
+    "Factura", "Método de pago", "Estado", "Monto"
+]
+_COLUMNA_MONTO = len(COLUMNAS) - 1
+_FORMATO_MONTO = "#,##0.00"
+_FORMATO_FECHA = "DD/MM/YYYY"
+SIN_CATEGORIA = "Sin categoría"
+
+def _nombre_hoja(nombre: str, usados: set) -> str:
+    """Nombre de hoja válido (31 caracteres, sin caracteres reservados) y único"""
+    base = re.sub(r"[\[\]:*?/\\]", " ", nombre or SIN_CATEGORIA).strip()[:31] or "Hoja"
+    candidato, i = base, 2
+    while candidato.lower() in usados:
+        sufijo = f" ({i})"
+        candidato = base[:31 - len(sufijo)] + sufijo
+        i += 1
+    usados.add(candidato.lower())
+    return candidato
+
+class _Hoja:
+    """Hoja write_only con estilos de encabezado, montos y subtotales"""
+
+    def __init__(self, libro: Workbook, titulo: str):
+        self.hoja = libro.create_sheet(titulo)
+        self.hoja.freeze_panes = "A2"
+        self.hoja.column_dimensions["A"].width = 12
+        self.hoja.column_dimensions["C"].width = 28
+        self.hoja.column_dimensions["D"].width = 22
+        self.hoja.column_dimensions["E"].width = 28
+        self.hoja.column_dimensions["F"].width = 45
+        self.hoja.column_dimensions["J"].width = 14
+
+        encabezado = []
+        for columna in COLUMNAS:
+            celda = WriteOnlyCell(self.hoja, value=columna)
+            celda.font = Font(bold=True, color="FFFFFF")
+            celda.fill = PatternFill("solid", fgColor="1F4E79")
+            encabezado.append(celda)
+        self.hoja.append(encabezado)
+
+    def fila(self, valores: tuple):
+        fecha = WriteOnlyCell(self.hoja, value=valores[0])
+        fecha.number_format = _FORMATO_FECHA
+        monto = WriteOnlyCell(self.hoja, value=valores[_COLUMNA_MONTO])
+        monto.number_format = _FORMATO_MONTO
+        self.hoja.append([fecha, *valores[1:_COLUMNA_MONTO], monto])
+
+    def total(self, etiqueta: str, monto: Decimal):
+        vacias = [None] * (_COLUMNA_MONTO - 1)
+        texto = WriteOnlyCell(self.hoja, value=etiqueta)
+        texto.font = Font(bold=True)
+        valor = WriteOnlyCell(self.hoja, value=monto)
+        valor.font = Font(bold=True)
+        valor.number_format = _FORMATO_MONTO
+        self.hoja.append([texto, *vacias, valor])
+
+def exportar_gastos_xlsx(
+    db: Session,
+    ruta: str,
+    alcance: Alcance,
+    cedis_id: Optional[int] = None,
+    categoria_id: Optional[int] = None,
+    fecha_inicio=None,
+    fecha_fin=None,
+    por_categoria: bool = False,
+    subtotales: bool = False
+) -> int:
+    """Escribir el libro en `ruta`; regresa el número de gastos exportados"""
+    consulta = select(
+        Gasto.fecha,
+        CEDIS.codigo,
+        CEDIS.nombre,
+        CategoriaGasto.nombre,
+        Gasto.proveedor,
+        Gasto.descripcion_completa,
+        Gasto.num_factura,
+        Gasto.metodo_pago,
+        Gasto.estado,
+        Gasto.monto_total,
+        Gasto.categoria_id
+    ).outerjoin(CEDIS, CEDIS.id == Gasto.cedis_id).outerjoin(
+        CategoriaGasto, CategoriaGasto.id == Gasto.categoria_id
+    )
+
+    consulta = alcance.filtrar(consulta, Gasto)
+    if cedis_id:
+        consulta = consulta.where(Gasto.cedis_id == cedis_id)
+    if categoria_id:
+        consulta = consulta.where(Gasto.categoria_id == categoria_id)
+    if fecha_inicio:
+        consulta = consulta.where(Gasto.fecha >= fecha_inicio)
+    if fecha_fin:
+        consulta = consulta.where(Gasto.fecha <= fecha_fin)
+
+    agrupar = por_categoria or subtotales
+    if agrupar:
+        consulta = consulta.order_by(
+            CategoriaGasto.nombre.nullslast(), Gasto.categoria_id.nullslast(), Gasto.fecha, Gasto.id
+        )
+    else:
+        consulta = consulta.order_by(Gasto.fecha, Gasto.id)
+
+    libro = Workbook(write_only=True)
+    usados: set = set()
+    resumen = libro.create_sheet(_nombre_hoja("Resumen", usados)) if por_categoria else None
+    principal = _Hoja(libro, _nombre_hoja("Gastos", usados))
+
+    # categoria_id (None = sin categoría) -> (etiqueta, monto)
+    totales: Dict[Optional[int], Tuple[str, Decimal]] = {}
+    categoria_actual: Optional[int] = None
+    hoja_categoria: Optional[_Hoja] = None
+    total_general = Decimal(0)
+    filas = 0
+
+    def cerrar_categoria():
+        if categoria_actual not in totales:
+            return
+        if subtotales:
+            nombre, monto = totales[categoria_actual]
+            principal.total(f"Subtotal {nombre}", monto)
+            if hoja_categoria is not None:
+                hoja_categoria.total(f"Subtotal {nombre}", monto)
+
+    resultado = db.execute(consulta, execution_options={"stream_results": True}).yield_per(LOTE_LECTURA)
+    for fila in resultado:
+        categoria = fila.categoria_id
+        monto = fila[_COLUMNA_MONTO] or Decimal(0)
+
+        if agrupar and (categoria != categoria_actual or categoria not in totales):
+            cerrar_categoria()
+            categoria_actual = categoria
+            totales[categoria] = (fila[3] or SIN_CATEGORIA, Decimal(0))
+            if por_categoria:
+                hoja_categoria = _Hoja(libro, _nombre_hoja(totales[categoria][0], usados))
+
+        principal.fila(fila)
+        if hoja_categoria is not None:
+            hoja_categoria.fila(fila)
+
+        if agrupar:
+            nombre, subtotal = totales[categoria]
+            totales[categoria] = (nombre, subtotal + monto)
+        total_general += monto
+        filas += 1
+
+    cerrar_categoria()
+    if subtotales:
+        principal.total("Total general", total_general)
+
+    if resumen is not None:
+        resumen.append(["Categoría", "Monto"])
+        for nombre, monto in totales.values():
+            resumen.append([nombre, monto])
+        resumen.append(["Total general", total_general])
+
+    libro.save(ruta)
+    return filas
@@ -0,0 +1,125 @@
+"""
+Idempotency-Key para la creación de eventos y gastos
+
+Los clientes móviles reintentan los POST cuando la conexión falla; con el
+encabezado `Idempotency-Key` el reintento regresa la respuesta original en
+lugar de crear un duplicado.
+
+La clave se reclama con INSERT ... ON CONFLICT en la misma transacción que
+el INSERT del registro, y la respuesta se guarda antes del commit:
+
+- primera solicitud: reclama la clave, crea el registro, guarda la respuesta;
+- reintento: el INSERT no reclama nada y se regresa la respuesta guardada
+  (sin tocar eventos_seguridad ni gastos);
+- duplicados concurrentes: el segundo INSERT espera el candado de la llave
+  primaria hasta que el primero confirma (y entonces repite su respuesta) o
+  se revierte (y entonces reclama la clave él mismo);
+- misma clave con otro cuerpo o en otro endpoint: 422.
+
+Si la solicitud falla, la transacción se revierte con todo y la clave, de
+modo que el reintento se procesa de nuevo. Las claves expiran a las
+IDEMPOTENCIA_TTL_HORAS; una clave expirada se puede reutilizar y una tarea
+de fondo las borra por lotes.
+"""
+
+import asyncio
+import hashlib
+import json
+from typing import Optional
+
+from fastapi import Header, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+
+LONGITUD_MAX = 255
+LOTE_PURGA = 10_000
+
+def clave_idempotencia(idempotency_key: Optional[str] = Header(None)) -> Optional[str]:
+    """Dependencia: encabezado Idempotency-Key (opcional)"""
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= LONGITUD_MAX:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key debe tener de 1 a {LONGITUD_MAX} caracteres")
+    return idempotency_key
+
+def huella(datos: BaseModel) -> str:
+    """SHA-256 del cuerpo normalizado de la solicitud"""
+    cuerpo = json.dumps(jsonable_encoder(datos), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(cuerpo.encode("utf-8")).hexdigest()
+
+def reclamar(db: Session, usuario_id: int, clave: str, ambito: str, datos: BaseModel) -> Optional[JSONResponse]:
+    """Reclamar la clave en la transacción de `db`
+
+    Regresa None si la solicitud debe procesarse, o la respuesta original si
+    es un reintento.
+    """
+    parametros = {"usuario_id": usuario_id, "clave": clave, "ambito": ambito, "huella": huella(datos)}
+    reclamada = db.execute(text("""
+        INSERT INTO claves_idempotencia (usuario_id, clave, ambito, huella, expira_en)
+        VALUES (:usuario_id, :clave, :ambito, :huella, LOCALTIMESTAMP + make_interval(hours => :ttl))
+        ON CONFLICT (usuario_id, clave) DO UPDATE
+        SET ambito = EXCLUDED.ambito, huella = EXCLUDED.huella, estado_http = NULL, respuesta = NULL,
+            expira_en = EXCLUDED.expira_en, created_at = LOCALTIMESTAMP
+        WHERE claves_idempotencia.expira_en < LOCALTIMESTAMP
+        RETURNING 1
+    """), {**parametros, "ttl": settings.IDEMPOTENCIA_TTL_HORAS}).first()
+    if reclamada:
+        return None
+
+    original = db.execute(text("""
+        SELECT ambito, huella, estado_http, respuesta FROM claves_idempotencia
+        WHERE usuario_id = :usuario_id AND clave = :clave
+    """), parametros).one()
+    if original.ambito != ambito or original.huella != parametros["huella"]:
+        raise HTTPException(status_code=422, detail="Idempotency-Key ya se usó con otra solicitud")
+
+    return JSONResponse(
+        content=original.respuesta,
+        status_code=original.estado_http,
+        headers={"Idempotent-Replayed": "true"}
+    )
+
+def guardar_respuesta(db: Session, usuario_id: int, clave: str, respuesta: BaseModel, estado_http: int = 200):
+    """Guardar la respuesta en la clave reclamada (antes del commit)"""
+    db.execute(text("""
+        UPDATE claves_idempotencia SET estado_http = :estado_http, respuesta = CAST(:respuesta AS JSONB)
+        WHERE usuario_id = :usuario_id AND clave = :clave
+    """), {
+        "usuario_id": usuario_id,
+        "clave": clave,
+        "estado_http": estado_http,
+        "respuesta": json.dumps(jsonable_encoder(respuesta))
+    })
+
+def purgar_expiradas(lote: int = LOTE_PURGA) -> int:
+    """Borrar claves expiradas por lotes (SKIP LOCKED: varios workers no se estorban)"""
+    total = 0
+    db = SessionLocal()
+    try:
+        while True:
+            borradas = db.execute(text("""
+                DELETE FROM claves_idempotencia WHERE ctid IN (
+                    SELECT ctid FROM claves_idempotencia
+                    WHERE expira_en < LOCALTIMESTAMP
+                    LIMIT :lote FOR UPDATE SKIP LOCKED
+                )
+            """), {"lote": lote}).rowcount
+            db.commit()
+            total += borradas
+            if borradas < lote:
+                return total
+    finally:
+        db.close()
+
+async def bucle_purga():
+    """Tarea de fondo iniciada en el lifespan de la aplicación"""
+    while True:
+        try:
+            await asyncio.to_thread(purgar_expiradas)
+        except Exception as e:
+            print(f"❌ Error purgando claves de idempotencia: {e}")
+        await asyncio.sleep(settings.IDEMPOTENCIA_PURGA_MINUTOS * 60)
@@ -0,0 +1,71 @@
+"""
+Pipeline de ingesta de noticias monitoreadas
+"""
+
+from sqlalchemy.orm import Session
+
+from app.models import NoticiaMonitoreada
+from app.schemas import NoticiaCreate
+from app.services.deduplicacion import detector, calcular_simhash, a_bigint
+from app.services.clasificador import clasificador
+
+TAMANO_LOTE_CLASIFICACION = 500
+
+def procesar_noticia(db: Session, datos: NoticiaCreate) -> NoticiaMonitoreada:
+    """Registrar una noticia, colapsando duplicados antes del procesamiento costoso"""
+    noticia = NoticiaMonitoreada(**datos.dict())
+    huella = calcular_simhash(_texto_noticia(noticia))
+    noticia.huella_simhash = a_bigint(huella)
+    canonica_id = detector.buscar_canonica(db, huella)
+
+    if canonica_id is not None:
+        # Duplicado: se liga a la noticia canónica y no pasa a clasificación,
+        # geolocalización ni alertas
+        noticia.es_duplicado = True
+        noticia.noticia_canonica_id = canonica_id
+        db.add(noticia)
+        db.query(NoticiaMonitoreada).filter(NoticiaMonitoreada.id == canonica_id).update(
+            {NoticiaMonitoreada.total_duplicados: NoticiaMonitoreada.total_duplicados + 1},
+            synchronize_session=False
+        )
+        db.commit()
+        db.refresh(noticia)
+        return noticia
+
+    for campo, valor in clasificador.clasificar(_texto_noticia(noticia)).items():
+        setattr(noticia, campo, valor)
+    
+    db.add(noticia)
+    db.commit()
+    db.refresh(noticia)
+    detector.registrar(noticia.id, huella)
+    return noticia
+
+def reclasificar_noticias(db: Session, solo_pendientes: bool = True) -> int:
+    """Reclasificar noticias canónicas por lotes (p. ej. tras cambiar diccionarios)"""
+    query = db.query(NoticiaMonitoreada).filter(NoticiaMonitoreada.es_duplicado == False)
+    if solo_pendientes:
+        query = query.filter(NoticiaMonitoreada.tipo_alerta.is_(None))
+    
+    total = 0
+    ultimo_id = 0
+    while True:
+        lote = query.filter(NoticiaMonitoreada.id > ultimo_id).order_by(
+            NoticiaMonitoreada.id
+        ).limit(TAMANO_LOTE_CLASIFICACION).all()
+        if not lote:
+            break
+        
+        resultados = clasificador.clasificar_lote(_texto_noticia(n) for n in lote)
+        for noticia, resultado in zip(lote, resultados):
+            for campo, valor in resultado.items():
+                setattr(noticia, campo, valor)
+        db.commit()
+        
+        total += len(lote)
+        ultimo_id = lote[-1].id
+    
+    return total
+
+def _texto_noticia(noticia: NoticiaMonitoreada) -> str:
+    return f"{noticia.titulo} {noticia.contenido or ''}"
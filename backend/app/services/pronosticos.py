@@ -0,0 +1,216 @@
+"""
+Pronóstico mensual de gastos por CEDIS y categoría
+
+Cada serie (CEDIS × categoría) es el total mensual de gastos de los últimos
+GASTOS_PRONOSTICO_MESES_HISTORIA meses completos. El modelo es una regresión
+lineal por serie cuyo diseño depende solo de cuántos meses tiene la serie:
+
+- 24 meses o más: nivel + tendencia + efecto de cada mes del año;
+- de 6 a 23: nivel + tendencia;
+- de 3 a 5: promedio.
+
+Como todas las series terminan en el mismo mes, las que tienen la misma
+longitud comparten la matriz de diseño y se ajustan juntas con un solo
+`np.linalg.lstsq` (a lo más un ajuste por longitud, no uno por serie). El
+error estándar del pronóstico es σ·√(1 + x'(X'X)⁻¹x), también compartido
+por grupo.
+
+Los coeficientes y el pronóstico se guardan en modelos_gasto. Cada
+actualización reajusta solo las series tocadas desde el ajuste anterior
+(gastos_series_tocadas, que llenan triggers de gastos con la llave anterior
+y la nueva de cada fila: un gasto movido o borrado también reajusta la
+serie de donde salió); al empezar un mes se reajustan todas.
+"""
+
+import asyncio
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models import ModeloGasto
+
+# Llave del advisory lock: solo un worker ajusta a la vez
+_LOCK_PRONOSTICOS = 730_002
+
+MESES_MIN = 3
+MESES_TENDENCIA = 6
+MESES_ESTACIONAL = 24
+
+# Una fila por serie: meses (desplazamiento desde :mes_desde) y totales como arreglos
+_SQL_MENSUAL = """
+    SELECT cedis_id, categoria_id, max(organizacion_id) AS organizacion_id,
+           array_agg(columna) AS columnas, array_agg(total) AS totales
+    FROM (
+        SELECT g.cedis_id, g.categoria_id, max(g.organizacion_id) AS organizacion_id,
+               (EXTRACT(YEAR FROM g.fecha) * 12 + EXTRACT(MONTH FROM g.fecha))::int - 1 - :mes_desde AS columna,
+               sum(g.monto_total)::float AS total
+        FROM gastos g
+        WHERE g.fecha >= :desde AND g.fecha < :hasta
+          AND g.cedis_id IS NOT NULL AND g.categoria_id IS NOT NULL {filtro}
+        GROUP BY 1, 2, 4
+    ) mensual
+    GROUP BY 1, 2
+    ORDER BY 1, 2
+"""
+
+_FILTRO_SERIES = """
+          AND (g.cedis_id, g.categoria_id) IN (
+              SELECT * FROM unnest(CAST(:cedis AS int[]), CAST(:categorias AS int[]))
+          )"""
+
+def numero_mes(fecha: date) -> int:
+    """Número absoluto de mes (año·12 + mes - 1)"""
+    return fecha.year * 12 + fecha.month - 1
+
+def fecha_mes(mes: int) -> date:
+    return date(mes // 12, mes % 12 + 1, 1)
+
+def _diseno(absolutos: np.ndarray, origen: int, modelo: str) -> np.ndarray:
+    """Matriz de diseño para los meses absolutos dados (t = 0 en `origen`)"""
+    columnas = [np.ones(len(absolutos))]
+    if modelo != "promedio":
+        columnas.append((absolutos - origen) / 12.0)  # tendencia por año
+    if modelo == "estacional":
+        mes_del_anio = absolutos % 12
+        columnas.extend((mes_del_anio == m).astype(float) for m in range(1, 12))
+    return np.column_stack(columnas)
+
+def _modelo(meses: int) -> str:
+    if meses >= MESES_ESTACIONAL:
+        return "estacional"
+    if meses >= MESES_TENDENCIA:
+        return "tendencia"
+    return "promedio"
+
+def ajustar(totales: np.ndarray, inicios: np.ndarray, mes_base: int, horizonte: int) -> Dict[str, list]:
+    """Ajustar todas las series a la vez
+
+    `totales` es (series × meses) y termina en el mes anterior a `mes_base`;
+    `inicios[i]` es la primera columna con gastos de la serie i (las
+    anteriores no cuentan como ceros). Regresa listas alineadas con las
+    series: modelo, meses, coeficientes, sigma, pronostico y error
+    (series con menos de MESES_MIN meses quedan en None).
+    """
+    series, columnas = totales.shape
+    resultado = {clave: [None] * series for clave in ("modelo", "meses", "coeficientes", "sigma", "pronostico", "error")}
+    futuros = np.arange(mes_base, mes_base + horizonte)
+
+    longitudes = columnas - inicios
+    for meses in np.unique(longitudes[longitudes >= MESES_MIN]).tolist():
+        grupo = np.flatnonzero(longitudes == meses)
+        modelo = _modelo(meses)
+        origen = mes_base - meses
+        x = _diseno(np.arange(origen, mes_base), origen, modelo)
+        y = totales[grupo, columnas - meses:].T  # (meses × series del grupo)
+
+        beta = np.linalg.lstsq(x, y, rcond=None)[0]
+        residuos = y - x @ beta
+        libres = max(meses - x.shape[1], 1)
+        sigma = np.sqrt((residuos ** 2).sum(axis=0) / libres)
+
+        xf = _diseno(futuros, origen, modelo)
+        inversa = np.linalg.pinv(x.T @ x)
+        apalancamiento = np.einsum("hp,pq,hq->h", xf, inversa, xf)
+        pronostico = np.maximum(xf @ beta, 0.0).T  # (series × horizonte)
+        error = sigma[:, None] * np.sqrt(1.0 + apalancamiento)[None, :]
+
+        for posicion, serie in enumerate(grupo.tolist()):
+            resultado["modelo"][serie] = modelo
+            resultado["meses"][serie] = meses
+            resultado["coeficientes"][serie] = beta[:, posicion].tolist()
+            resultado["sigma"][serie] = float(sigma[posicion])
+            resultado["pronostico"][serie] = pronostico[posicion].tolist()
+            resultado["error"][serie] = error[posicion].tolist()
+    return resultado
+
+def _series_modificadas(db: Session) -> List[Tuple[int, int]]:
+    """Consumir las series tocadas (vuelven a la tabla si la transacción se deshace)"""
+    return [tuple(fila) for fila in db.execute(text(
+        "DELETE FROM gastos_series_tocadas RETURNING cedis_id, categoria_id"
+    ))]
+
+def actualizar_pronosticos(db: Session, hoy: Optional[date] = None, todas: bool = False) -> dict:
+    """Reajustar las series modificadas (o todas si cambió el mes) en la transacción de `db`"""
+    hoy = hoy or date.today()
+    if not db.execute(text("SELECT pg_try_advisory_xact_lock(:llave)"), {"llave": _LOCK_PRONOSTICOS}).scalar():
+        return {"omitido": True}
+
+    mes_base = numero_mes(hoy)
+    mes_ajustado = db.execute(text("SELECT min(mes_base) FROM modelos_gasto")).scalar()
+    todas = todas or mes_ajustado is None or numero_mes(mes_ajustado) != mes_base
+
+    parametros = {}
+    filtro = ""
+    if todas:
+        db.execute(text("DELETE FROM gastos_series_tocadas"))
+    else:
+        modificadas = _series_modificadas(db)
+        if not modificadas:
+            return {"series": 0, "ajustadas": 0}
+        filtro = _FILTRO_SERIES
+        parametros = {"cedis": [c for c, _ in modificadas], "categorias": [c for _, c in modificadas]}
+
+    meses = settings.GASTOS_PRONOSTICO_MESES_HISTORIA
+    mes_desde = mes_base - meses
+    filas = db.execute(text(_SQL_MENSUAL.format(filtro=filtro)), {
+        **parametros,
+        "mes_desde": mes_desde,
+        "desde": fecha_mes(mes_desde),
+        "hasta": fecha_mes(mes_base)
+    }).all()
+
+    totales = np.zeros((len(filas), meses))
+    for renglon, fila in enumerate(filas):
+        totales[renglon, fila.columnas] = fila.totales
+    inicios = np.array([min(fila.columnas) for fila in filas], dtype=np.int64)
+    ajuste = ajustar(totales, inicios, mes_base, settings.GASTOS_PRONOSTICO_HORIZONTE)
+
+    # Las series sin gastos recientes (o con muy pocos meses) se quitan
+    if todas:
+        db.execute(text("DELETE FROM modelos_gasto"))
+    else:
+        db.execute(text(f"DELETE FROM modelos_gasto g WHERE true {_FILTRO_SERIES}"), parametros)
+
+    registros = [
+        {
+            "cedis_id": fila.cedis_id,
+            "categoria_id": fila.categoria_id,
+            "organizacion_id": fila.organizacion_id,
+            "mes_base": fecha_mes(mes_base),
+            "meses_historia": ajuste["meses"][i],
+            "modelo": ajuste["modelo"][i],
+            "coeficientes": ajuste["coeficientes"][i],
+            "sigma": ajuste["sigma"][i],
+            "pronostico": ajuste["pronostico"][i],
+            "error_estandar": ajuste["error"][i],
+        }
+        for i, fila in enumerate(filas) if ajuste["modelo"][i] is not None
+    ]
+    if registros:
+        db.execute(insert(ModeloGasto), registros)
+    return {"series": len(filas), "ajustadas": len(registros), "todas": todas}
+
+def ejecutar_actualizacion(todas: bool = False) -> dict:
+    db = SessionLocal()
+    try:
+        resultado = actualizar_pronosticos(db, todas=todas)
+        db.commit()
+        return resultado
+    finally:
+        db.close()
+
+async def bucle_pronosticos():
+    """Tarea de fondo iniciada en el lifespan de la aplicación"""
+    while True:
+        try:
+            resultado = await asyncio.to_thread(ejecutar_actualizacion)
+            if resultado.get("ajustadas"):
+                print(f"📈 Pronósticos de gastos actualizados: {resultado}")
+        except Exception as e:
+            print(f"❌ Error actualizando pronósticos de gastos: {e}")
+        await asyncio.sleep(settings.GASTOS_PRONOSTICO_MINUTOS * 60)
@@ -0,0 +1,352 @@
+"""
+Generación de reportes ejecutivos en segundo plano
+
+La API solo registra la solicitud en reportes_generados (estado
+'Generando') y la envía a un pool acotado de procesos, de modo que el
+render de reportes grandes no ocupa a los workers de la API. Cada proceso
+lee los datos con consultas agregadas (el detalle de eventos con cursor del
+lado del servidor), escribe el archivo por partes en REPORTES_DIR y
+actualiza la fila con el resultado.
+
+Una solicitud idéntica a otra que sigue en proceso reutiliza la existente
+en lugar de generar el reporte dos veces. Formatos soportados: HTML y XLSX.
+"""
+
+import html
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from openpyxl import Workbook
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models import ReporteGenerado
+
+TIPOS_REPORTE = ["Ejecutivo CEDIS", "Ejecutivo Organización"]
+FORMATOS = {"HTML": "html", "XLSX": "xlsx"}
+
+MESES = [
+    "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
+    "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"
+]
+
+_LOTE_DETALLE = 1000
+
+class ColaReportesLlena(Exception):
+    """Hay demasiados reportes pendientes en este worker"""
+
+# ============ DATOS ============
+
+Seccion = Tuple[str, List[str], Iterable[tuple]]
+
+def _periodo(año: int, mes: int) -> Tuple[date, date]:
+    inicio = date(año, mes, 1)
+    fin = date(año + 1, 1, 1) if mes == 12 else date(año, mes + 1, 1)
+    return inicio, fin
+
+def _secciones(db: Session, cedis_ids: List[int], año: int, mes: int) -> List[Seccion]:
+    """Secciones del reporte; el detalle de eventos se lee por lotes"""
+    inicio, fin = _periodo(año, mes)
+    parametros = {
+        "ids": cedis_ids, "inicio": inicio, "fin": fin,
+        "inicio_año": date(año, 1, 1), "año": año, "mes": mes
+    }
+
+    resumen = db.execute(text("""
+        SELECT c.codigo, c.nombre, c.municipio,
+               COALESCE(ev.total, 0),
+               COALESCE(g.total, 0),
+               COALESCE(ga.total, 0),
+               CASE WHEN ex.cumple THEN 'Sí' ELSE 'No' END,
+               COALESCE(p.estatus, 'Pendiente'),
+               p.fecha_vencimiento,
+               COALESCE(r.nivel_riesgo, 'Sin datos')
+        FROM cedis c
+        LEFT JOIN (
+            SELECT cedis_id, COUNT(*) AS total FROM eventos_seguridad
+            WHERE cedis_id = ANY(:ids) AND fecha >= :inicio AND fecha < :fin
+            GROUP BY cedis_id
+        ) ev ON ev.cedis_id = c.id
+        LEFT JOIN (
+            SELECT cedis_id, SUM(monto_total) AS total FROM gastos
+            WHERE cedis_id = ANY(:ids) AND fecha >= :inicio AND fecha < :fin
+            GROUP BY cedis_id
+        ) g ON g.cedis_id = c.id
+        LEFT JOIN (
+            SELECT cedis_id, SUM(monto_total) AS total FROM gastos
+            WHERE cedis_id = ANY(:ids) AND fecha >= :inicio_año AND fecha < :fin
+            GROUP BY cedis_id
+        ) ga ON ga.cedis_id = c.id
+        LEFT JOIN extintores ex ON ex.cedis_id = c.id
+        LEFT JOIN pipc p ON p.cedis_id = c.id
+        LEFT JOIN riesgo_delictivo_cedis r ON r.cedis_id = c.id AND r.año = :año AND r.mes = :mes
+        WHERE c.id = ANY(:ids)
+        ORDER BY c.nombre
+    """), parametros).all()
+
+    eventos_tipo = db.execute(text("""
+        SELECT tipo_evento, COUNT(*) FROM eventos_seguridad
+        WHERE cedis_id = ANY(:ids) AND fecha >= :inicio AND fecha < :fin
+        GROUP BY tipo_evento
+        ORDER BY 2 DESC
+    """), parametros).all()
+
+    gastos_categoria = db.execute(text("""
+        SELECT COALESCE(cg.nombre, 'Sin categoría'), COUNT(*), SUM(g.monto_total)
+        FROM gastos g
+        LEFT JOIN categorias_gasto cg ON cg.id = g.categoria_id
+        WHERE g.cedis_id = ANY(:ids) AND g.fecha >= :inicio AND g.fecha < :fin
+        GROUP BY cg.nombre
+        ORDER BY 3 DESC
+    """), parametros).all()
+
+    detalle = db.execute(text("""
+        SELECT e.fecha, c.nombre, e.tipo_evento, e.estatus, e.descripcion
+        FROM eventos_seguridad e
+        JOIN cedis c ON c.id = e.cedis_id
+        WHERE e.cedis_id = ANY(:ids) AND e.fecha >= :inicio AND e.fecha < :fin
+        ORDER BY e.fecha
+    """), parametros, execution_options={"stream_results": True}).yield_per(_LOTE_DETALLE)
+
+    return [
+        ("Resumen por CEDIS", [
+            "Código", "CEDIS", "Municipio", "Eventos", "Gastos del mes", "Gastos del año",
+            "Extintores cumple", "PIPC", "Vencimiento PIPC", "Riesgo delictivo"
+        ], resumen),
+        ("Eventos por tipo", ["Tipo de evento", "Total"], eventos_tipo),
+        ("Gastos por categoría", ["Categoría", "Registros", "Monto"], gastos_categoria),
+        ("Detalle de eventos", ["Fecha", "CEDIS", "Tipo", "Estatus", "Descripción"], detalle),
+    ]
+
+# ============ RENDER ============
+
+def _texto(valor) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, Decimal):
+        return f"{valor:,.2f}"
+    if isinstance(valor, datetime):
+        return valor.strftime("%d/%m/%Y %H:%M")
+    if isinstance(valor, date):
+        return valor.strftime("%d/%m/%Y")
+    return str(valor)
+
+def _escribir_html(ruta: str, titulo: str, secciones: List[Seccion]):
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        archivo.write(
+            "<!DOCTYPE html><html lang=\"es\"><head><meta charset=\"utf-8\">"
+            f"<title>{html.escape(titulo)}</title><style>"
+            "body{font-family:Arial,sans-serif;margin:24px;color:#222}"
+            "table{border-collapse:collapse;width:100%;margin-bottom:24px;font-size:12px}"
+            "th,td{border:1px solid #ccc;padding:4px 6px;text-align:left}"
+            "th{background:#1f4e79;color:#fff}"
+            "</style></head><body>"
+            f"<h1>{html.escape(titulo)}</h1>"
+            f"<p>Generado el {datetime.now():%d/%m/%Y %H:%M}</p>"
+        )
+        for nombre, columnas, filas in secciones:
+            archivo.write(f"<h2>{html.escape(nombre)}</h2><table><tr>")
+            archivo.write("".join(f"<th>{html.escape(c)}</th>" for c in columnas))
+            archivo.write("</tr>")
+            for fila in filas:
+                archivo.write("<tr>" + "".join(f"<td>{html.escape(_texto(v))}</td>" for v in fila) + "</tr>")
+            archivo.write("</table>")
+        archivo.write("</body></html>")
+
+def _celda(valor):
+    return float(valor) if isinstance(valor, Decimal) else valor
+
+def _escribir_xlsx(ruta: str, titulo: str, secciones: List[Seccion]):
+    # write_only: las filas se vuelcan a disco conforme se agregan
+    libro = Workbook(write_only=True)
+    portada = libro.create_sheet("Reporte")
+    portada.append([titulo])
+    portada.append([f"Generado el {datetime.now():%d/%m/%Y %H:%M}"])
+
+    for nombre, columnas, filas in secciones:
+        hoja = libro.create_sheet(nombre[:31])
+        hoja.append(columnas)
+        for fila in filas:
+            hoja.append([_celda(v) for v in fila])
+
+    libro.save(ruta)
+
+_RENDERS = {"HTML": _escribir_html, "XLSX": _escribir_xlsx}
+
+# ============ WORKER ============
+
+def titulo_reporte(nombre: str, año: int, mes: int) -> str:
+    return f"Reporte ejecutivo {nombre} - {MESES[mes - 1]} {año}"
+
+def ruta_reporte(reporte: ReporteGenerado) -> str:
+    return os.path.join(settings.REPORTES_DIR, f"{reporte.uuid}.{FORMATOS[reporte.formato]}")
+
+def generar_reporte(reporte_id: int, año: int, mes: int) -> dict:
+    """Punto de entrada del proceso worker: generar el archivo y actualizar la fila"""
+    db = SessionLocal()
+    reporte = db.get(ReporteGenerado, reporte_id)
+    ruta = ruta_reporte(reporte)
+    temporal = ruta + ".part"
+
+    try:
+        if reporte.cedis_id:
+            cedis_ids = [reporte.cedis_id]
+        else:
+            cedis_ids = list(db.execute(text(
+                "SELECT id FROM cedis WHERE organizacion_id = :organizacion_id AND activo = TRUE"
+            ), {"organizacion_id": reporte.organizacion_id}).scalars())
+
+        os.makedirs(settings.REPORTES_DIR, exist_ok=True)
+        _RENDERS[reporte.formato](temporal, reporte.titulo, _secciones(db, cedis_ids, año, mes))
+        os.replace(temporal, ruta)
+
+        reporte.estado = "Completado"
+        reporte.url_archivo = f"/api/reportes/{reporte.id}/descarga"
+        reporte.tamaño_bytes = os.path.getsize(ruta)
+        db.commit()
+        return {"id": reporte_id, "estado": reporte.estado}
+
+    except Exception as e:
+        db.rollback()
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        reporte.estado = "Error"
+        reporte.error_mensaje = str(e)[:1000]
+        db.commit()
+        return {"id": reporte_id, "estado": reporte.estado}
+    finally:
+        db.close()
+
+# ============ COLA ============
+
+def _marcar_error(reporte_id: int, mensaje: str):
+    db = SessionLocal()
+    try:
+        db.query(ReporteGenerado).filter(
+            ReporteGenerado.id == reporte_id,
+            ReporteGenerado.estado == "Generando"
+        ).update({"estado": "Error", "error_mensaje": mensaje}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def marcar_interrumpidos(db: Session) -> int:
+    """Reportes que quedaron en 'Generando' más del tiempo máximo (p. ej. reinicio)"""
+    limite = timedelta(minutes=settings.REPORTES_TIEMPO_MAX_MINUTOS)
+    total = db.query(ReporteGenerado).filter(
+        ReporteGenerado.estado == "Generando",
+        ReporteGenerado.created_at < func.now() - limite
+    ).update({"estado": "Error", "error_mensaje": "Generación interrumpida"}, synchronize_session=False)
+    db.commit()
+    return total
+
+class ColaReportes:
+    """Pool de procesos acotado con límite de solicitudes pendientes"""
+
+    def __init__(self, workers: int, max_pendientes: int):
+        self.workers = workers
+        self.max_pendientes = max_pendientes
+        self._ejecutor: Optional[ProcessPoolExecutor] = None
+        self._en_curso: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+
+    def pendientes(self) -> int:
+        return len(self._en_curso)
+
+    def _obtener_ejecutor(self) -> ProcessPoolExecutor:
+        if self._ejecutor is None:
+            self._ejecutor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._ejecutor
+
+    def solicitar(
+        self,
+        db: Session,
+        tipo_reporte: str,
+        formato: str,
+        titulo: str,
+        año: int,
+        mes: int,
+        organizacion_id: Optional[int],
+        cedis_id: Optional[int],
+        usuario_id: Optional[int],
+        automatico: bool = False
+    ) -> Tuple[ReporteGenerado, bool]:
+        """Registrar y encolar un reporte; regresa (reporte, reutilizado)"""
+        # Serializar solicitudes idénticas entre workers de la API
+        llave = f"{tipo_reporte}|{formato}|{organizacion_id}|{cedis_id}|{titulo}"
+        db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:llave))"), {"llave": llave})
+
+        limite = timedelta(minutes=settings.REPORTES_TIEMPO_MAX_MINUTOS)
+        existente = db.query(ReporteGenerado).filter(
+            ReporteGenerado.tipo_reporte == tipo_reporte,
+            ReporteGenerado.formato == formato,
+            ReporteGenerado.titulo == titulo,
+            ReporteGenerado.organizacion_id.is_not_distinct_from(organizacion_id),
+            ReporteGenerado.cedis_id.is_not_distinct_from(cedis_id),
+            ReporteGenerado.estado == "Generando",
+            ReporteGenerado.created_at >= func.now() - limite
+        ).first()
+        if existente:
+            db.commit()
+            return existente, True
+
+        if self.pendientes() >= self.max_pendientes:
+            db.rollback()
+            raise ColaReportesLlena()
+
+        reporte = ReporteGenerado(
+            tipo_reporte=tipo_reporte,
+            titulo=titulo,
+            organizacion_id=organizacion_id,
+            cedis_id=cedis_id,
+            formato=formato,
+            estado="Generando",
+            generado_por_usuario_id=usuario_id,
+            generado_automaticamente=automatico
+        )
+        db.add(reporte)
+        db.commit()
+        db.refresh(reporte)
+
+        with self._lock:
+            try:
+                futuro = self._obtener_ejecutor().submit(generar_reporte, reporte.id, año, mes)
+            except BrokenProcessPool:
+                self._ejecutor = None
+                futuro = self._obtener_ejecutor().submit(generar_reporte, reporte.id, año, mes)
+            self._en_curso[reporte.id] = futuro
+        futuro.add_done_callback(partial(self._terminado, reporte.id))
+        return reporte, False
+
+    def _terminado(self, reporte_id: int, futuro: Future):
+        with self._lock:
+            self._en_curso.pop(reporte_id, None)
+        if futuro.cancelled():
+            return
+        error = futuro.exception()
+        if error is not None:
+            # El proceso murió antes de poder registrar el error
+            if isinstance(error, BrokenProcessPool):
+                with self._lock:
+                    self._ejecutor = None
+            _marcar_error(reporte_id, f"Fallo del proceso de generación: {error}")
+
+    def cerrar(self):
+        with self._lock:
+            ejecutor, self._ejecutor = self._ejecutor, None
+        if ejecutor is not None:
+            ejecutor.shutdown(wait=False, cancel_futures=True)
+
+cola_reportes = ColaReportes(settings.REPORTES_WORKERS, settings.REPORTES_MAX_PENDIENTES)
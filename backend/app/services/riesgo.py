@@ -0,0 +1,119 @@
+"""
+Cálculo del riesgo delictivo por CEDIS
+
+Une cada CEDIS con los índices del SESNSP de su municipio (llave normalizada
+indexada) y calcula, para todos los CEDIS a la vez sobre una matriz
+(CEDIS x meses), las sumas móviles de 3, 6 y 12 meses y las variaciones
+anuales. El resultado se guarda en riesgo_delictivo_cedis para que las
+pantallas de riesgo lean filas precalculadas.
+"""
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models import RiesgoDelictivoCEDIS
+
+VENTANAS_MESES = (3, 6, 12)
+
+# Umbrales mensuales de robo a negocio + extorsión (mismos que v_riesgo_delictivo_cedis)
+NIVELES_RIESGO = [(50, "CRÍTICO"), (20, "ALTO"), (5, "MEDIO")]
+
+def _sumas_moviles(acumulada: np.ndarray, ventana: int) -> np.ndarray:
+    """Suma de los últimos `ventana` meses para cada columna a partir de la suma acumulada"""
+    n_meses = acumulada.shape[1] - 1
+    fin = np.arange(1, n_meses + 1)
+    inicio = np.maximum(fin - ventana, 0)
+    return acumulada[:, fin] - acumulada[:, inicio]
+
+def _variacion_pct(actual: np.ndarray, anterior: np.ndarray) -> np.ndarray:
+    """Variación porcentual; NaN si no hay base de comparación"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(anterior > 0, (actual - anterior) / anterior * 100, np.nan)
+
+def _desfasar(matriz: np.ndarray, meses: int) -> np.ndarray:
+    """Valores de `meses` atrás para cada columna (NaN al inicio)"""
+    resultado = np.full(matriz.shape, np.nan)
+    resultado[:, meses:] = matriz[:, :-meses]
+    return resultado
+
+def recalcular_riesgo(db: Session) -> int:
+    """Recalcular la tabla riesgo_delictivo_cedis completa"""
+    filas = db.execute(text("""
+        SELECT
+            c.id AS cedis_id,
+            i.año,
+            i.mes,
+            COALESCE(i.robo_negocio, 0) + COALESCE(i.robo_vehiculo, 0) +
+            COALESCE(i.robo_transporte, 0) + COALESCE(i.robo_mercancia, 0) +
+            COALESCE(i.extorsion, 0) AS delitos_relevantes,
+            COALESCE(i.robo_negocio, 0) + COALESCE(i.extorsion, 0) AS indice_impacto
+        FROM cedis c
+        JOIN indices_delictivos i ON
+            i.estado_id = c.estado_id AND
+            i.municipio_norm = c.municipio_norm
+        WHERE c.activo = TRUE
+    """)).all()
+
+    db.query(RiesgoDelictivoCEDIS).delete(synchronize_session=False)
+    if not filas:
+        db.commit()
+        return 0
+
+    datos = np.array(filas, dtype=np.int64)
+    cedis_ids, fila_cedis = np.unique(datos[:, 0], return_inverse=True)
+    periodo = datos[:, 1] * 12 + (datos[:, 2] - 1)
+    primer_periodo = periodo.min()
+    columna = periodo - primer_periodo
+    n_meses = columna.max() + 1
+
+    # Matrices CEDIS x meses; los meses sin dato cuentan como cero
+    relevantes = np.zeros((len(cedis_ids), n_meses), dtype=np.int64)
+    impacto = np.zeros_like(relevantes)
+    cargado = np.zeros(relevantes.shape, dtype=bool)
+    np.add.at(relevantes, (fila_cedis, columna), datos[:, 3])
+    np.add.at(impacto, (fila_cedis, columna), datos[:, 4])
+    cargado[fila_cedis, columna] = True
+
+    acumulada = np.concatenate(
+        [np.zeros((len(cedis_ids), 1), dtype=np.int64), np.cumsum(relevantes, axis=1)],
+        axis=1
+    )
+    sumas = {v: _sumas_moviles(acumulada, v) for v in VENTANAS_MESES}
+    suma_12m_anterior = _desfasar(sumas[12].astype(float), 12)
+    variacion_anual = _variacion_pct(sumas[12], suma_12m_anterior)
+    variacion_mes_anual = _variacion_pct(relevantes, _desfasar(relevantes.astype(float), 12))
+
+    umbrales = [impacto > umbral for umbral, _ in NIVELES_RIESGO]
+    nivel = np.select(umbrales, [n for _, n in NIVELES_RIESGO], default="BAJO")
+
+    filas_i, filas_j = np.nonzero(cargado)
+    periodos = primer_periodo + filas_j
+
+    def _entero(valor):
+        return None if np.isnan(valor) else int(valor)
+
+    def _decimal(valor):
+        return None if np.isnan(valor) else round(float(valor), 2)
+
+    registros = [
+        {
+            "cedis_id": int(cedis_ids[i]),
+            "año": int(p // 12),
+            "mes": int(p % 12 + 1),
+            "delitos_relevantes": int(relevantes[i, j]),
+            "indice_impacto": int(impacto[i, j]),
+            "suma_3m": int(sumas[3][i, j]),
+            "suma_6m": int(sumas[6][i, j]),
+            "suma_12m": int(sumas[12][i, j]),
+            "suma_12m_anterior": _entero(suma_12m_anterior[i, j]),
+            "variacion_anual": _decimal(variacion_anual[i, j]),
+            "variacion_mes_anual": _decimal(variacion_mes_anual[i, j]),
+            "nivel_riesgo": str(nivel[i, j])
+        }
+        for i, j, p in zip(filas_i, filas_j, periodos)
+    ]
+
+    db.bulk_insert_mappings(RiesgoDelictivoCEDIS, registros)
+    db.commit()
+    return len(registros)
@@ -0,0 +1,202 @@
+"""
+Registro de sesiones y revocación de tokens
+
+Cada token emitido se registra en `sesiones` con su hash SHA-256. La
+revocación se verifica contra un conjunto en memoria (O(1), sin consulta
+por petición) que un hilo de fondo mantiene sincronizado:
+
+- al iniciar carga las sesiones revocadas que aún no expiran;
+- escucha `NOTIFY sesiones_revocadas` para aplicar revocaciones de otros
+  workers de inmediato, y además consulta incrementalmente por
+  `revocado_en` cada SESIONES_SINCRONIZACION_SEGUNDOS;
+- periódicamente compacta: borra de la tabla las sesiones expiradas y las
+  saca del conjunto (un token expirado ya lo rechaza la validación del JWT).
+"""
+
+import hashlib
+import select
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.models.usuario import Sesion
+
+CANAL_REVOCACION = "sesiones_revocadas"
+
+# Traslape de la consulta incremental para no perder revocaciones de
+# transacciones que confirmaron después con un revocado_en anterior
+_TRASLAPE = timedelta(seconds=60)
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+class RegistroSesiones:
+    """Conjunto en memoria de tokens revocados (token_hash -> valido_hasta)"""
+
+    def __init__(self, intervalo: float, intervalo_compactacion: float):
+        self.intervalo = intervalo
+        self.intervalo_compactacion = intervalo_compactacion
+        self._revocados: Dict[str, datetime] = {}
+        self._marca: Optional[datetime] = None
+        self._cargado = False
+        self._lock = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self._revocados)
+
+    def revocada(self, token_hash: str) -> bool:
+        if not self._cargado:
+            self.sincronizar()
+        return token_hash in self._revocados
+
+    def marcar_revocadas(self, filas):
+        """Agregar (token_hash, valido_hasta) al conjunto local"""
+        with self._lock:
+            for token_hash, valido_hasta in filas:
+                self._revocados[token_hash] = valido_hasta
+
+    def sincronizar(self):
+        """Traer las revocaciones nuevas desde la tabla"""
+        db = SessionLocal()
+        try:
+            if self._marca is None:
+                filas = db.execute(text("""
+                    SELECT token_hash, valido_hasta, revocado_en FROM sesiones
+                    WHERE revocado_en IS NOT NULL AND valido_hasta > :ahora
+                """), {"ahora": datetime.utcnow()}).all()
+                marca = db.execute(text("SELECT LOCALTIMESTAMP")).scalar()
+            else:
+                filas = db.execute(text("""
+                    SELECT token_hash, valido_hasta, revocado_en FROM sesiones
+                    WHERE revocado_en > :desde
+                """), {"desde": self._marca - _TRASLAPE}).all()
+                marca = max([self._marca] + [f.revocado_en for f in filas])
+        finally:
+            db.close()
+
+        self.marcar_revocadas((f.token_hash, f.valido_hasta) for f in filas)
+        self._marca = marca
+        self._cargado = True
+
+    def compactar(self) -> int:
+        """Borrar sesiones expiradas de la tabla y del conjunto en memoria"""
+        ahora = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            borradas = db.execute(
+                text("DELETE FROM sesiones WHERE valido_hasta < :ahora"), {"ahora": ahora}
+            ).rowcount
+            db.commit()
+        finally:
+            db.close()
+
+        with self._lock:
+            expirados = [h for h, valido_hasta in self._revocados.items() if valido_hasta < ahora]
+            for token_hash in expirados:
+                del self._revocados[token_hash]
+        return borradas
+
+    def iniciar(self):
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ejecutar, name="registro-sesiones", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(self.intervalo + 5)
+            self._hilo = None
+
+    def _escuchar(self):
+        """Conexión dedicada (fuera del pool) con LISTEN al canal de revocación"""
+        conexion = engine.raw_connection()
+        conexion.detach()
+        conexion.dbapi_connection.autocommit = True
+        conexion.cursor().execute(f"LISTEN {CANAL_REVOCACION}")
+        return conexion.dbapi_connection
+
+    def _ejecutar(self):
+        conexion = None
+        ultima_compactacion = time.monotonic()
+
+        while not self._detener.is_set():
+            try:
+                if conexion is None:
+                    conexion = self._escuchar()
+                    self.sincronizar()
+
+                listos, _, _ = select.select([conexion], [], [], self.intervalo)
+                if listos:
+                    conexion.poll()
+                    conexion.notifies.clear()
+                self.sincronizar()
+
+                if time.monotonic() - ultima_compactacion >= self.intervalo_compactacion:
+                    ultima_compactacion = time.monotonic()
+                    self.compactar()
+            except Exception as e:
+                print(f"⚠️ Error sincronizando sesiones: {e}")
+                if conexion is not None:
+                    conexion.close()
+                    conexion = None
+                self._detener.wait(self.intervalo)
+
+        if conexion is not None:
+            conexion.close()
+
+registro_sesiones = RegistroSesiones(
+    settings.SESIONES_SINCRONIZACION_SEGUNDOS,
+    settings.SESIONES_COMPACTACION_MINUTOS * 60
+)
+
+def registrar_sesion(
+    db: Session,
+    usuario_id: int,
+    token: str,
+    valido_hasta: datetime,
+    ip_address: Optional[str] = None,
+    user_agent: Optional[str] = None
+):
+    """Registrar un token emitido"""
+    sesion = Sesion(
+        usuario_id=usuario_id,
+        token_hash=hash_token(token),
+        ip_address=ip_address,
+        user_agent=user_agent,
+        valido_hasta=valido_hasta
+    )
+    db.add(sesion)
+    return sesion
+
+def _revocar(db: Session, condicion: str, parametros: dict) -> List[int]:
+    filas = db.execute(text(f"""
+        UPDATE sesiones SET revocado_en = LOCALTIMESTAMP
+        WHERE {condicion} AND revocado_en IS NULL AND valido_hasta > :ahora
+        RETURNING id, token_hash, valido_hasta
+    """), {**parametros, "ahora": datetime.utcnow()}).all()
+    if filas:
+        db.execute(text("SELECT pg_notify(:canal, '')"), {"canal": CANAL_REVOCACION})
+    db.commit()
+
+    # Este worker aplica la revocación sin esperar la sincronización
+    registro_sesiones.marcar_revocadas((f.token_hash, f.valido_hasta) for f in filas)
+    return [f.id for f in filas]
+
+def revocar_token(db: Session, token: str) -> List[int]:
+    return _revocar(db, "token_hash = :token_hash", {"token_hash": hash_token(token)})
+
+def revocar_sesion(db: Session, sesion_id: int) -> List[int]:
+    return _revocar(db, "id = :sesion_id", {"sesion_id": sesion_id})
+
+def revocar_sesiones_usuario(db: Session, usuario_id: int) -> List[int]:
+    return _revocar(db, "usuario_id = :usuario_id", {"usuario_id": usuario_id})
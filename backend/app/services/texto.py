@@ -0,0 +1,22 @@
+"""
+Utilidades de normalización de texto en español
+"""
+
+import re
+import unicodedata
+
+_NO_ALFANUMERICO = re.compile(r"[^a-z0-9ñ]+")
+
+def quitar_acentos(texto: str) -> str:
+    """Eliminar acentos conservando la ñ"""
+    texto = texto.replace("ñ", "\0").replace("Ñ", "\1")
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    sin_acentos = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return sin_acentos.replace("\0", "ñ").replace("\1", "Ñ")
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas, sin acentos y con un solo espacio entre palabras"""
+    if not texto:
+        return ""
+    texto = quitar_acentos(texto.lower())
+    return _NO_ALFANUMERICO.sub(" ", texto).strip()
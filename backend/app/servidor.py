@@ -0,0 +1,175 @@
+"""
+Servidor de producción: uvicorn con varios workers dimensionados
+
+Reparte las conexiones de PostgreSQL entre los procesos para que la suma
+nunca exceda max_connections:
+
+    disponibles = (max_connections - superuser_reserved_connections
+                   - DB_CONEXIONES_RESERVADAS) / SERVIDOR_INSTANCIAS
+    por worker  = disponibles / workers - REPORTES_WORKERS - 1
+
+El -1 es la conexión del LISTEN de revocación de sesiones de cada worker,
+que se abre fuera del pool.
+
+Cada worker recibe un pool fijo de ese tamaño (sin overflow, para no abrir
+conexiones en ráfaga bajo carga) y un threadpool con una conexión menos,
+que queda para las tareas de fondo (auditoría, sesiones): un endpoint
+síncrono nunca ocupa un hilo esperando conexión.
+
+Los workers se calculan con los núcleos disponibles (respetando el límite
+de CPU del contenedor) y se reducen si no alcanzan las conexiones.
+
+Con SIGTERM uvicorn deja de aceptar conexiones, espera hasta
+SERVIDOR_DRENADO_SEGUNDOS a que terminen las peticiones en curso y ejecuta
+el shutdown del lifespan (vacía la cola de auditoría y cierra el pool).
+
+Uso:
+    python -m app.servidor
+    SERVIDOR_WORKERS=4 python -m app.servidor --solo-calcular
+"""
+
+import argparse
+import math
+import os
+import sys
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.config import settings
+
+MIN_CONEXIONES_POR_WORKER = 2
+MAX_CONEXIONES_POSTGRES = 100  # default de PostgreSQL si no se puede consultar
+ESCUCHA_POR_WORKER = 1  # LISTEN de RegistroSesiones, desacoplada del pool
+
+@dataclass(frozen=True)
+class Dimensiones:
+    workers: int
+    conexiones_por_worker: int
+    hilos_por_worker: int
+    reportes_por_worker: int
+    disponibles: int
+    escucha_por_worker: int = ESCUCHA_POR_WORKER
+
+    @property
+    def total_conexiones(self) -> int:
+        return self.workers * (self.conexiones_por_worker + self.reportes_por_worker + self.escucha_por_worker)
+
+def _leer(ruta: str) -> Optional[str]:
+    try:
+        with open(ruta) as archivo:
+            return archivo.read().strip()
+    except OSError:
+        return None
+
+def nucleos_disponibles() -> int:
+    """Núcleos utilizables: afinidad del proceso acotada por la cuota de CPU del cgroup"""
+    nucleos = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+    cuota = None
+    v2 = _leer("/sys/fs/cgroup/cpu.max")
+    if v2:
+        limite, periodo = (v2.split() + ["100000"])[:2]
+        if limite != "max":
+            cuota = int(limite) / int(periodo)
+    else:
+        limite, periodo = _leer("/sys/fs/cgroup/cpu/cpu.cfs_quota_us"), _leer("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+        if limite and periodo and int(limite) > 0:
+            cuota = int(limite) / int(periodo)
+
+    if cuota:
+        nucleos = min(nucleos, math.ceil(cuota))
+    return max(1, nucleos)
+
+def max_conexiones(database_url: str) -> Optional[int]:
+    """Conexiones que pueden abrir usuarios sin privilegios de superusuario"""
+    import psycopg2
+
+    try:
+        with psycopg2.connect(database_url, connect_timeout=5) as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT current_setting('max_connections')::int
+                     - current_setting('superuser_reserved_connections')::int
+            """)
+            return cur.fetchone()[0]
+    except Exception as e:
+        print(f"⚠️ No se pudo consultar max_connections: {e}")
+        return None
+
+def dimensionar(
+    nucleos: int,
+    max_conexiones: int,
+    workers: int = 0,
+    instancias: int = 1,
+    reservadas: int = 10,
+    reportes: int = 2,
+    por_worker_max: int = 20
+) -> Dimensiones:
+    """Workers, pool y threadpool por worker sin exceder max_connections"""
+    disponibles = (max_conexiones - reservadas) // max(instancias, 1)
+    workers_max = disponibles // (MIN_CONEXIONES_POR_WORKER + reportes + ESCUCHA_POR_WORKER)
+    if workers_max < 1:
+        raise ValueError(
+            f"max_connections={max_conexiones} no alcanza ni para un worker "
+            f"({reservadas} reservadas, {instancias} instancias)"
+        )
+
+    workers = min(workers or nucleos, workers_max)
+    conexiones = min(disponibles // workers - reportes - ESCUCHA_POR_WORKER, por_worker_max)
+    return Dimensiones(
+        workers=workers,
+        conexiones_por_worker=conexiones,
+        hilos_por_worker=max(1, conexiones - 1),
+        reportes_por_worker=reportes,
+        disponibles=disponibles
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de producción de la API")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--solo-calcular", action="store_true", help="Mostrar el dimensionamiento sin iniciar")
+    args = parser.parse_args()
+
+    nucleos = nucleos_disponibles()
+    maximo = max_conexiones(settings.DATABASE_URL) or MAX_CONEXIONES_POSTGRES
+    dimensiones = dimensionar(
+        nucleos, maximo,
+        workers=settings.SERVIDOR_WORKERS,
+        instancias=settings.SERVIDOR_INSTANCIAS,
+        reservadas=settings.DB_CONEXIONES_RESERVADAS,
+        reportes=settings.REPORTES_WORKERS,
+        por_worker_max=settings.DB_CONEXIONES_POR_WORKER_MAX
+    )
+    if settings.SERVIDOR_WORKERS and dimensiones.workers < settings.SERVIDOR_WORKERS:
+        print(f"⚠️ SERVIDOR_WORKERS={settings.SERVIDOR_WORKERS} excede las conexiones; se usan {dimensiones.workers}")
+
+    print(f"🖥️ {nucleos} núcleos, {maximo} conexiones en PostgreSQL ({dimensiones.disponibles} para esta instancia)")
+    print(f"⚙️ {dimensiones.workers} workers x (pool {dimensiones.conexiones_por_worker} + "
+          f"{dimensiones.reportes_por_worker} reportes + {dimensiones.escucha_por_worker} LISTEN) = {dimensiones.total_conexiones} conexiones; "
+          f"threadpool de {dimensiones.hilos_por_worker} hilos por worker")
+    if args.solo_calcular:
+        return 0
+
+    # Los workers leen su configuración del entorno al importar la app
+    os.environ.update({
+        "DB_POOL_SIZE": str(dimensiones.conexiones_por_worker),
+        "DB_MAX_OVERFLOW": "0",
+        "THREADPOOL_HILOS": str(dimensiones.hilos_por_worker),
+    })
+
+    import uvicorn
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=dimensiones.workers,
+        timeout_graceful_shutdown=settings.SERVIDOR_DRENADO_SEGUNDOS,
+        proxy_headers=True,
+        forwarded_allow_ips="*",
+        access_log=False
+    )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
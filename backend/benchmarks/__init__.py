@@ -0,0 +1,12 @@
+"""
+Benchmarks de la API
+
+- `carga`: recorridos de usuario contra la API levantada con uvicorn (p50/p95/p99,
+  throughput y consultas por petición por ruta);
+- `micro`: funciones calientes medidas en proceso;
+- `comparacion`: línea base guardada y presupuestos por ruta.
+
+Uso (desde backend/):
+    python -m benchmarks.carga --usuarios 20 --duracion 60
+    python -m benchmarks.micro
+"""
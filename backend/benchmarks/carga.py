@@ -0,0 +1,283 @@
+"""
+Prueba de carga de extremo a extremo
+
+Levanta la API con uvicorn contra DATABASE_URL (o usa una ya levantada con
+--url), crea los usuarios de prueba y ejecuta los recorridos de
+`escenarios.py` con N usuarios virtuales concurrentes. Por ruta reporta
+p50/p95/p99, throughput y consultas por petición (encabezado
+X-DB-Query-Count de la instrumentación de SQL). Al final compara contra la
+línea base y termina con código 1 si alguna ruta excede su presupuesto.
+
+La base debe tener volumen realista (scripts/generar_datos_sinteticos.py);
+los recorridos de captura insertan eventos y gastos.
+
+Uso (desde backend/):
+    python -m benchmarks.carga --usuarios 20 --duracion 60
+    python -m benchmarks.carga --workers 4 --guardar-linea-base
+    python -m benchmarks.carga --url http://localhost:8000 --sin-comparar
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from benchmarks import comparacion
+from benchmarks.escenarios import LOGIN, RECORRIDOS, Paso, asignar_recorridos
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ADMIN = "benchmark.admin@example.com"
+USUARIO = "benchmark.usuario@example.com"
+PASSWORD = "benchmark"
+
+# ============ SERVIDOR ============
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@contextmanager
+def servidor(database_url: str, workers: int, log_sql: str):
+    """API en un subproceso de uvicorn; regresa su URL cuando /health responde"""
+    puerto = _puerto_libre()
+    entorno = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "SQL_INSTRUMENTACION": "true",
+        "SQL_LOG_ARCHIVO": log_sql,
+        "ALERTAS_HABILITADAS": "false",
+    }
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(puerto),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=entorno
+    )
+    url = f"http://127.0.0.1:{puerto}"
+    try:
+        limite = time.monotonic() + 60
+        while True:
+            if proceso.poll() is not None:
+                raise RuntimeError(f"uvicorn terminó con código {proceso.returncode}")
+            try:
+                if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > limite:
+                raise RuntimeError("La API no respondió en 60 s")
+            time.sleep(0.2)
+        yield url
+    finally:
+        proceso.terminate()
+        try:
+            proceso.wait(timeout=20)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+
+def filas_por_tabla(database_url: str) -> Dict[str, int]:
+    """Tamaño aproximado de las tablas principales (para comparar mediciones)"""
+    import psycopg2
+
+    with psycopg2.connect(database_url) as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT relname, reltuples::bigint FROM pg_class
+            WHERE relname IN ('cedis', 'eventos_seguridad', 'gastos', 'productos_gasto') AND relkind = 'r'
+        """)
+        return dict(cur.fetchall())
+
+# ============ PREPARACIÓN ============
+def _token(cliente: httpx.Client, email: str, **datos) -> str:
+    respuesta = cliente.post("/api/auth/login", data={"username": email, "password": PASSWORD})
+    if respuesta.status_code == 401:
+        registro = cliente.post("/api/auth/register", json={"nombre": email, "email": email, "password": PASSWORD, **datos})
+        registro.raise_for_status()
+        respuesta = cliente.post("/api/auth/login", data={"username": email, "password": PASSWORD})
+    respuesta.raise_for_status()
+    return respuesta.json()["access_token"]
+
+def preparar(url: str, organizacion_id: Optional[int] = None) -> dict:
+    """Usuario de una organización (la de más CEDIS si no se indica) y sus catálogos"""
+    with httpx.Client(base_url=url, timeout=60) as cliente:
+        if organizacion_id is None:
+            admin = _token(cliente, ADMIN, rol="Administrador")
+            cedis = cliente.get("/api/cedis/", headers={"Authorization": f"Bearer {admin}"}).json()
+            conteo = Counter(c["organizacion_id"] for c in cedis if c.get("organizacion_id"))
+            if not conteo:
+                raise RuntimeError("No hay CEDIS; genera datos con scripts/generar_datos_sinteticos.py")
+            organizacion_id = conteo.most_common(1)[0][0]
+
+        token = _token(cliente, USUARIO, rol="Consultor", organizacion_id=organizacion_id)
+        encabezados = {"Authorization": f"Bearer {token}"}
+        cedis_ids = [c["id"] for c in cliente.get("/api/cedis/", headers=encabezados).json()]
+        categoria_ids = [c["id"] for c in cliente.get("/api/gastos/categorias", headers=encabezados).json()]
+
+    if not cedis_ids:
+        raise RuntimeError(f"La organización {organizacion_id} no tiene CEDIS")
+    return {
+        "organizacion_id": organizacion_id,
+        "cedis_ids": cedis_ids,
+        "categoria_ids": categoria_ids,
+        "credenciales": {"username": USUARIO, "password": PASSWORD},
+    }
+
+# ============ EJECUCIÓN ============
+class Mediciones:
+    """Muestras (ms, ok, consultas) por plantilla de ruta"""
+
+    def __init__(self):
+        self.por_ruta: Dict[str, List[Tuple[float, bool, Optional[int]]]] = defaultdict(list)
+        self.desde = 0.0
+
+    def registrar(self, llave: str, inicio: float, respuesta: Optional[httpx.Response]):
+        if inicio < self.desde:
+            return  # calentamiento
+        duracion = (time.perf_counter() - inicio) * 1000
+        ok = respuesta is not None and respuesta.status_code < 400
+        consultas = respuesta.headers.get("x-db-query-count") if respuesta is not None else None
+        self.por_ruta[llave].append((duracion, ok, int(consultas) if consultas is not None else None))
+
+async def _peticion(cliente: httpx.AsyncClient, mediciones: Mediciones, paso: Paso, url: str, **kwargs):
+    inicio = time.perf_counter()
+    try:
+        respuesta = await cliente.request(paso.metodo, url, **kwargs)
+    except httpx.HTTPError:
+        respuesta = None
+    mediciones.registrar(paso.llave, inicio, respuesta)
+    return respuesta
+
+async def usuario_virtual(cliente, recorrido: str, contexto: dict, mediciones: Mediciones, hasta: float, semilla: int):
+    """Repetir el recorrido (login + pasos) hasta que se acabe el tiempo"""
+    rng = random.Random(semilla)
+    pasos = RECORRIDOS[recorrido][1]
+    while time.perf_counter() < hasta:
+        respuesta = await _peticion(cliente, mediciones, LOGIN, LOGIN.ruta, data=contexto["credenciales"])
+        if respuesta is None or respuesta.status_code != 200:
+            await asyncio.sleep(0.5)
+            continue
+        encabezados = {"Authorization": f"Bearer {respuesta.json()['access_token']}"}
+        for paso in pasos:
+            for _ in range(paso.repeticiones):
+                if time.perf_counter() >= hasta:
+                    return
+                url = paso.ruta.format(cedis_id=rng.choice(contexto["cedis_ids"]))
+                cuerpo = paso.cuerpo(contexto, rng) if paso.cuerpo else None
+                await _peticion(cliente, mediciones, paso, url, json=cuerpo, headers=encabezados)
+
+async def ejecutar(url: str, contexto: dict, usuarios: int, duracion: float, calentamiento: float, semilla: int) -> Mediciones:
+    mediciones = Mediciones()
+    inicio = time.perf_counter()
+    mediciones.desde = inicio + calentamiento
+    hasta = mediciones.desde + duracion
+    limites = httpx.Limits(max_connections=usuarios, max_keepalive_connections=usuarios)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limites) as cliente:
+        await asyncio.gather(*(
+            usuario_virtual(cliente, recorrido, contexto, mediciones, hasta, semilla * 1000 + i)
+            for i, recorrido in enumerate(asignar_recorridos(usuarios))
+        ))
+    return mediciones
+
+def resumir(mediciones: Mediciones, duracion: float) -> dict:
+    rutas = {}
+    total = 0
+    for llave, muestras in sorted(mediciones.por_ruta.items()):
+        latencias = np.array([m[0] for m in muestras])
+        consultas = [m[2] for m in muestras if m[2] is not None]
+        p50, p95, p99 = np.percentile(latencias, [50, 95, 99])
+        total += len(muestras)
+        rutas[llave] = {
+            "n": len(muestras),
+            "errores": sum(1 for m in muestras if not m[1]),
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+            "max_ms": round(float(latencias.max()), 2),
+            "rps": round(len(muestras) / duracion, 2),
+            "consultas": round(sum(consultas) / len(consultas), 2) if consultas else None,
+            "consultas_max": max(consultas) if consultas else None,
+        }
+    return {"rutas": rutas, "peticiones": total, "rps": round(total / duracion, 2)}
+
+def imprimir(resultado: dict):
+    print(f"\n{'Ruta':<52} {'n':>6} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>7} {'SQL':>5}")
+    for llave, m in resultado["rutas"].items():
+        consultas = f"{m['consultas']:.1f}" if m["consultas"] is not None else "-"
+        print(f"{llave:<52} {m['n']:>6} {m['errores']:>4} {m['p50_ms']:>8.1f} {m['p95_ms']:>8.1f} "
+              f"{m['p99_ms']:>8.1f} {m['rps']:>7.1f} {consultas:>5}")
+    print(f"\n⚡ {resultado['peticiones']:,} peticiones, {resultado['rps']:.1f} req/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API con presupuestos de latencia")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--url", default=None, help="Usar una API ya levantada en lugar de iniciar uvicorn")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn")
+    parser.add_argument("--usuarios", type=int, default=10, help="Usuarios virtuales concurrentes")
+    parser.add_argument("--duracion", type=float, default=60, help="Segundos medidos")
+    parser.add_argument("--calentamiento", type=float, default=5, help="Segundos iniciales sin medir")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--organizacion-id", type=int, default=None)
+    parser.add_argument("--linea-base", default=comparacion.LINEA_BASE)
+    parser.add_argument("--guardar-linea-base", action="store_true", help="Aceptar esta medición como nueva línea base")
+    parser.add_argument("--sin-comparar", action="store_true")
+    args = parser.parse_args()
+
+    if not args.url and not args.database_url:
+        parser.error("Se requiere --database-url (o DATABASE_URL) o --url")
+
+    os.makedirs(comparacion.RESULTADOS, exist_ok=True)
+
+    @contextmanager
+    def api():
+        if args.url:
+            yield args.url
+        else:
+            with servidor(args.database_url, args.workers, os.path.join(comparacion.RESULTADOS, "sql.log")) as url:
+                yield url
+
+    with api() as url:
+        contexto = preparar(url, args.organizacion_id)
+        print(f"🏢 Organización {contexto['organizacion_id']} ({len(contexto['cedis_ids'])} CEDIS)")
+        print(f"🚀 {args.usuarios} usuarios, {args.calentamiento:g} s de calentamiento + {args.duracion:g} s medidos")
+        mediciones = asyncio.run(ejecutar(url, contexto, args.usuarios, args.duracion, args.calentamiento, args.semilla))
+
+    resultado = resumir(mediciones, args.duracion)
+    resultado["entorno"] = comparacion.entorno(
+        usuarios=args.usuarios, duracion=args.duracion, workers=args.workers,
+        filas=filas_por_tabla(args.database_url) if args.database_url else None
+    )
+    imprimir(resultado)
+    print(f"💾 {comparacion.guardar_resultado('carga', resultado)}")
+
+    if args.guardar_linea_base:
+        comparacion.guardar_linea_base("carga", resultado, args.linea_base)
+        print("✅ Línea base actualizada")
+        return 0
+    if args.sin_comparar:
+        return 0
+
+    base = comparacion.linea_base("carga", args.linea_base)
+    if not base:
+        print("⚠️ Sin línea base (usa --guardar-linea-base)")
+        return 0
+    if not comparacion.volumen_comparable(base.get("entorno", {}).get("filas"), resultado["entorno"]["filas"]):
+        print("⚠️ La línea base se midió con otro volumen de datos; la comparación es orientativa")
+
+    fallas = comparacion.regresiones_carga(resultado, base)
+    for falla in fallas:
+        print(f"❌ {falla}")
+    if not fallas:
+        print("✅ Sin regresiones respecto a la línea base")
+    return 1 if fallas else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Línea base y presupuestos de los benchmarks
+
+`linea_base.json` guarda la última medición aceptada de cada suite (`carga`,
+`micro`). `presupuestos.json` define cuánto puede empeorar cada métrica
+respecto a esa línea base antes de considerarse una regresión; una ruta sin
+entrada propia usa el presupuesto `predeterminado` de su suite.
+"""
+
+import json
+import os
+import platform
+from datetime import datetime
+from typing import Dict, List, Optional
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+LINEA_BASE = os.path.join(DIRECTORIO, "linea_base.json")
+PRESUPUESTOS = os.path.join(DIRECTORIO, "presupuestos.json")
+RESULTADOS = os.path.join(DIRECTORIO, "resultados")
+
+def _leer(ruta: str) -> dict:
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding="utf-8") as archivo:
+        return json.load(archivo)
+
+def _escribir(ruta: str, datos: dict):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump(datos, archivo, ensure_ascii=False, indent=2, sort_keys=True)
+        archivo.write("\n")
+
+def entorno(**extra) -> dict:
+    """Datos de la máquina para saber si dos mediciones son comparables"""
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sistema": platform.platform(),
+        "cpus": os.cpu_count(),
+        **extra
+    }
+
+def guardar_resultado(suite: str, resultado: dict) -> str:
+    ruta = os.path.join(RESULTADOS, f"{suite}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    _escribir(ruta, resultado)
+    return ruta
+
+def linea_base(suite: str, ruta: str = LINEA_BASE) -> dict:
+    return _leer(ruta).get(suite, {})
+
+def guardar_linea_base(suite: str, resultado: dict, ruta: str = LINEA_BASE):
+    """Reemplazar la línea base de una suite (las demás se conservan)"""
+    datos = _leer(ruta)
+    datos[suite] = resultado
+    _escribir(ruta, datos)
+
+def presupuesto(suite: str, nombre: str) -> dict:
+    presupuestos = _leer(PRESUPUESTOS).get(suite, {})
+    return {**presupuestos.get("predeterminado", {}), **presupuestos.get("rutas", {}).get(nombre, {})}
+
+def volumen_comparable(base: Optional[dict], actual: Optional[dict], tolerancia: float = 0.1) -> bool:
+    """Las tablas tienen aproximadamente el mismo número de filas"""
+    if not base or not actual:
+        return True
+    return all(abs(actual.get(tabla, 0) - filas) <= tolerancia * max(filas, 1) for tabla, filas in base.items())
+
+def regresiones_carga(actual: dict, base: dict) -> List[str]:
+    """Rutas cuya latencia p95, consultas o errores exceden su presupuesto"""
+    fallas = []
+    for ruta, medida_base in sorted(base.get("rutas", {}).items()):
+        medida = actual["rutas"].get(ruta)
+        if medida is None:
+            continue
+        limites = presupuesto("carga", ruta)
+
+        limite_p95 = medida_base["p95_ms"] * (1 + limites.get("p95_tolerancia", 0.25)) + limites.get("p95_margen_ms", 0)
+        if medida["p95_ms"] > limite_p95:
+            fallas.append(f"{ruta}: p95 {medida['p95_ms']:.1f} ms > {limite_p95:.1f} ms (base {medida_base['p95_ms']:.1f})")
+
+        if medida_base.get("consultas") is not None and medida.get("consultas") is not None:
+            limite_consultas = medida_base["consultas"] + limites.get("consultas_extra", 0)
+            if medida["consultas"] > limite_consultas:
+                fallas.append(f"{ruta}: {medida['consultas']:.1f} consultas por petición > {limite_consultas:.1f}")
+
+        tasa_errores = medida["errores"] / medida["n"] if medida["n"] else 0
+        if tasa_errores > limites.get("errores_max", 0):
+            fallas.append(f"{ruta}: {tasa_errores:.1%} de errores")
+    return fallas
+
+def regresiones_micro(actual: Dict[str, dict], base: Dict[str, dict]) -> List[str]:
+    fallas = []
+    for nombre, medida_base in sorted(base.get("funciones", {}).items()):
+        medida = actual["funciones"].get(nombre)
+        if medida is None:
+            continue
+        limite = medida_base["us_por_op"] * (1 + presupuesto("micro", nombre).get("tolerancia", 0.3))
+        if medida["us_por_op"] > limite:
+            fallas.append(f"{nombre}: {medida['us_por_op']:.2f} µs/op > {limite:.2f} (base {medida_base['us_por_op']:.2f})")
+    return fallas
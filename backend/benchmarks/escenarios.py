@@ -0,0 +1,130 @@
+"""
+Recorridos de usuario para la prueba de carga
+
+Cada recorrido empieza con un login y sigue una secuencia de pasos. La ruta
+de un paso es una plantilla: `{cedis_id}` se llena con un CEDIS al azar de
+la organización del usuario, y la plantilla (no la URL final) es la llave
+con la que se agregan las mediciones.
+"""
+
+import random
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+TIPOS_EVENTO = ["Robo", "Intrusión", "Vandalismo", "Accidente", "Falla de seguridad"]
+
+@dataclass(frozen=True)
+class Paso:
+    metodo: str
+    ruta: str
+    cuerpo: Optional[Callable[[dict, random.Random], Any]] = None
+    repeticiones: int = 1
+
+    @property
+    def llave(self) -> str:
+        return f"{self.metodo} {self.ruta}"
+
+def _evento(contexto: dict, rng: random.Random) -> dict:
+    return {
+        "fecha": (datetime.now() - timedelta(minutes=rng.randint(0, 600))).isoformat(timespec="seconds"),
+        "cedis_id": rng.choice(contexto["cedis_ids"]),
+        "organizacion_id": contexto["organizacion_id"],
+        "tipo_evento": rng.choice(TIPOS_EVENTO),
+        "descripcion": "Evento de prueba de carga",
+        "estatus": "Abierto"
+    }
+
+def _gasto(contexto: dict, rng: random.Random) -> dict:
+    return {
+        "fecha": date.today().isoformat(),
+        "cedis_id": rng.choice(contexto["cedis_ids"]),
+        "categoria_id": rng.choice(contexto["categoria_ids"]) if contexto["categoria_ids"] else None,
+        "proveedor": "Proveedor de prueba de carga",
+        "monto_total": round(rng.uniform(100, 20000), 2),
+        "organizacion_id": contexto["organizacion_id"]
+    }
+
+# CEDIS por carga en los endpoints /lote de protección civil
+CEDIS_POR_LOTE = 20
+
+def _lote_cedis(contexto: dict, rng: random.Random) -> List[int]:
+    return rng.sample(contexto["cedis_ids"], min(CEDIS_POR_LOTE, len(contexto["cedis_ids"])))
+
+def _vencimiento(rng: random.Random) -> str:
+    return (date.today() + timedelta(days=rng.randint(-60, 720))).isoformat()
+
+def _extintores(contexto: dict, rng: random.Random) -> List[dict]:
+    return [
+        {
+            "cedis_id": cedis_id,
+            "extintores_requeridos": rng.randint(4, 30),
+            "extintores_pqs": rng.randint(0, 25),
+            "extintores_co2": rng.randint(0, 8),
+            "fecha_recarga": (date.today() - timedelta(days=rng.randint(0, 400))).isoformat()
+        }
+        for cedis_id in _lote_cedis(contexto, rng)
+    ]
+
+def _pipcs(contexto: dict, rng: random.Random) -> List[dict]:
+    return [
+        {"cedis_id": cedis_id, "fecha_vencimiento": _vencimiento(rng), "estatus": "Vigente"}
+        for cedis_id in _lote_cedis(contexto, rng)
+    ]
+
+def _dictamenes(contexto: dict, rng: random.Random) -> List[dict]:
+    return [
+        {"cedis_id": cedis_id, "tipo": tipo, "tiene_dictamen": True, "estatus": "Vigente",
+         "fecha_vencimiento": _vencimiento(rng)}
+        for cedis_id in _lote_cedis(contexto, rng) for tipo in ("Estructural", "Eléctrico")
+    ]
+
+LOGIN = Paso("POST", "/api/auth/login")
+
+# Tablero de un gerente regional
+GERENTE = [
+    Paso("GET", "/api/dashboard/stats"),
+    Paso("GET", "/api/dashboard/mapa"),
+    Paso("GET", "/api/dashboard/tendencias"),
+    Paso("GET", "/api/dashboard/resumen-cedis/{cedis_id}"),
+    Paso("GET", "/api/proteccion-civil/compliance"),
+]
+
+# Consulta de eventos y gastos
+ANALISTA = [
+    Paso("GET", "/api/eventos/"),
+    Paso("GET", "/api/eventos/?cedis_id={cedis_id}"),
+    Paso("GET", "/api/eventos/?tipo_evento=Robo"),
+    Paso("GET", "/api/eventos/stats"),
+    Paso("GET", "/api/gastos/"),
+    Paso("GET", "/api/gastos/stats"),
+]
+
+# Captura en ráfaga (turno que sube sus bitácoras y la revisión de protección civil por lote)
+CAPTURISTA = [
+    Paso("POST", "/api/eventos/", _evento, repeticiones=10),
+    Paso("POST", "/api/gastos/", _gasto, repeticiones=3),
+    Paso("GET", "/api/eventos/?cedis_id={cedis_id}"),
+    Paso("POST", "/api/proteccion-civil/extintores/lote", _extintores),
+    Paso("POST", "/api/proteccion-civil/pipc/lote", _pipcs),
+    Paso("POST", "/api/proteccion-civil/dictamenes/lote", _dictamenes),
+]
+
+# nombre -> (peso en la mezcla de usuarios, pasos después del login)
+RECORRIDOS: Dict[str, Tuple[int, List[Paso]]] = {
+    "gerente": (3, GERENTE),
+    "analista": (3, ANALISTA),
+    "capturista": (1, CAPTURISTA),
+}
+
+def asignar_recorridos(usuarios: int) -> List[str]:
+    """Repartir los usuarios virtuales según el peso de cada recorrido
+
+    El ciclo se intercala (gerente, analista, capturista, gerente, ...) para
+    que incluso pocos usuarios cubran todos los recorridos.
+    """
+    ciclo = [
+        nombre for ronda in range(max(peso for peso, _ in RECORRIDOS.values()))
+        for nombre, (peso, _) in RECORRIDOS.items() if peso > ronda
+    ]
+    return [ciclo[i % len(ciclo)] for i in range(usuarios)]
@@ -0,0 +1,116 @@
+"""
+Microbenchmarks de funciones calientes
+
+Se miden en proceso con timeit (mejor de 5 repeticiones, µs por operación)
+y se comparan contra la línea base con la tolerancia de presupuestos.json.
+No requieren base de datos.
+
+Uso (desde backend/):
+    python -m benchmarks.micro
+    python -m benchmarks.micro --guardar-linea-base
+"""
+
+import argparse
+import sys
+import timeit
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from benchmarks import comparacion
+
+SENTENCIA = (
+    "SELECT eventos_seguridad.id, eventos_seguridad.fecha, eventos_seguridad.tipo_evento "
+    "FROM eventos_seguridad WHERE eventos_seguridad.organizacion_id = %(organizacion_id_1)s "
+    "AND eventos_seguridad.cedis_id IN (%(cedis_id_1_1)s, %(cedis_id_1_2)s, %(cedis_id_1_3)s) "
+    "AND eventos_seguridad.tipo_evento = 'Robo' ORDER BY eventos_seguridad.fecha DESC LIMIT 100"
+)
+TITULAR = "Asaltan a transportista y roban tráiler con mercancía en la carretera Villahermosa-Cárdenas"
+
+def _normalizar_sql() -> Callable:
+    from app.core.instrumentacion import normalizar_sql
+    return lambda: normalizar_sql(SENTENCIA)
+
+def _simhash() -> Callable:
+    from app.services.deduplicacion import calcular_simhash
+    texto = TITULAR + ". " + TITULAR.lower() * 3
+    return lambda: calcular_simhash(texto)
+
+def _clasificar() -> Callable:
+    from app.services.clasificador import clasificador
+    clasificador.clasificar(TITULAR)  # compila el autómata fuera de la medición
+    return lambda: clasificador.clasificar(TITULAR)
+
+def _exponer_metricas() -> Callable:
+    from app.core.metricas import Contador, Histograma, Registro
+
+    registro = Registro()
+    duracion = registro.agregar(Histograma("duracion", "", ("method", "route", "status")))
+    peticiones = registro.agregar(Contador("peticiones", "", ("method", "route", "status")))
+    for ruta in range(40):
+        for estado in ("200", "404", "500"):
+            duracion.observar(0.05, "GET", f"/api/ruta/{ruta}", estado)
+            peticiones.inc("GET", f"/api/ruta/{ruta}", estado)
+    return registro.exponer
+
+def _serializar_eventos() -> Callable:
+    from pydantic import TypeAdapter
+    from app.schemas import EventoResponse
+
+    adaptador = TypeAdapter(List[EventoResponse])
+    filas = [{
+        "id": i, "fecha": datetime(2025, 1, 1, i % 24), "cedis_id": i % 20, "tipo_evento": "Robo",
+        "descripcion": "Robo de mercancía en andén", "estatus": "Cerrado", "organizacion_id": 1,
+        "created_at": datetime(2025, 1, 1)
+    } for i in range(100)]
+    return lambda: adaptador.dump_json(adaptador.validate_python(filas))
+
+# nombre -> preparación que regresa la función a medir
+FUNCIONES: Dict[str, Callable[[], Callable]] = {
+    "normalizar_sql": _normalizar_sql,
+    "calcular_simhash": _simhash,
+    "clasificar_titular": _clasificar,
+    "exponer_metricas_120_series": _exponer_metricas,
+    "serializar_100_eventos": _serializar_eventos,
+}
+
+def medir(funcion: Callable, repeticiones: int = 5) -> float:
+    """µs por operación (mejor de `repeticiones`)"""
+    temporizador = timeit.Timer(funcion)
+    numero, _ = temporizador.autorange()
+    return min(temporizador.repeat(repeticiones, numero)) / numero * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks de funciones calientes")
+    parser.add_argument("--solo", nargs="*", default=None, help="Medir solo estas funciones")
+    parser.add_argument("--linea-base", default=comparacion.LINEA_BASE)
+    parser.add_argument("--guardar-linea-base", action="store_true")
+    args = parser.parse_args()
+
+    funciones = {}
+    for nombre, preparar in FUNCIONES.items():
+        if args.solo and nombre not in args.solo:
+            continue
+        funciones[nombre] = {"us_por_op": round(medir(preparar()), 3)}
+        print(f"{nombre:<32} {funciones[nombre]['us_por_op']:>12.2f} µs/op")
+
+    resultado = {"funciones": funciones, "entorno": comparacion.entorno()}
+    print(f"💾 {comparacion.guardar_resultado('micro', resultado)}")
+
+    if args.guardar_linea_base:
+        comparacion.guardar_linea_base("micro", resultado, args.linea_base)
+        print("✅ Línea base actualizada")
+        return 0
+
+    base = comparacion.linea_base("micro", args.linea_base)
+    if not base:
+        print("⚠️ Sin línea base (usa --guardar-linea-base)")
+        return 0
+    fallas = comparacion.regresiones_micro(resultado, base)
+    for falla in fallas:
+        print(f"❌ {falla}")
+    if not fallas:
+        print("✅ Sin regresiones respecto a la línea base")
+    return 1 if fallas else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+"""Esquema base (init_database.sql)
+
+`init_database.sql` es el esquema anterior a las migraciones. En una base
+vacía esta revisión lo ejecuta; en una base ya creada con ese script (o
+con `psql -f init_database.sql` antes de `alembic upgrade head`) no hace
+nada. Todos los cambios posteriores van en las revisiones siguientes.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+
+import os
+
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+ESQUEMA = os.path.join(os.path.dirname(__file__), "..", "..", "init_database.sql")
+
+def upgrade():
+    conexion = op.get_bind()
+    if conexion.exec_driver_sql("SELECT to_regclass('public.cedis')").scalar():
+        return
+    with open(ESQUEMA, encoding="utf-8") as archivo:
+        conexion.exec_driver_sql(archivo.read())
+
+def downgrade():
+    pass
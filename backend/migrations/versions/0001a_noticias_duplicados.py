@@ -0,0 +1,42 @@
+"""Deduplicación de noticias (SimHash)
+
+Huella SimHash de 64 bits por noticia y liga de cada duplicado con su
+noticia canónica. El listado por defecto solo muestra canónicas: índice
+parcial por fecha de detección.
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0001a"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("""
+        ALTER TABLE noticias_monitoreadas
+            ADD COLUMN IF NOT EXISTS huella_simhash BIGINT,
+            ADD COLUMN IF NOT EXISTS es_duplicado BOOLEAN DEFAULT FALSE,
+            ADD COLUMN IF NOT EXISTS noticia_canonica_id INT REFERENCES noticias_monitoreadas(id),
+            ADD COLUMN IF NOT EXISTS total_duplicados INT DEFAULT 0
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS idx_noticias_canonica ON noticias_monitoreadas (noticia_canonica_id)")
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_noticias_canonicas_recientes ON noticias_monitoreadas (fecha_deteccion DESC)
+        WHERE es_duplicado = FALSE
+    """)
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS idx_noticias_canonicas_recientes")
+    op.execute("DROP INDEX IF EXISTS idx_noticias_canonica")
+    op.execute("""
+        ALTER TABLE noticias_monitoreadas
+            DROP COLUMN IF EXISTS total_duplicados,
+            DROP COLUMN IF EXISTS noticia_canonica_id,
+            DROP COLUMN IF EXISTS es_duplicado,
+            DROP COLUMN IF EXISTS huella_simhash
+    """)
@@ -0,0 +1,101 @@
+"""Municipio normalizado y riesgo delictivo precalculado por CEDIS
+
+- normalizar_municipio(): sin acentos, minúsculas y espacios simples
+  (IMMUTABLE para columnas generadas e índices);
+- municipio_norm generado en cedis e indices_delictivos, con índices para
+  el cruce por (estado, municipio);
+- riesgo_delictivo_cedis: sumas móviles y variación anual por CEDIS y mes,
+  se recalcula tras cada carga del SESNSP (POST /api/riesgo/recalcular).
+
+Revision ID: 0001b
+Revises: 0001a
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0001b"
+down_revision = "0001a"
+branch_labels = None
+depends_on = None
+
+_VISTA = """
+    CREATE OR REPLACE VIEW v_riesgo_delictivo_cedis AS
+    SELECT
+        c.id AS cedis_id,
+        c.nombre AS cedis,
+        c.codigo,
+        e.nombre AS estado,
+        c.municipio,
+        i.año,
+        i.mes,
+        (COALESCE(i.robo_negocio, 0) + COALESCE(i.robo_vehiculo, 0) +
+         COALESCE(i.robo_transporte, 0) + COALESCE(i.robo_mercancia, 0) +
+         COALESCE(i.extorsion, 0)) AS delitos_relevantes,
+        i.robo_total,
+        i.extorsion,
+        i.secuestro,
+        CASE
+            WHEN (COALESCE(i.robo_negocio, 0) + COALESCE(i.extorsion, 0)) > 50 THEN 'CRÍTICO'
+            WHEN (COALESCE(i.robo_negocio, 0) + COALESCE(i.extorsion, 0)) > 20 THEN 'ALTO'
+            WHEN (COALESCE(i.robo_negocio, 0) + COALESCE(i.extorsion, 0)) > 5 THEN 'MEDIO'
+            ELSE 'BAJO'
+        END AS nivel_riesgo
+    FROM cedis c
+    LEFT JOIN estados e ON c.estado_id = e.id
+    LEFT JOIN indices_delictivos i ON
+        c.estado_id = i.estado_id AND
+        {cruce}
+    ORDER BY c.nombre, i.año DESC, i.mes DESC
+"""
+
+def upgrade():
+    op.execute(r"""
+        CREATE OR REPLACE FUNCTION normalizar_municipio(texto TEXT)
+        RETURNS TEXT AS $$
+            SELECT btrim(regexp_replace(
+                lower(translate(texto, 'ÁÉÍÓÚÜÑáéíóúüñ', 'AEIOUUNaeiouun')),
+                '\s+', ' ', 'g'
+            ));
+        $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    """)
+    for tabla in ("cedis", "indices_delictivos"):
+        op.execute(f"""
+            ALTER TABLE {tabla} ADD COLUMN IF NOT EXISTS
+            municipio_norm VARCHAR(100) GENERATED ALWAYS AS (normalizar_municipio(municipio)) STORED
+        """)
+    op.execute("CREATE INDEX IF NOT EXISTS idx_cedis_municipio_norm ON cedis (estado_id, municipio_norm)")
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_delictivos_municipio_norm
+        ON indices_delictivos (estado_id, municipio_norm, año, mes)
+    """)
+    op.execute(_VISTA.format(cruce="c.municipio_norm = i.municipio_norm"))
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS riesgo_delictivo_cedis (
+            cedis_id INT REFERENCES cedis(id) ON DELETE CASCADE,
+            año INT NOT NULL,
+            mes INT NOT NULL,
+            delitos_relevantes INT DEFAULT 0,
+            indice_impacto INT DEFAULT 0,
+            suma_3m INT DEFAULT 0,
+            suma_6m INT DEFAULT 0,
+            suma_12m INT DEFAULT 0,
+            suma_12m_anterior INT,
+            variacion_anual DECIMAL(8,2),
+            variacion_mes_anual DECIMAL(8,2),
+            nivel_riesgo VARCHAR(20),
+            actualizado_en TIMESTAMP DEFAULT NOW(),
+            PRIMARY KEY (cedis_id, año, mes)
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS idx_riesgo_cedis_periodo ON riesgo_delictivo_cedis (año DESC, mes DESC)")
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS riesgo_delictivo_cedis")
+    op.execute(_VISTA.format(cruce="UPPER(c.municipio) = UPPER(i.municipio)"))
+    op.execute("DROP INDEX IF EXISTS idx_delictivos_municipio_norm")
+    op.execute("DROP INDEX IF EXISTS idx_cedis_municipio_norm")
+    for tabla in ("cedis", "indices_delictivos"):
+        op.execute(f"ALTER TABLE {tabla} DROP COLUMN IF EXISTS municipio_norm")
+    op.execute("DROP FUNCTION IF EXISTS normalizar_municipio(TEXT)")
@@ -0,0 +1,37 @@
+"""Alertas de vencimiento enviadas (PIPC, dictámenes y recarga de extintores)
+
+Una fila por destinatario: si el resumen general se entrega y el del
+gerente del CEDIS falla, el gerente recibe el reintento en el siguiente
+ciclo.
+
+Revision ID: 0001c
+Revises: 0001b
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0001c"
+down_revision = "0001b"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("CREATE INDEX IF NOT EXISTS idx_extintores_recarga ON extintores (fecha_recarga)")
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS alertas_vencimiento (
+            id SERIAL PRIMARY KEY,
+            tipo_registro VARCHAR(50) NOT NULL,
+            registro_id INT NOT NULL,
+            cedis_id INT REFERENCES cedis(id),
+            fecha_vencimiento DATE NOT NULL,
+            nivel VARCHAR(20) NOT NULL,
+            destinatario VARCHAR(255) NOT NULL,
+            enviado_en TIMESTAMP DEFAULT NOW(),
+            UNIQUE (tipo_registro, registro_id, fecha_vencimiento, nivel, destinatario)
+        )
+    """)
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS alertas_vencimiento")
+    op.execute("DROP INDEX IF EXISTS idx_extintores_recarga")
@@ -0,0 +1,25 @@
+"""Índices de auditoría para paginación por llave (timestamp, id)
+
+Revision ID: 0001d
+Revises: 0001c
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0001d"
+down_revision = "0001c"
+branch_labels = None
+depends_on = None
+
+def _indices(fecha: str, tabla: str):
+    op.execute("DROP INDEX IF EXISTS idx_auditoria_fecha")
+    op.execute("DROP INDEX IF EXISTS idx_auditoria_tabla")
+    op.execute(f"CREATE INDEX idx_auditoria_fecha ON auditoria ({fecha})")
+    op.execute(f"CREATE INDEX idx_auditoria_tabla ON auditoria ({tabla})")
+
+def upgrade():
+    _indices("timestamp DESC, id DESC", "tabla_afectada, timestamp DESC, id DESC")
+
+def downgrade():
+    _indices("timestamp DESC", "tabla_afectada")
@@ -0,0 +1,29 @@
+"""Revocación de sesiones
+
+revocado_en marca la sesión como revocada; el índice parcial sirve a la
+sincronización incremental de revocaciones y el de valido_hasta a la purga.
+
+Revision ID: 0001e
+Revises: 0001d
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0001e"
+down_revision = "0001d"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("ALTER TABLE sesiones ADD COLUMN IF NOT EXISTS revocado_en TIMESTAMP")
+    op.execute("CREATE INDEX IF NOT EXISTS idx_sesiones_valido_hasta ON sesiones (valido_hasta)")
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sesiones_revocadas ON sesiones (revocado_en)
+        WHERE revocado_en IS NOT NULL
+    """)
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS idx_sesiones_revocadas")
+    op.execute("DROP INDEX IF EXISTS idx_sesiones_valido_hasta")
+    op.execute("ALTER TABLE sesiones DROP COLUMN IF EXISTS revocado_en")
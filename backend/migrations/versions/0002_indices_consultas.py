@@ -0,0 +1,99 @@
+"""Índices compuestos, parciales y BRIN según las consultas de la API
+
+Las consultas filtran por organización (alcance del usuario) o CEDIS y
+ordenan por fecha descendente con LIMIT; los índices de una sola columna
+obligaban a un recorrido más ordenamiento. Los índices de una sola columna
+que quedan cubiertos como prefijo de uno compuesto se eliminan.
+
+Los índices se crean con CONCURRENTLY para no bloquear escrituras.
+
+Revision ID: 0002
+Revises: 0001e
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0002"
+down_revision = "0001e"
+branch_labels = None
+depends_on = None
+
+# (nombre, definición)
+INDICES = [
+    # Listados y estadísticas por organización: WHERE organizacion_id ORDER BY fecha DESC
+    ("idx_eventos_org_fecha",
+     "eventos_seguridad (organizacion_id, fecha DESC, id) INCLUDE (tipo_evento)"),
+    ("idx_eventos_cedis_fecha",
+     "eventos_seguridad (cedis_id, fecha DESC, id)"),
+    ("idx_gastos_org_fecha",
+     "gastos (organizacion_id, fecha DESC, id) INCLUDE (monto_total, categoria_id, cedis_id)"),
+    ("idx_gastos_cedis_fecha",
+     "gastos (cedis_id, fecha DESC, id) INCLUDE (monto_total)"),
+    ("idx_gastos_org_categoria_fecha",
+     "gastos (organizacion_id, categoria_id, fecha DESC, id)"),
+    # Gastos pendientes de pago (una fracción pequeña de la tabla)
+    ("idx_gastos_pendientes",
+     "gastos (organizacion_id, fecha DESC, id) WHERE estado = 'Pendiente'"),
+    # Subconsulta del alcance: SELECT id FROM cedis WHERE organizacion_id = :org
+    ("idx_cedis_org",
+     "cedis (organizacion_id, id)"),
+    # Reportes, alertas y riesgo solo consideran CEDIS activos
+    ("idx_cedis_activos",
+     "cedis (organizacion_id, id) WHERE activo"),
+    ("idx_cedis_activos_municipio",
+     "cedis (estado_id, municipio_norm) WHERE activo"),
+    ("idx_reportes_org_fecha",
+     "reportes_generados (organizacion_id, created_at DESC)"),
+    ("idx_reportes_cedis_fecha",
+     "reportes_generados (cedis_id, created_at DESC) WHERE cedis_id IS NOT NULL"),
+    # Bitácora por usuario con paginación por llave (timestamp, id)
+    ("idx_auditoria_usuario_fecha",
+     "auditoria (usuario_id, timestamp DESC, id DESC)"),
+    # Tabla de solo inserción: rangos desde/hasta con un índice diminuto
+    ("idx_auditoria_timestamp_brin",
+     "auditoria USING brin (timestamp) WITH (pages_per_range = 32)"),
+]
+
+# El CEDIS determina la organización: sin estas estadísticas el planificador
+# multiplica ambas selectividades, subestima las filas de un CEDIS y prefiere
+# un BitmapAnd + Sort en lugar de leer el índice por CEDIS en orden
+ESTADISTICAS = [
+    ("stat_eventos_org_cedis", "eventos_seguridad"),
+    ("stat_gastos_org_cedis", "gastos"),
+]
+
+# Índices que quedan cubiertos por los anteriores: (nombre, definición original)
+REEMPLAZADOS = [
+    ("idx_eventos_org", "eventos_seguridad (organizacion_id)"),
+    ("idx_eventos_cedis", "eventos_seguridad (cedis_id)"),
+    ("idx_gastos_org", "gastos (organizacion_id)"),
+    ("idx_gastos_cedis", "gastos (cedis_id)"),
+    ("idx_gastos_estado", "gastos (estado)"),
+    ("idx_auditoria_usuario", "auditoria (usuario_id)"),
+]
+
+TABLAS = ["eventos_seguridad", "gastos", "cedis", "reportes_generados", "auditoria"]
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for nombre, definicion in INDICES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON {definicion}")
+        for nombre, _ in REEMPLAZADOS:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {nombre}")
+        for nombre, tabla in ESTADISTICAS:
+            op.execute(
+                f"CREATE STATISTICS IF NOT EXISTS {nombre} (dependencies) "
+                f"ON organizacion_id, cedis_id FROM {tabla}"
+            )
+        for tabla in TABLAS:
+            op.execute(f"ANALYZE {tabla}")
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for nombre, _ in ESTADISTICAS:
+            op.execute(f"DROP STATISTICS IF EXISTS {nombre}")
+        for nombre, definicion in REEMPLAZADOS:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON {definicion}")
+        for nombre, _ in INDICES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {nombre}")
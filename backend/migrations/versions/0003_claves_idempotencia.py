@@ -0,0 +1,36 @@
+"""Claves de idempotencia para la creación de eventos y gastos
+
+Una fila por (usuario, Idempotency-Key) con la huella de la solicitud y la
+respuesta original. Se reclama en la misma transacción que el INSERT del
+registro; las expiradas se purgan por lotes usando el índice de expira_en.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE claves_idempotencia (
+            usuario_id INT NOT NULL,
+            clave VARCHAR(255) NOT NULL,
+            ambito VARCHAR(50) NOT NULL,
+            huella CHAR(64) NOT NULL,
+            estado_http SMALLINT,
+            respuesta JSONB,
+            expira_en TIMESTAMP NOT NULL,
+            created_at TIMESTAMP DEFAULT NOW(),
+            PRIMARY KEY (usuario_id, clave)
+        )
+    """)
+    op.execute("CREATE INDEX idx_claves_idempotencia_expira ON claves_idempotencia (expira_en)")
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS claves_idempotencia")
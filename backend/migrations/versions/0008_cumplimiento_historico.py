@@ -0,0 +1,55 @@
+"""Historial diario de cumplimiento por CEDIS (particionado por año)
+
+Una fila por (CEDIS, día) con el estado de cumplimiento_cedis: requisitos
+cumplidos y score. Particiones anuales (las crea el proceso diario antes
+de escribir); los índices incluyen todas las columnas de las gráficas, de
+modo que la tendencia de un año para todos los CEDIS de una organización
+(o de un CEDIS) es un Index Only Scan sobre una o dos particiones.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+"""
+
+from datetime import date
+
+from alembic import op
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE cumplimiento_historico (
+            fecha DATE NOT NULL,
+            cedis_id INT NOT NULL,
+            organizacion_id INT,
+            extintores_cumple BOOLEAN NOT NULL,
+            pipc_vigente BOOLEAN NOT NULL,
+            dictamen_estructural BOOLEAN NOT NULL,
+            dictamen_electrico BOOLEAN NOT NULL,
+            score SMALLINT NOT NULL,
+            PRIMARY KEY (cedis_id, fecha)
+                INCLUDE (score, extintores_cumple, pipc_vigente, dictamen_estructural, dictamen_electrico)
+        ) PARTITION BY RANGE (fecha)
+    """)
+    op.execute("""
+        CREATE INDEX idx_cumplimiento_historico_org ON cumplimiento_historico (organizacion_id, fecha, cedis_id)
+        INCLUDE (score, extintores_cumple, pipc_vigente, dictamen_estructural, dictamen_electrico)
+    """)
+    for año in (date.today().year, date.today().year + 1):
+        op.execute(f"""
+            CREATE TABLE cumplimiento_historico_{año} PARTITION OF cumplimiento_historico
+            FOR VALUES FROM ('{año}-01-01') TO ('{año + 1}-01-01')
+        """)
+    op.execute("""
+        INSERT INTO cumplimiento_historico
+        SELECT CURRENT_DATE, cedis_id, organizacion_id, extintores_cumple, pipc_vigente,
+               dictamen_estructural, dictamen_electrico, score
+        FROM cumplimiento_cedis
+    """)
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS cumplimiento_historico")
@@ -0,0 +1,31 @@
+"""Posición WAL de la última escritura de cada usuario
+
+Para que un usuario lea sus propias escrituras desde una réplica sin
+importar qué worker o instancia atendió la escritura: después de cada
+commit se guarda pg_current_wal_lsn() y una réplica solo atiende sus
+lecturas si ya reprodujo esa posición. Es UNLOGGED (sin WAL, no se replica,
+se vacía tras una caída del primario): solo se consulta en el primario.
+
+Revision ID: 0010
+Revises: 0008
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0010"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("""
+        CREATE UNLOGGED TABLE escrituras_usuario (
+            usuario_id INT PRIMARY KEY,
+            lsn PG_LSN NOT NULL,
+            registrado_en TIMESTAMP NOT NULL DEFAULT NOW()
+        )
+    """)
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS escrituras_usuario")
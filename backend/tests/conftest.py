@@ -0,0 +1,179 @@
+"""
+Fixtures de pruebas contra PostgreSQL
+
+Las pruebas que usan la base de datos requieren TEST_DATABASE_URL apuntando a
+una base de datos DESECHABLE creada con init_database.sql. Aquí se aplican las
+migraciones (alembic upgrade head) y se generan datos con volumen suficiente
+para que el planificador elija los mismos planes que en producción.
+"""
+
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+# Scripts de carga y generación de datos (scripts/ en la raíz del repositorio)
+sys.path.insert(0, os.path.join(os.path.dirname(BACKEND_DIR), "scripts"))
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    # Antes de importar la aplicación: el engine se crea con DATABASE_URL
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+ORGANIZACIONES = 20
+CEDIS_POR_ORGANIZACION = 10
+EVENTOS = 100_000
+GASTOS = 100_000
+AUDITORIA = 100_000
+REPORTES = 5_000
+NOTICIAS = 50_000
+
+PASSWORD = "prueba"
+
+_SQL_DATOS = """
+INSERT INTO organizaciones (nombre)
+SELECT 'Prueba ' || n FROM generate_series(1, :organizaciones) n;
+
+INSERT INTO categorias_gasto (nombre)
+SELECT 'Categoría prueba ' || n FROM generate_series(1, 12) n
+ON CONFLICT (nombre) DO NOTHING;
+
+INSERT INTO cedis (codigo, nombre, estado_id, municipio, organizacion_id, activo)
+SELECT 'PRB-' || o.id || '-' || n, 'CEDIS ' || o.id || '-' || n,
+       (SELECT min(id) FROM estados) + n % 6, 'Municipio ' || n, o.id, n % 10 <> 0
+FROM organizaciones o, generate_series(1, :cedis_por_organizacion) n
+WHERE o.nombre LIKE 'Prueba %';
+
+CREATE TEMP TABLE _cedis_prueba AS
+SELECT row_number() OVER (ORDER BY id) AS n, id, organizacion_id
+FROM cedis WHERE codigo LIKE 'PRB-%';
+
+INSERT INTO eventos_seguridad (fecha, cedis_id, organizacion_id, tipo_evento, estatus)
+SELECT NOW() - (random() * INTERVAL '730 days'), c.id, c.organizacion_id,
+       (ARRAY['Robo', 'Intrusión', 'Vandalismo', 'Accidente', 'Incendio'])[1 + g % 5],
+       (ARRAY['Abierto', 'Cerrado'])[1 + g % 2]
+FROM generate_series(1, :eventos) g
+JOIN _cedis_prueba c ON c.n = 1 + g % (SELECT count(*) FROM _cedis_prueba);
+
+-- 11 es primo con el número de CEDIS: todos tienen gastos pendientes (~9%)
+INSERT INTO gastos (fecha, cedis_id, categoria_id, organizacion_id, monto_total, estado, proveedor)
+SELECT CURRENT_DATE - (random() * 730)::int, c.id,
+       (SELECT min(id) FROM categorias_gasto) + g % 12, c.organizacion_id,
+       round((random() * 50000)::numeric, 2),
+       CASE WHEN g % 11 = 0 THEN 'Pendiente' ELSE 'Pagado' END,
+       'Proveedor ' || g % 300
+FROM generate_series(1, :gastos) g
+JOIN _cedis_prueba c ON c.n = 1 + g % (SELECT count(*) FROM _cedis_prueba);
+
+INSERT INTO auditoria (usuario_id, accion, tabla_afectada, registro_id, timestamp)
+SELECT CASE WHEN g % 50 = 0 THEN (SELECT min(id) FROM usuarios) END, (ARRAY['INSERT', 'UPDATE', 'DELETE'])[1 + g % 3],
+       (ARRAY['gastos', 'eventos_seguridad', 'cedis', 'extintores', 'pipc'])[1 + g % 5], g,
+       NOW() - INTERVAL '730 days' + g * (INTERVAL '730 days' / :auditoria)
+FROM generate_series(1, :auditoria) g;
+
+INSERT INTO reportes_generados (tipo_reporte, titulo, organizacion_id, cedis_id, formato, estado, created_at)
+SELECT CASE WHEN g % 2 = 0 THEN 'Ejecutivo CEDIS' ELSE 'Ejecutivo Organización' END, 'Reporte ' || g,
+       c.organizacion_id, CASE WHEN g % 2 = 0 THEN c.id END, 'HTML', 'Completado',
+       NOW() - (random() * INTERVAL '365 days')
+FROM generate_series(1, :reportes) g
+JOIN _cedis_prueba c ON c.n = 1 + g % (SELECT count(*) FROM _cedis_prueba);
+
+INSERT INTO noticias_monitoreadas (titulo, fecha_deteccion, tipo_alerta, nivel_criticidad, es_duplicado)
+SELECT 'Noticia ' || g, NOW() - INTERVAL '365 days' + g * (INTERVAL '365 days' / :noticias),
+       (ARRAY['Robo', 'Extorsión', 'Bloqueo', 'Otro'])[1 + g % 4], (ARRAY['Alta', 'Media', 'Baja'])[1 + g % 3],
+       g % 10 = 0
+FROM generate_series(1, :noticias) g;
+
+UPDATE noticias_monitoreadas SET noticia_canonica_id = id - 1 WHERE es_duplicado;
+
+INSERT INTO riesgo_delictivo_cedis (cedis_id, año, mes, delitos_relevantes, suma_12m, nivel_riesgo)
+SELECT c.id, EXTRACT(YEAR FROM m)::int, EXTRACT(MONTH FROM m)::int, (random() * 20)::int, (random() * 200)::int, 'BAJO'
+FROM _cedis_prueba c, generate_series(date_trunc('month', NOW()) - INTERVAL '59 months', date_trunc('month', NOW()), INTERVAL '1 month') m;
+
+INSERT INTO cumplimiento_historico
+SELECT d::date, c.id, c.organizacion_id, random() < 0.8, random() < 0.7, random() < 0.9, random() < 0.6, (random() * 100)::int
+FROM _cedis_prueba c, generate_series(date_trunc('year', NOW()), CURRENT_DATE - 1, INTERVAL '1 day') d;
+"""
+
+def _aplicar_migraciones():
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config(os.path.join(BACKEND_DIR, "alembic.ini")), "head")
+
+def _generar_datos(engine):
+    from sqlalchemy import text
+
+    with engine.begin() as conexion:
+        if conexion.execute(text("SELECT count(*) FROM cedis WHERE codigo LIKE 'PRB-%'")).scalar():
+            return
+        for sentencia in _SQL_DATOS.split(";"):
+            if sentencia.strip():
+                conexion.execute(text(sentencia), {
+                    "organizaciones": ORGANIZACIONES,
+                    "cedis_por_organizacion": CEDIS_POR_ORGANIZACION,
+                    "eventos": EVENTOS,
+                    "gastos": GASTOS,
+                    "auditoria": AUDITORIA,
+                    "reportes": REPORTES,
+                    "noticias": NOTICIAS
+                })
+
+    # VACUUM actualiza el mapa de visibilidad (recorridos solo de índice)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conexion:
+        conexion.execute(text("VACUUM ANALYZE"))
+
+def _token(client, email: str, **datos) -> dict:
+    client.post("/api/auth/register", json={"nombre": email, "email": email, "password": PASSWORD, **datos})
+    respuesta = client.post("/api/auth/login", data={"username": email, "password": PASSWORD})
+    assert respuesta.status_code == 200, respuesta.text
+    return {"Authorization": f"Bearer {respuesta.json()['access_token']}"}
+
+@pytest.fixture(scope="session")
+def bd():
+    """Base de datos migrada y con datos; regresa el engine de la aplicación"""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL no configurada")
+
+    _aplicar_migraciones()
+    from app.core.database import engine
+    return engine
+
+@pytest.fixture(scope="session")
+def client(bd):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    return TestClient(app)
+
+@pytest.fixture(scope="session")
+def contexto(bd, client):
+    """Usuarios de prueba (administrador y usuario de una organización) con datos generados"""
+    from sqlalchemy import text
+
+    admin = _token(client, "admin.pruebas@example.com", rol="Administrador")
+    _generar_datos(bd)
+
+    with bd.connect() as conexion:
+        organizacion_id = conexion.execute(
+            text("SELECT id FROM organizaciones WHERE nombre = 'Prueba 7'")
+        ).scalar()
+        cedis_id = conexion.execute(
+            text("SELECT min(id) FROM cedis WHERE organizacion_id = :o"), {"o": organizacion_id}
+        ).scalar()
+        categoria_id = conexion.execute(text("SELECT min(id) FROM categorias_gasto")).scalar()
+        usuario_id = conexion.execute(text("SELECT min(id) FROM usuarios")).scalar()
+        noticia_id = conexion.execute(text("SELECT max(noticia_canonica_id) FROM noticias_monitoreadas")).scalar()
+
+    usuario = _token(client, "usuario.pruebas@example.com", rol="Consultor", organizacion_id=organizacion_id)
+    return {
+        "admin": admin,
+        "usuario": usuario,
+        "organizacion_id": organizacion_id,
+        "cedis_id": cedis_id,
+        "categoria_id": categoria_id,
+        "usuario_id": usuario_id,
+        "noticia_id": noticia_id
+    }
@@ -0,0 +1,110 @@
+"""
+Alertas de vencimiento contra un servidor SMTP local (aiosmtpd)
+"""
+
+import asyncio
+import socket
+import uuid
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import text
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class Buzon:
+    """Handler de aiosmtpd: guarda lo recibido y rechaza los destinatarios indicados"""
+
+    def __init__(self):
+        self.recibidos = []
+        self.rechazados = set()
+        self.al_recibir = None
+        self.observado = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.rechazados:
+            return "550 Buzón no disponible"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.recibidos.extend(envelope.rcpt_tos)
+        if self.al_recibir:
+            self.observado.append(self.al_recibir())
+        return "250 OK"
+
+@pytest.fixture
+def buzon(monkeypatch):
+    from aiosmtpd.controller import Controller
+
+    from app.core.config import settings
+
+    handler = Buzon()
+    controlador = Controller(handler, hostname="127.0.0.1", port=_puerto_libre())
+    controlador.start()
+    monkeypatch.setattr(settings, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(settings, "SMTP_PORT", controlador.port)
+    monkeypatch.setattr(settings, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(settings, "SMTP_USER", "")
+    monkeypatch.setattr(settings, "SMTP_REINTENTOS", 0)
+    yield handler
+    controlador.stop()
+
+def test_reintenta_solo_al_destinatario_que_fallo(bd, contexto, buzon):
+    from app.services.alertas_vencimiento import ejecutar_ciclo
+
+    sufijo = uuid.uuid4().hex[:8]
+    general, gerente = f"general-{sufijo}@prueba.mx", f"gerente-{sufijo}@prueba.mx"
+    hoy = date.today()
+    with bd.begin() as conexion:
+        anteriores = conexion.execute(text("SELECT valor FROM configuraciones WHERE clave = 'alertas.emails'")).scalar()
+        conexion.execute(text("UPDATE configuraciones SET valor = :v WHERE clave = 'alertas.emails'"), {"v": general})
+        cedis_id, correo = conexion.execute(text("""
+            SELECT id, correo FROM cedis
+            WHERE activo AND NOT EXISTS (SELECT 1 FROM pipc WHERE pipc.cedis_id = cedis.id)
+            ORDER BY id DESC LIMIT 1
+        """)).one()
+        conexion.execute(text("UPDATE cedis SET correo = :g WHERE id = :c"), {"g": gerente, "c": cedis_id})
+        pipc_id = conexion.execute(text("""
+            INSERT INTO pipc (cedis_id, estatus, fecha_vencimiento) VALUES (:c, 'Vigente', :v) RETURNING id
+        """), {"c": cedis_id, "v": hoy + timedelta(days=5)}).scalar()
+    def estado_del_ciclo():
+        with bd.connect() as conexion:
+            return conexion.execute(text("""
+                SELECT a.state FROM pg_locks l JOIN pg_stat_activity a ON a.pid = l.pid
+                WHERE l.locktype = 'advisory' AND l.objid = 730001
+            """)).scalars().all()
+
+    try:
+        buzon.rechazados.add(gerente)
+        buzon.al_recibir = estado_del_ciclo
+        primero = asyncio.run(ejecutar_ciclo(hoy))
+        assert general in buzon.recibidos and gerente not in buzon.recibidos
+        assert primero["entregados"] < primero["mensajes"]
+        # Durante el envío el candado está tomado y su conexión sin transacción abierta
+        assert buzon.observado and all(estado == ["idle"] for estado in buzon.observado)
+        buzon.al_recibir = None
+        assert estado_del_ciclo() == []
+
+        buzon.rechazados.clear()
+        buzon.recibidos.clear()
+        asyncio.run(ejecutar_ciclo(hoy))
+        assert buzon.recibidos == [gerente]
+
+        buzon.recibidos.clear()
+        assert asyncio.run(ejecutar_ciclo(hoy))["mensajes"] == 0 and buzon.recibidos == []
+        with bd.connect() as conexion:
+            destinatarios = conexion.execute(text("""
+                SELECT destinatario FROM alertas_vencimiento WHERE tipo_registro = 'PIPC' AND registro_id = :id
+                ORDER BY destinatario
+            """), {"id": pipc_id}).scalars().all()
+        assert destinatarios == sorted([general, gerente])
+    finally:
+        with bd.begin() as conexion:
+            conexion.execute(text("DELETE FROM alertas_vencimiento WHERE destinatario IN (:g, :m)"), {"g": general, "m": gerente})
+            conexion.execute(text("DELETE FROM pipc WHERE id = :id"), {"id": pipc_id})
+            conexion.execute(text("UPDATE cedis SET correo = :g WHERE id = :c"), {"g": correo, "c": cedis_id})
+            conexion.execute(text("UPDATE configuraciones SET valor = :v WHERE clave = 'alertas.emails'"), {"v": anteriores})
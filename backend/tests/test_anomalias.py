@@ -0,0 +1,46 @@
+"""
+Detección de anomalías sobre la matriz de conteos (sin base de datos)
+"""
+
+from datetime import date, datetime
+
+import numpy as np
+
+from app.services.anomalias import DetectorAnomalias
+
+HOY = date(2026, 10, 19)
+SERIES = [(1, "Robo"), (1, "Intrusión"), (2, "Robo")]
+CEDIS = {1: (1, "CEDIS Norte"), 2: (2, "CEDIS Sur")}
+
+def _detector(conteos):
+    detector = DetectorAnomalias(dias=conteos.shape[1], ventana=28, lam=0.3, amplitud=3, refresco=60)
+    detector.cargar(HOY, SERIES, conteos, CEDIS)
+    return detector
+
+def _conteos():
+    rng = np.random.default_rng(7)
+    return rng.poisson(5, size=(len(SERIES), 60)).astype(float)
+
+def test_pico_en_una_serie():
+    conteos = _conteos()
+    conteos[1, -3] = 40
+    anomalias = _detector(conteos).anomalias(dias=7, umbral=3.5)
+    picos = [a for a in anomalias if a["motivo"] == "pico"]
+    assert [(a["cedis_id"], a["tipo_evento"], a["fecha"]) for a in picos] == [(1, "Intrusión", date(2026, 10, 17))]
+
+def test_series_estables_sin_alertas():
+    conteos = np.full((len(SERIES), 60), 5.0)
+    assert _detector(conteos).anomalias(dias=30) == []
+
+def test_registrar_actualiza_hoy_y_filtra_alcance():
+    conteos = np.full((len(SERIES), 60), 5.0)
+    conteos[:, -1] = 0
+    detector = _detector(conteos)
+    for _ in range(30):
+        detector.registrar(2, "Robo", datetime(2026, 10, 19, 13, 5))
+    detector.registrar(2, "Robo", datetime(2026, 10, 18, 9))  # otro día: no cuenta
+
+    [anomalia] = detector.anomalias(dias=1)
+    assert (anomalia["cedis_id"], anomalia["eventos"], anomalia["motivo"]) == (2, 30, "pico")
+    assert detector.anomalias(dias=1, organizacion_id=1) == []
+    assert detector.anomalias(dias=1, cedis_permitidos={1}) == []
@@ -0,0 +1,107 @@
+"""
+Bitácora de auditoría: cola, contrapresión, rollback y respaldo en disco
+"""
+
+import os
+import threading
+import uuid
+from datetime import datetime
+
+from sqlalchemy import text
+
+def _registros(tabla, n):
+    ahora = datetime.now().isoformat(sep=" ")
+    return [(None, "INSERT", tabla, i, None, '{"campo": "valor, con coma"}', None, None, ahora) for i in range(n)]
+
+def _contar(bd, tabla):
+    with bd.connect() as conexion:
+        return conexion.execute(text("SELECT count(*) FROM auditoria WHERE tabla_afectada = :t"), {"t": tabla}).scalar()
+
+def test_rollback_descarta_y_commit_encola(bd, monkeypatch):
+    from app.core.database import SessionLocal
+    from app.models import CategoriaGasto
+    from app.services import auditoria
+
+    encolados = []
+    monkeypatch.setattr(auditoria.escritor_auditoria, "encolar", encolados.extend)
+    nombre = f"Auditoría {uuid.uuid4().hex[:8]}"
+
+    db = SessionLocal()
+    try:
+        db.add(CategoriaGasto(nombre=nombre))
+        db.flush()
+        db.rollback()
+        assert encolados == [] and "auditoria_pendiente" not in db.info
+
+        categoria = CategoriaGasto(nombre=nombre)
+        db.add(categoria)
+        db.commit()
+        assert [(r[1], r[2]) for r in encolados] == [("INSERT", "categorias_gasto")]
+
+        db.delete(categoria)
+        db.commit()
+    finally:
+        db.close()
+
+def test_cola_llena_escribe_en_linea(monkeypatch, tmp_path):
+    from app.services.auditoria import EscritorAuditoria
+
+    escritor = EscritorAuditoria(2, 10, 0.05, 0.01, str(tmp_path))
+    escritor._hilo = threading.current_thread()  # escritor "ocupado": nadie vacía la cola
+    en_linea = []
+    monkeypatch.setattr(escritor, "_escribir", en_linea.extend)
+
+    escritor.encolar(_registros("prueba", 5))
+
+    assert escritor.pendientes() == 2
+    assert len(en_linea) == 3 and escritor.escritos_en_linea == 3
+
+def test_detener_vacia_la_cola(bd, tmp_path):
+    from app.services.auditoria import EscritorAuditoria
+
+    tabla = f"prueba_{uuid.uuid4().hex[:8]}"
+    escritor = EscritorAuditoria(100, 10, 0.05, 1, str(tmp_path))
+    escritor.encolar(_registros(tabla, 25))
+    escritor.detener()
+
+    assert _contar(bd, tabla) == 25
+
+def test_lote_fallido_se_respalda_y_reintenta(bd, monkeypatch, tmp_path):
+    from app.services import auditoria
+
+    def base_caida(datos):
+        raise ConnectionError("sin conexión")
+
+    tabla = f"prueba_{uuid.uuid4().hex[:8]}"
+    escritor = auditoria.EscritorAuditoria(10, 10, 0.05, 0.01, str(tmp_path))
+    monkeypatch.setattr(auditoria.time, "sleep", lambda segundos: None)
+    monkeypatch.setattr(escritor, "_copiar", base_caida)
+
+    escritor._escribir(_registros(tabla, 3))
+    assert escritor.respaldados == 3 and len(os.listdir(tmp_path)) == 1
+    assert escritor.reintentar_respaldos() == 0 and len(os.listdir(tmp_path)) == 1
+
+    monkeypatch.undo()
+    assert escritor.reintentar_respaldos() == 3
+    assert os.listdir(tmp_path) == [] and _contar(bd, tabla) == 3
+
+def test_registrar_escrituras_core(bd, monkeypatch):
+    from app.core.database import SessionLocal
+    from app.services import auditoria
+
+    encolados = []
+    monkeypatch.setattr(auditoria.escritor_auditoria, "encolar", encolados.extend)
+
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT 1"))
+        auditoria.registrar(db, "UPDATE", "configuraciones", [{"id": 7, "valor": "30"}])
+        db.rollback()
+        assert encolados == []
+
+        auditoria.registrar(db, "INSERT", "sesiones", [{"id": 8, "token_hash": "secreto"}])
+        db.commit()
+        assert [r[1:4] for r in encolados] == [("INSERT", "sesiones", 8)]
+        assert "secreto" not in encolados[0][5]
+    finally:
+        db.close()
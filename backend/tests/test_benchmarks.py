@@ -0,0 +1,45 @@
+"""
+Comparación de benchmarks contra la línea base (sin base de datos)
+"""
+
+from benchmarks.comparacion import regresiones_carga, volumen_comparable
+from benchmarks.escenarios import RECORRIDOS, asignar_recorridos
+
+def _medida(p95, consultas=2.0, n=100, errores=0):
+    return {"p95_ms": p95, "consultas": consultas, "n": n, "errores": errores}
+
+def test_regresiones_por_presupuesto():
+    base = {"rutas": {"GET /api/eventos/": _medida(100), "GET /api/gastos/": _medida(100)}}
+    actual = {"rutas": {
+        "GET /api/eventos/": _medida(120),                 # dentro de +25% + 5 ms
+        "GET /api/gastos/": _medida(200, consultas=3.0),   # más lenta y con una consulta extra
+    }}
+
+    fallas = regresiones_carga(actual, base)
+    assert len(fallas) == 2
+    assert all(falla.startswith("GET /api/gastos/") for falla in fallas)
+
+def test_errores_son_regresion():
+    base = {"rutas": {"POST /api/eventos/": _medida(100)}}
+    assert regresiones_carga({"rutas": {"POST /api/eventos/": _medida(90, errores=1)}}, base)
+
+def test_volumen_comparable():
+    assert volumen_comparable({"eventos_seguridad": 1_000_000}, {"eventos_seguridad": 1_050_000})
+    assert not volumen_comparable({"eventos_seguridad": 1_000_000}, {"eventos_seguridad": 100_000})
+
+def test_pocos_usuarios_cubren_todos_los_recorridos():
+    assert set(asignar_recorridos(len(RECORRIDOS))) == set(RECORRIDOS)
+
+def test_cargas_por_lote_validas():
+    import random
+
+    from app.schemas import DictamenCreate, ExtintorCreate, PIPCCreate
+
+    esquemas = {"extintores": ExtintorCreate, "pipc": PIPCCreate, "dictamenes": DictamenCreate}
+    contexto = {"cedis_ids": list(range(1, 51)), "organizacion_id": 1, "categoria_ids": []}
+    pasos = [p for _, pasos in RECORRIDOS.values() for p in pasos if p.ruta.endswith("/lote")]
+    assert {p.ruta.split("/")[-2] for p in pasos} == set(esquemas)
+    for paso in pasos:
+        cuerpo = paso.cuerpo(contexto, random.Random(1))
+        esquema = esquemas[paso.ruta.split("/")[-2]]
+        assert [esquema(**registro) for registro in cuerpo]
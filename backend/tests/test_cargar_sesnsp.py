@@ -0,0 +1,56 @@
+"""
+Carga del SESNSP: normalización de llaves y pivote de bloques del CSV ancho (sin base de datos)
+"""
+
+import io
+
+import pandas as pd
+
+from cargar_sesnsp import MESES, CargadorSESNSP, normalizar_serie, normalizar_unicos
+
+ENCABEZADO = "Año,Clave_Ent,Entidad,Municipio,Bien jurídico afectado,Tipo de delito,Subtipo de delito,Modalidad," + ",".join(MESES)
+
+def _fila(anio, entidad, municipio, tipo, subtipo, modalidad, meses):
+    # Meses no publicados quedan vacíos
+    celdas = [f'"{m}"' for m in meses] + [""] * (12 - len(meses))
+    return f'{anio},14,"{entidad}","{municipio}",Patrimonio,"{tipo}","{subtipo}","{modalidad}",' + ",".join(celdas)
+
+CSV = "\n".join([
+    ENCABEZADO,
+    _fila(2025, "Jalisco", "Zapopan", "Robo", "Robo a negocio", "Con violencia", [3, 1, 0, 0, 0, 0, 0, 0, 2]),
+    _fila(2025, "JALISCO", "  Zapopan ", "Robo", "Robo de vehículo automotor", "Sin violencia", [1, 0, 0, 0, 0, 0, 0, 0, 0]),
+    _fila(2025, "Jalisco", "Tlajomulco de Zúñiga", "Daño a la propiedad", "Daño a la propiedad", "Daño a la propiedad", [5] * 9),
+    _fila(2025, "Ciudad de México", "Benito Juárez", "Extorsión", "Extorsión", "Extorsión", ["1,200"] + [0] * 8),
+    _fila(2025, "Jalisco", "Guadalajara", "Robo", "Robo a negocio", "Con violencia", [9] * 9),
+    _fila(2024, "Jalisco", "Zapopan", "Robo", "Robo a negocio", "Con violencia", [7] * 12),
+]) + "\n"
+
+def test_normalizacion():
+    serie = pd.Series(["  Tlajomulco de   Zúñiga ", "ROBO A TRANSEÚNTE", "Tlajomulco de Zúñiga"], dtype="category")
+    esperado = ["tlajomulco de zuniga", "robo a transeunte", "tlajomulco de zuniga"]
+    assert normalizar_serie(serie).tolist() == esperado
+    assert normalizar_unicos(serie).tolist() == esperado
+
+def test_pivote_por_bloques(monkeypatch):
+    destinos = pd.DataFrame({
+        "llave": ["jalisco|zapopan", "jalisco|tlajomulco de zuniga", "ciudad de mexico|benito juarez"],
+        "estado_id": [14, 14, 9],
+        "municipio": ["Zapopan", "Tlajomulco de Zúñiga", "Benito Juárez"],
+    }).set_index("llave")
+    # Bloques de dos filas: Zapopan llega partido entre bloques distintos
+    cargador = CargadorSESNSP(None, chunksize=2, desde_anio=2025)
+    monkeypatch.setattr(cargador, "municipios_con_cedis", lambda: destinos)
+
+    resultado = cargador.leer_archivo(io.BytesIO(CSV.encode("latin-1")))
+    filas = {(r["año"], r["mes"], r["estado_id"], r["municipio"]): r for r in resultado.to_dict("records")}
+
+    # Solo municipios con CEDIS, desde 2025 y meses publicados (enero a septiembre)
+    assert len(filas) == 3 * 9
+    assert {m for _, _, _, m in filas} == {"Zapopan", "Tlajomulco de Zúñiga", "Benito Juárez"}
+
+    enero = filas[(2025, 1, 14, "Zapopan")]
+    assert (enero["robo_total"], enero["robo_negocio"], enero["robo_vehiculo"]) == (4, 3, 1)
+    assert (enero["robo_con_violencia"], enero["robo_sin_violencia"], enero["extorsion"]) == (3, 1, 0)
+    assert filas[(2025, 9, 14, "Zapopan")]["robo_negocio"] == 2
+    assert filas[(2025, 4, 14, "Tlajomulco de Zúñiga")]["daño_propiedad"] == 5
+    assert filas[(2025, 1, 9, "Benito Juárez")]["extorsion"] == 1200
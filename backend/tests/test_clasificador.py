@@ -0,0 +1,58 @@
+"""
+Clasificador de noticias: autómata Aho-Corasick y recarga en caliente de diccionarios
+"""
+
+import json
+import os
+
+import pytest
+
+from app.services.clasificador import AhoCorasick, Clasificador
+
+def _coincidencias(patrones, texto):
+    automata = AhoCorasick(patrones)
+    return sorted((automata.patrones[i][0], texto[inicio:fin]) for i, inicio, fin in automata.buscar(texto))
+
+def test_coincidencias_traslapadas():
+    patrones = [("alerta sismica", False), ("sismica", False), ("onda tropical", False), ("tropical", False)]
+    assert _coincidencias(patrones, "alerta sismica por onda tropical") == [
+        ("alerta sismica", "alerta sismica"), ("onda tropical", "onda tropical"),
+        ("sismica", "sismica"), ("tropical", "tropical")
+    ]
+
+def test_palabras_completas_y_prefijos():
+    patrones = [("sismo", False), ("evacu", True), ("replica", True)]
+    assert _coincidencias(patrones, "servicio sismologico ordena evacuacion tras sismo") == [
+        ("evacu", "evacuacion"), ("sismo", "sismo")
+    ]
+    assert _coincidencias(patrones, "sin replicas ni preevacuacion") == [("replica", "replicas")]
+
+def _diccionarios(ruta, tipo, mtime):
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump({
+            "tipos": {tipo: {"sismo": 3}},
+            "umbrales_criticidad": {"Crítico": 10, "Alto": 3},
+        }, archivo)
+    os.utime(ruta, (mtime, mtime))
+
+def test_recarga_en_caliente(tmp_path):
+    ruta = tmp_path / "diccionarios.json"
+    with pytest.raises(OSError):
+        Clasificador(str(ruta), intervalo_recarga=0).clasificar("sismo")
+
+    _diccionarios(ruta, "Sísmica", 1_000)
+    clasificador = Clasificador(str(ruta), intervalo_recarga=0)
+    assert clasificador.clasificar("fuerte sismo")["tipo_alerta"] == "Sísmica"
+
+    _diccionarios(ruta, "Geológica", 2_000)
+    assert clasificador.clasificar("fuerte sismo")["tipo_alerta"] == "Geológica"
+
+    # Inválido o ausente: se conserva la última versión cargada
+    ruta.write_text("{", encoding="utf-8")
+    os.utime(ruta, (3_000, 3_000))
+    assert clasificador.clasificar("fuerte sismo")["tipo_alerta"] == "Geológica"
+    ruta.unlink()
+    assert clasificador.clasificar("fuerte sismo")["tipo_alerta"] == "Geológica"
+
+    _diccionarios(ruta, "Sísmica", 4_000)
+    assert clasificador.clasificar("fuerte sismo")["tipo_alerta"] == "Sísmica"
@@ -0,0 +1,47 @@
+"""
+Consultas por petición (encabezados X-DB-* de la instrumentación de SQL)
+
+Falla si un endpoint empieza a repetir la misma sentencia por cada registro
+(N+1) o si excede su presupuesto de consultas.
+"""
+
+import pytest
+
+from app.core.instrumentacion import forma_parametros, normalizar_sql
+
+# (usuario, ruta, máximo de consultas)
+PRESUPUESTOS = [
+    ("usuario", "/api/cedis/", 4),
+    ("usuario", "/api/dashboard/stats", 8),
+    ("usuario", "/api/dashboard/mapa", 4),
+    ("usuario", "/api/dashboard/tendencias", 6),
+    ("usuario", "/api/dashboard/resumen-cedis/{cedis_id}", 8),
+    ("usuario", "/api/proteccion-civil/compliance", 4),
+    ("usuario", "/api/proteccion-civil/cumplimiento/tendencia", 4),
+    ("usuario", "/api/proteccion-civil/cumplimiento/historico", 4),
+    ("usuario", "/api/eventos/stats", 6),
+    ("usuario", "/api/eventos/heatmap", 4),
+    ("usuario", "/api/gastos/stats", 7),
+    ("usuario", "/api/gastos/forecast", 4),
+    ("usuario", "/api/presupuestos/estado", 6),
+    ("usuario", "/api/gastos/", 4),
+    ("usuario", "/api/eventos/", 4),
+]
+
+@pytest.mark.parametrize("usuario,ruta,maximo", PRESUPUESTOS)
+def test_consultas_por_peticion(client, contexto, usuario, ruta, maximo):
+    respuesta = client.get(ruta.format(**contexto), headers=contexto[usuario])
+    assert respuesta.status_code == 200, respuesta.text
+
+    assert "x-db-suspected-n1" not in respuesta.headers
+    assert int(respuesta.headers["x-db-query-count"]) <= maximo
+    assert float(respuesta.headers["x-db-time"]) >= 0
+
+def test_normalizar_sql():
+    sql = """SELECT cedis.id FROM cedis
+             WHERE cedis.id IN (%(id_1_1)s, %(id_1_2)s, %(id_1_3)s) AND nombre = 'Mérida' AND personal_total > 10"""
+    assert normalizar_sql(sql) == "SELECT cedis.id FROM cedis WHERE cedis.id IN (...) AND nombre = ? AND personal_total > ?"
+
+def test_forma_parametros_sin_valores():
+    assert forma_parametros({"email_1": "admin@x.com", "ids": [1, 2]}) == {"email_1": "str", "ids": "list[2]"}
+    assert forma_parametros([{"a": 1}, {"a": 2}], executemany=True) == {"filas": 2, "forma": {"a": "int"}}
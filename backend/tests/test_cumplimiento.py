@@ -0,0 +1,138 @@
+"""
+Score de cumplimiento persistido: triggers, pesos, recálculo diario e historial
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from app.services.cumplimiento import recalcular_del_dia
+
+def _score(client, contexto):
+    filas = client.get("/api/proteccion-civil/compliance", headers=contexto["usuario"]).json()
+    return next(f for f in filas if f["cedis_id"] == contexto["cedis_id"])
+
+def test_pipc_recalcula_solo_su_cedis(bd, client, contexto):
+    pipc = {"cedis_id": contexto["cedis_id"], "fecha_vencimiento": str(date.today() + timedelta(days=90)), "estatus": "Vigente"}
+    assert client.post("/api/proteccion-civil/pipc", json=pipc, headers=contexto["admin"]).status_code == 200
+    assert _score(client, contexto)["pipc_vigente"] is True
+
+    with bd.begin() as conexion:
+        conexion.execute(text("UPDATE pipc SET fecha_vencimiento = CURRENT_DATE - 1 WHERE cedis_id = :cedis_id"), contexto)
+    resumen = _score(client, contexto)
+    assert resumen["pipc_vigente"] is False
+
+    mapa = client.get("/api/dashboard/mapa", headers=contexto["usuario"]).json()
+    assert next(c for c in mapa if c["id"] == contexto["cedis_id"])["compliance_score"] == resumen["compliance_score"]
+
+def test_pesos_configurables(client, contexto):
+    pesos = {"extintores": 0, "pipc": 0, "dictamen_estructural": 0, "dictamen_electrico": 1}
+    assert client.put("/api/proteccion-civil/cumplimiento/pesos", json=pesos, headers=contexto["usuario"]).status_code == 403
+    try:
+        assert client.put("/api/proteccion-civil/cumplimiento/pesos", json=pesos, headers=contexto["admin"]).status_code == 200
+        assert all(f["compliance_score"] in (0, 100) for f in client.get("/api/proteccion-civil/compliance", headers=contexto["usuario"]).json())
+    finally:
+        client.put("/api/proteccion-civil/cumplimiento/pesos", json={}, headers=contexto["admin"])
+    assert client.get("/api/proteccion-civil/cumplimiento/pesos", headers=contexto["usuario"]).json()["pipc"] == 25
+
+def test_recalculo_diario(bd):
+    with bd.begin() as conexion:
+        conexion.execute(text("UPDATE cumplimiento_cedis SET evaluado_el = CURRENT_DATE - 1 WHERE cedis_id = (SELECT min(id) FROM cedis)"))
+    assert recalcular_del_dia()["evaluados"] > 0
+    assert recalcular_del_dia() == {"evaluados": 0, "historico": 0}
+
+def test_tendencia_desde_historico(bd, client, contexto):
+    recalcular_del_dia()
+    with bd.begin() as conexion:
+        score = conexion.execute(text(
+            "SELECT score FROM cumplimiento_historico WHERE cedis_id = :cedis_id AND fecha = CURRENT_DATE"
+        ), contexto).scalar()
+    assert score is not None
+
+    parametros = {"cedis_id": contexto["cedis_id"], "agrupar": "mes"}
+    tendencia = client.get("/api/proteccion-civil/cumplimiento/tendencia", params=parametros, headers=contexto["usuario"]).json()
+    assert tendencia[-1]["periodo"] == str(date.today().replace(day=1))
+    assert tendencia[-1]["cedis"] == 1
+
+    historico = client.get("/api/proteccion-civil/cumplimiento/historico", params={"cedis_id": contexto["cedis_id"]}, headers=contexto["usuario"]).json()
+    assert [s["cedis_id"] for s in historico] == [contexto["cedis_id"]]
+    assert historico[0]["fechas"][-1] == str(date.today())
+    assert historico[0]["score"][-1] == score
+
+def test_carga_por_lote(bd, client, contexto, monkeypatch):
+    from app.core.config import settings
+    from app.routers import proteccion_civil
+    from app.services import auditoria
+
+    encolados = []
+    monkeypatch.setattr(auditoria.escritor_auditoria, "encolar", encolados.extend)
+    monkeypatch.setattr(proteccion_civil, "FILAS_POR_SENTENCIA", 3)
+
+    with bd.begin() as conexion:
+        propios = conexion.execute(text(
+            "SELECT id FROM cedis WHERE organizacion_id = :organizacion_id ORDER BY id LIMIT 2"
+        ), contexto).scalars().all()
+        ajeno = conexion.execute(text("SELECT min(id) FROM cedis WHERE organizacion_id <> :organizacion_id"), contexto).scalar()
+    vence = str(date.today() + timedelta(days=365))
+    dictamenes = [
+        {"cedis_id": cedis_id, "tipo": tipo, "tiene_dictamen": True, "estatus": "Vigente", "fecha_vencimiento": vence}
+        for cedis_id in propios for tipo in ("Estructural", "Eléctrico")
+    ]
+
+    primera = client.post("/api/proteccion-civil/dictamenes/lote", json=dictamenes, headers=contexto["usuario"])
+    assert primera.status_code == 200
+    assert [(d["cedis_id"], d["tipo"]) for d in primera.json()] == sorted((d["cedis_id"], d["tipo"]) for d in dictamenes)
+    segunda = client.post("/api/proteccion-civil/dictamenes/lote", json=dictamenes, headers=contexto["usuario"]).json()
+    assert [d["id"] for d in segunda] == [d["id"] for d in primera.json()]
+    auditados = [(r[1], r[3]) for r in encolados if r[2] == "dictamenes"]
+    assert sorted(auditados[-4:]) == sorted(("UPDATE", d["id"]) for d in segunda)
+    assert _score(client, contexto)["dictamen_electrico"] is True
+
+    extintores = [{"cedis_id": cedis_id, "extintores_requeridos": 4, "extintores_pqs": 3, "extintores_co2": 1} for cedis_id in propios]
+    filas = client.post("/api/proteccion-civil/extintores/lote", json=extintores, headers=contexto["usuario"]).json()
+    assert [(f["total_extintores"], f["cumple"]) for f in filas] == [(4, True), (4, True)]
+
+    assert client.post("/api/proteccion-civil/pipc/lote", json=[{"cedis_id": propios[0]}] * 2, headers=contexto["usuario"]).status_code == 422
+    assert client.post("/api/proteccion-civil/pipc/lote", json=[{"cedis_id": ajeno}], headers=contexto["usuario"]).status_code == 403
+    monkeypatch.setattr(settings, "PROTECCION_CIVIL_LOTE_MAX", 3)
+    assert client.post("/api/proteccion-civil/dictamenes/lote", json=dictamenes, headers=contexto["usuario"]).status_code == 422
+
+def test_escrituras_concurrentes_mismo_cedis(bd):
+    """Extintores y PIPC del mismo CEDIS en dos transacciones: el score final refleja ambos cambios"""
+    with bd.begin() as conexion:
+        cedis_id = conexion.execute(text("SELECT max(id) FROM cedis WHERE codigo LIKE 'PRB-%'")).scalar()
+        conexion.execute(text("""
+            INSERT INTO extintores (cedis_id, extintores_requeridos, extintores_pqs, extintores_co2, total_extintores, cumple)
+            VALUES (:c, 4, 0, 0, 0, FALSE)
+            ON CONFLICT (cedis_id) DO UPDATE SET extintores_requeridos = 4, extintores_pqs = 0, extintores_co2 = 0
+        """), {"c": cedis_id})
+        conexion.execute(text("""
+            INSERT INTO pipc (cedis_id, fecha_vencimiento) VALUES (:c, CURRENT_DATE - 1)
+            ON CONFLICT (cedis_id) DO UPDATE SET fecha_vencimiento = CURRENT_DATE - 1
+        """), {"c": cedis_id})
+
+    def actualizar_pipc():
+        with bd.begin() as conexion:
+            conexion.execute(text("UPDATE pipc SET fecha_vencimiento = CURRENT_DATE + 90 WHERE cedis_id = :c"), {"c": cedis_id})
+
+    with ThreadPoolExecutor(1) as ejecutor:
+        with bd.begin() as primera:
+            primera.execute(text("UPDATE extintores SET extintores_pqs = 4 WHERE cedis_id = :c"), {"c": cedis_id})
+            segunda = ejecutor.submit(actualizar_pipc)
+            # Confirmar la primera solo cuando la segunda ya espera el bloqueo del CEDIS
+            for _ in range(100):
+                with bd.connect() as monitor:
+                    if monitor.execute(text(
+                        "SELECT count(*) FROM pg_stat_activity WHERE wait_event_type = 'Lock' AND query LIKE 'UPDATE pipc%'"
+                    )).scalar():
+                        break
+                time.sleep(0.05)
+        segunda.result()
+
+    with bd.connect() as conexion:
+        fila = conexion.execute(text(
+            "SELECT extintores_cumple, pipc_vigente FROM cumplimiento_cedis WHERE cedis_id = :c"
+        ), {"c": cedis_id}).one()
+    assert tuple(fila) == (True, True)
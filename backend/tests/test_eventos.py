@@ -0,0 +1,40 @@
+"""
+Eventos: los nombres de mes y día que rellena 0004 coinciden con las columnas de calendario
+"""
+
+import importlib.util
+import os
+
+from sqlalchemy import text
+
+from app.routers.eventos import DIAS_SEMANA, MESES
+
+def _migracion(nombre):
+    ruta = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations", "versions", f"{nombre}.py")
+    spec = importlib.util.spec_from_file_location(nombre, ruta)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+def test_nombres_de_calendario(bd, contexto):
+    calendario = _migracion("0004_eventos_calendario")
+    assert (calendario.MESES, calendario.DIAS_SEMANA) == (MESES, DIAS_SEMANA)
+
+    # El relleno de la migración sobre una copia temporal (oculta la tabla real en esta sesión);
+    # actualizar la tabla real, aun sin confirmar, borraría su mapa de visibilidad
+    with bd.connect() as conexion, conexion.begin() as transaccion:
+        conexion.execute(text("""
+            CREATE TEMP TABLE eventos_seguridad ON COMMIT DROP AS
+            SELECT fecha, fecha_mes, fecha_dia_semana, 'March'::varchar AS mes, NULL::varchar AS dia_semana
+            FROM public.eventos_seguridad
+        """))
+        conexion.execute(text(calendario.SQL_NOMBRES))
+        filas = conexion.execute(text("""
+            SELECT mes, dia_semana, fecha_mes, fecha_dia_semana
+            FROM eventos_seguridad WHERE fecha IS NOT NULL
+            GROUP BY 1, 2, 3, 4
+        """)).all()
+        transaccion.rollback()
+    assert filas
+    for mes, dia_semana, fecha_mes, fecha_dia_semana in filas:
+        assert (mes, dia_semana) == (MESES[fecha_mes - 1], DIAS_SEMANA[fecha_dia_semana - 1])
@@ -0,0 +1,84 @@
+"""
+Exportación de gastos a XLSX: hojas por categoría, subtotales y resumen
+"""
+
+import io
+from decimal import Decimal
+
+from openpyxl import load_workbook
+from sqlalchemy import text
+
+def test_exportar_por_categoria_con_subtotales(bd, client, contexto):
+    with bd.connect() as conexion:
+        esperados = {
+            categoria: (gastos, Decimal(total))
+            for categoria, gastos, total in conexion.execute(text("""
+                SELECT COALESCE(cg.nombre, 'Sin categoría'), count(*), sum(g.monto_total)
+                FROM gastos g LEFT JOIN categorias_gasto cg ON cg.id = g.categoria_id
+                WHERE g.cedis_id = :cedis_id
+                GROUP BY 1
+            """), contexto)
+        }
+    assert esperados
+
+    respuesta = client.get("/api/gastos/exportar", params={
+        "cedis_id": contexto["cedis_id"], "por_categoria": True, "subtotales": True
+    }, headers=contexto["usuario"])
+    assert respuesta.status_code == 200, respuesta.text
+    libro = load_workbook(io.BytesIO(respuesta.content), read_only=True)
+
+    assert libro.sheetnames[:2] == ["Resumen", "Gastos"]
+    assert sorted(libro.sheetnames[2:]) == sorted(esperados)
+
+    # Hoja principal: cada categoría cierra con su subtotal y al final el total general
+    filas = list(libro["Gastos"].iter_rows(min_row=2, values_only=True))
+    subtotales = {f[0][len("Subtotal "):]: Decimal(str(f[-1])) for f in filas if str(f[0]).startswith("Subtotal ")}
+    assert subtotales == {categoria: total for categoria, (_, total) in esperados.items()}
+    assert filas[-1][0] == "Total general"
+    assert Decimal(str(filas[-1][-1])) == sum(total for _, total in esperados.values())
+    assert len(filas) == sum(gastos for gastos, _ in esperados.values()) + len(esperados) + 1
+
+    for categoria, (gastos, total) in esperados.items():
+        hoja = list(libro[categoria].iter_rows(min_row=2, values_only=True))
+        assert len(hoja) == gastos + 1 and {f[3] for f in hoja[:-1]} <= {categoria, None}
+        assert hoja[-1][0] == f"Subtotal {categoria}" and Decimal(str(hoja[-1][-1])) == total
+
+    resumen = {f[0]: Decimal(str(f[1])) for f in libro["Resumen"].iter_rows(min_row=2, values_only=True)}
+    assert resumen.pop("Total general") == sum(total for _, total in esperados.values())
+    assert resumen == {categoria: total for categoria, (_, total) in esperados.items()}
+
+def test_sin_categoria_no_se_mezcla_con_categoria_homonima(bd, client, contexto):
+    with bd.begin() as conexion:
+        categoria_id = conexion.execute(text("""
+            INSERT INTO categorias_gasto (nombre) VALUES ('Sin categoría') RETURNING id
+        """)).scalar()
+        ids = conexion.execute(text("""
+            INSERT INTO gastos (fecha, cedis_id, organizacion_id, categoria_id, proveedor, monto_total)
+            SELECT CURRENT_DATE, :cedis_id, :organizacion_id, c, 'Homónima', m
+            FROM (VALUES (CAST(:categoria_id AS INT), 100.00), (NULL, 7.50)) v(c, m)
+            RETURNING id
+        """), {**contexto, "categoria_id": categoria_id}).scalars().all()
+        nulos = conexion.execute(text("""
+            SELECT count(*), sum(monto_total) FROM gastos WHERE cedis_id = :cedis_id AND categoria_id IS NULL
+        """), contexto).one()
+    try:
+        respuesta = client.get("/api/gastos/exportar", params={
+            "cedis_id": contexto["cedis_id"], "por_categoria": True, "subtotales": True
+        }, headers=contexto["usuario"])
+        assert respuesta.status_code == 200, respuesta.text
+        libro = load_workbook(io.BytesIO(respuesta.content), read_only=True)
+
+        # Una hoja y un subtotal por categoria_id: la categoría real y los gastos sin categoría
+        assert "Sin categoría" in libro.sheetnames and "Sin categoría (2)" in libro.sheetnames
+        filas = list(libro["Gastos"].iter_rows(min_row=2, values_only=True))
+        subtotales = [Decimal(str(f[-1])) for f in filas if f[0] == "Subtotal Sin categoría"]
+        assert sorted(subtotales) == sorted([Decimal("100.00"), Decimal(nulos[1])])
+        hojas = {
+            len(list(libro[nombre].iter_rows(min_row=2, values_only=True))) - 1
+            for nombre in ("Sin categoría", "Sin categoría (2)")
+        }
+        assert hojas == {1, nulos[0]}
+    finally:
+        with bd.begin() as conexion:
+            conexion.execute(text("DELETE FROM gastos WHERE id = ANY(:ids)"), {"ids": ids})
+            conexion.execute(text("DELETE FROM categorias_gasto WHERE id = :id"), {"id": categoria_id})
@@ -0,0 +1,78 @@
+"""
+Generador de datos sintéticos: bloques reproducibles sin importar el orden (sin base de datos)
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from generar_datos_sinteticos import (
+    CATEGORIAS, Contexto, bloques, generar_eventos, generar_gastos, generar_noticias
+)
+
+TAMAÑO_BLOQUE = 500
+PRIMER_ID = 1_000
+
+def _contexto(semilla=7):
+    cedis = pd.DataFrame({
+        "id": [11, 12, 13, 14],
+        "organizacion_id": [1, 1, 2, 2],
+        "estado_id": [14, 14, 9, 19],
+        "estado": ["Jalisco", "Jalisco", "Ciudad de México", "Nuevo León"],
+        "municipio": ["Zapopan", "Tlaquepaque", "Benito Juárez", "Apodaca"],
+        "peso_eventos": [3.0, 0.5, 1.0, 0.05],
+        "peso_gastos": [6000.0, 4000.0, 9000.0, 300.0],
+    })
+    categorias = pd.DataFrame({"id": range(1, len(CATEGORIAS) + 1), "nombre": sorted(CATEGORIAS)})
+    categorias["peso"] = categorias["nombre"].map(lambda nombre: CATEGORIAS[nombre][0])
+    estados = pd.DataFrame({"id": [9, 14, 19], "nombre": ["Ciudad de México", "Jalisco", "Nuevo León"]})
+    return Contexto(semilla, date(2024, 1, 1), date(2025, 6, 30), cedis, categorias, estados)
+
+def _generar(contexto, orden):
+    """Mismas tareas que cargar_tablas_grandes, en el orden dado; regresa cada tabla ordenada por bloque"""
+    tareas = [("eventos_seguridad", b, n, None) for b, n in bloques(1_200, TAMAÑO_BLOQUE)]
+    tareas += [("gastos", b, n, PRIMER_ID + b * TAMAÑO_BLOQUE) for b, n in bloques(1_100, TAMAÑO_BLOQUE)]
+    tareas += [("noticias_monitoreadas", b, n, None) for b, n in bloques(700, TAMAÑO_BLOQUE)]
+
+    resultados = {}
+    for tabla, bloque, n, primer_id in orden(tareas):
+        if tabla == "eventos_seguridad":
+            resultados[tabla, bloque] = generar_eventos(contexto, bloque, n)
+        elif tabla == "gastos":
+            resultados[tabla, bloque], resultados["productos_gasto", bloque] = generar_gastos(contexto, bloque, n, primer_id)
+        else:
+            resultados[tabla, bloque] = generar_noticias(contexto, bloque, n)
+
+    tablas = {tabla for tabla, _ in resultados}
+    return {
+        tabla: pd.concat([df for (t, _), df in sorted(resultados.items(), key=lambda r: r[0]) if t == tabla],
+                         ignore_index=True)
+        for tabla in tablas
+    }
+
+def test_mismos_datos_en_cualquier_orden():
+    primera = _generar(_contexto(), list)
+    otra_vez = _generar(_contexto(), list)
+    invertida = _generar(_contexto(), lambda tareas: tareas[::-1])
+    intercalada = _generar(_contexto(), lambda tareas: tareas[1::2] + tareas[::2])
+
+    assert set(primera) == {"eventos_seguridad", "gastos", "productos_gasto", "noticias_monitoreadas"}
+    for tabla, df in primera.items():
+        for otra in (otra_vez, invertida, intercalada):
+            pd.testing.assert_frame_equal(df, otra[tabla])
+
+    assert len(primera["eventos_seguridad"]) == 1_200 and len(primera["gastos"]) == 1_100
+    assert primera["gastos"]["id"].tolist() == list(range(PRIMER_ID, PRIMER_ID + 1_100))
+
+    # Otra semilla, otros datos
+    assert not primera["eventos_seguridad"].equals(_generar(_contexto(semilla=8), list)["eventos_seguridad"])
+
+def test_partidas_suman_el_monto_del_gasto():
+    gastos, productos = generar_gastos(_contexto(), 0, 2_000, PRIMER_ID)
+    sumas = productos.groupby("gasto_id")["subtotal"].sum().round(2)
+
+    assert sumas.index.tolist() == gastos["id"].tolist()
+    assert np.allclose(sumas.to_numpy(), gastos["monto_total"].to_numpy(), rtol=0, atol=0.005)
+    assert np.allclose(productos["subtotal"], (productos["cantidad"] * productos["precio_unitario"]).round(2))
+    assert productos.groupby("gasto_id")["orden"].apply(lambda o: o.tolist() == list(range(1, len(o) + 1))).all()
@@ -0,0 +1,55 @@
+"""
+Idempotency-Key en la creación de eventos y gastos
+"""
+
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+def _evento(contexto, descripcion):
+    return {
+        "fecha": "2026-10-19T10:30:00",
+        "cedis_id": contexto["cedis_id"],
+        "organizacion_id": contexto["organizacion_id"],
+        "tipo_evento": "Robo",
+        "descripcion": descripcion,
+        "estatus": "Abierto"
+    }
+
+def _contar(bd, descripcion):
+    with bd.connect() as conexion:
+        return conexion.execute(
+            text("SELECT count(*) FROM eventos_seguridad WHERE descripcion = :d"), {"d": descripcion}
+        ).scalar()
+
+def test_reintento_regresa_respuesta_original(bd, client, contexto):
+    descripcion = f"idempotencia {uuid.uuid4()}"
+    headers = {**contexto["admin"], "Idempotency-Key": str(uuid.uuid4())}
+
+    primera = client.post("/api/eventos/", json=_evento(contexto, descripcion), headers=headers)
+    reintento = client.post("/api/eventos/", json=_evento(contexto, descripcion), headers=headers)
+
+    assert primera.status_code == reintento.status_code == 200
+    assert reintento.json() == primera.json()
+    assert reintento.headers["idempotent-replayed"] == "true"
+    assert _contar(bd, descripcion) == 1
+
+def test_misma_clave_con_otro_cuerpo(client, contexto):
+    headers = {**contexto["admin"], "Idempotency-Key": str(uuid.uuid4())}
+    assert client.post("/api/eventos/", json=_evento(contexto, "a"), headers=headers).status_code == 200
+    assert client.post("/api/eventos/", json=_evento(contexto, "b"), headers=headers).status_code == 422
+
+def test_duplicados_concurrentes_insertan_una_vez(bd, client, contexto):
+    descripcion = f"idempotencia {uuid.uuid4()}"
+    headers = {**contexto["admin"], "Idempotency-Key": str(uuid.uuid4())}
+
+    with ThreadPoolExecutor(4) as ejecutor:
+        respuestas = list(ejecutor.map(
+            lambda _: client.post("/api/eventos/", json=_evento(contexto, descripcion), headers=headers),
+            range(8)
+        ))
+
+    assert {r.status_code for r in respuestas} == {200}
+    assert len({r.json()["id"] for r in respuestas}) == 1
+    assert _contar(bd, descripcion) == 1
@@ -0,0 +1,17 @@
+"""
+GET /metrics: sin token configurado no se expone salvo que se pida
+"""
+
+def test_metricas_requieren_token(client, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "METRICAS_TOKEN", "")
+    assert client.get("/metrics").status_code == 404
+    monkeypatch.setattr(settings, "METRICAS_SIN_TOKEN", True)
+    assert client.get("/metrics").status_code == 200
+
+    monkeypatch.setattr(settings, "METRICAS_TOKEN", "secreto")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer otro"}).status_code == 401
+    respuesta = client.get("/metrics", headers={"Authorization": "Bearer secreto"})
+    assert respuesta.status_code == 200 and "http_" in respuesta.text
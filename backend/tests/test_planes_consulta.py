@@ -0,0 +1,178 @@
+"""
+Regresión de planes de ejecución
+
+Cada endpoint se llama con un usuario real; todas las consultas SELECT que
+emite se pasan por EXPLAIN con los mismos parámetros y la prueba falla si:
+
+- alguna hace un Seq Scan sobre una tabla grande (índice faltante), o
+- una consulta paginada (ORDER BY ... LIMIT) ordena filas de una tabla
+  grande en lugar de leerlas en orden de un índice compuesto.
+
+Las rutas de catálogo (CEDIS, protección civil) solo deben leer tablas con
+una fila por CEDIS: la prueba falla si alguna de sus consultas toca una
+tabla grande.
+"""
+
+import re
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+# Tablas que crecen sin límite; las de catálogo (estados, cedis, categorías...)
+# pueden recorrerse completas
+TABLAS_GRANDES = {
+    "eventos_seguridad", "gastos", "auditoria", "reportes_generados", "noticias_monitoreadas",
+    "riesgo_delictivo_cedis", "indices_delictivos", "cumplimiento_historico"
+}
+
+@contextmanager
+def capturar_planes(engine):
+    """Registrar (sentencia, plan) de cada SELECT ejecutado dentro del bloque"""
+    planes = []
+
+    def explicar(conexion, cursor, sentencia, parametros, contexto, executemany):
+        if executemany or not sentencia.lstrip().upper().startswith("SELECT"):
+            return
+        auxiliar = cursor.connection.cursor()
+        try:
+            auxiliar.execute("EXPLAIN (FORMAT JSON) " + sentencia, parametros)
+            planes.append((sentencia, auxiliar.fetchone()[0][0]["Plan"]))
+        finally:
+            auxiliar.close()
+
+    event.listen(engine, "before_cursor_execute", explicar)
+    try:
+        yield planes
+    finally:
+        event.remove(engine, "before_cursor_execute", explicar)
+
+def _tabla(nodo):
+    """Tabla del nodo (las particiones anuales cuentan como su tabla padre)"""
+    nombre = nodo.get("Relation Name")
+    return re.sub(r"_\d{4}$", "", nombre) if nombre else None
+
+def _nodos(plan):
+    yield plan
+    for hijo in plan.get("Plans", []):
+        yield from _nodos(hijo)
+
+def _recorridos_secuenciales(plan):
+    return [
+        _tabla(nodo) for nodo in _nodos(plan)
+        if nodo["Node Type"] == "Seq Scan" and _tabla(nodo) in TABLAS_GRANDES
+    ]
+
+_AGREGADOS = {"Aggregate", "Group", "WindowAgg"}
+
+def _filas_ordenadas(nodo):
+    """Tablas grandes cuyas filas llegan sin agregar a un nodo Sort"""
+    for hijo in nodo.get("Plans", []):
+        if hijo["Node Type"] in _AGREGADOS:
+            continue
+        if _tabla(hijo) in TABLAS_GRANDES:
+            yield _tabla(hijo)
+        yield from _filas_ordenadas(hijo)
+
+def _ordenamientos(plan):
+    return [
+        tabla for nodo in _nodos(plan) if nodo["Node Type"] == "Sort"
+        for tabla in _filas_ordenadas(nodo)
+    ]
+
+def _tablas(plan):
+    return {_tabla(nodo) for nodo in _nodos(plan) if "Relation Name" in nodo}
+
+hoy = date.today()
+
+# (usuario, ruta)
+CONSULTAS = [
+    ("usuario", "/api/eventos/"),
+    ("usuario", "/api/eventos/?cedis_id={cedis_id}"),
+    ("usuario", "/api/eventos/?tipo_evento=Robo"),
+    ("usuario", f"/api/eventos/?fecha_inicio={hoy - timedelta(days=30)}T00:00:00"),
+    ("usuario", "/api/eventos/stats"),
+    ("usuario", "/api/eventos/heatmap"),
+    ("usuario", "/api/eventos/heatmap?cedis_id={cedis_id}&tipo_evento=Robo&dias=365"),
+    ("usuario", "/api/eventos/anomalias?dias=31"),
+    ("usuario", "/api/gastos/"),
+    ("usuario", "/api/gastos/?cedis_id={cedis_id}"),
+    ("usuario", "/api/gastos/?categoria_id={categoria_id}"),
+    ("usuario", "/api/gastos/?estado=Pendiente"),
+    ("usuario", f"/api/gastos/?fecha_inicio={hoy - timedelta(days=90)}&fecha_fin={hoy}"),
+    ("usuario", "/api/gastos/stats"),
+    ("usuario", "/api/gastos/exportar?subtotales=true"),
+    ("usuario", "/api/dashboard/stats"),
+    ("usuario", "/api/dashboard/tendencias"),
+    ("usuario", "/api/dashboard/resumen-cedis/{cedis_id}"),
+    ("usuario", "/api/reportes/"),
+    ("admin", "/api/reportes/?cedis_id={cedis_id}"),
+    ("admin", "/api/auditoria/"),
+    ("admin", "/api/auditoria/?tabla=gastos"),
+    ("admin", "/api/auditoria/?usuario_id={usuario_id}"),
+    ("admin", f"/api/auditoria/?desde={hoy - timedelta(days=3)}T00:00:00&hasta={hoy - timedelta(days=1)}T00:00:00"),
+    ("usuario", "/api/noticias/"),
+    ("usuario", "/api/noticias/?tipo_alerta=Robo"),
+    ("usuario", "/api/noticias/?incluir_duplicados=true&skip=100"),
+    ("usuario", "/api/noticias/{noticia_id}/duplicados"),
+    ("usuario", "/api/riesgo/"),
+    ("usuario", "/api/riesgo/{cedis_id}"),
+    ("usuario", "/api/proteccion-civil/cumplimiento/tendencia"),
+    ("usuario", "/api/proteccion-civil/cumplimiento/tendencia?agrupar=mes&cedis_id={cedis_id}"),
+    ("usuario", "/api/proteccion-civil/cumplimiento/historico"),
+    ("usuario", "/api/proteccion-civil/cumplimiento/historico?cedis_id={cedis_id}"),
+]
+
+# Rutas de catálogo: una fila por CEDIS, sin tablas grandes
+CONSULTAS_CATALOGO = [
+    ("usuario", "/api/cedis/"),
+    ("usuario", "/api/cedis/{cedis_id}"),
+    ("usuario", "/api/proteccion-civil/extintores"),
+    ("usuario", "/api/proteccion-civil/pipc"),
+    ("usuario", "/api/proteccion-civil/dictamenes"),
+    ("usuario", "/api/proteccion-civil/compliance"),
+]
+
+@pytest.mark.parametrize("usuario,ruta", CONSULTAS)
+def test_plan_usa_indices(bd, client, contexto, usuario, ruta):
+    ruta = ruta.format(**contexto)
+
+    with capturar_planes(bd) as planes:
+        respuesta = client.get(ruta, headers=contexto[usuario])
+    assert respuesta.status_code == 200, respuesta.text
+
+    relevantes = [(sql, plan) for sql, plan in planes if _tablas(plan) & TABLAS_GRANDES]
+    assert relevantes, f"{ruta}: no se capturó ninguna consulta sobre {sorted(TABLAS_GRANDES)}"
+
+    for sql, plan in relevantes:
+        secuenciales = _recorridos_secuenciales(plan)
+        assert not secuenciales, f"{ruta}: Seq Scan en {secuenciales}\n{sql}"
+        if " LIMIT " in sql:
+            ordenadas = _ordenamientos(plan)
+            assert not ordenadas, f"{ruta}: Sort sobre filas de {ordenadas}\n{sql}"
+
+@pytest.mark.parametrize("usuario,ruta", CONSULTAS_CATALOGO)
+def test_catalogo_sin_tablas_grandes(bd, client, contexto, usuario, ruta):
+    with capturar_planes(bd) as planes:
+        respuesta = client.get(ruta.format(**contexto), headers=contexto[usuario])
+    assert respuesta.status_code == 200, respuesta.text
+    assert planes, f"{ruta}: no se capturó ninguna consulta"
+
+    for sql, plan in planes:
+        grandes = _tablas(plan) & TABLAS_GRANDES
+        assert not grandes, f"{ruta}: lee {sorted(grandes)}\n{sql}"
+
+@pytest.mark.parametrize("ruta", ["/api/eventos/heatmap", "/api/eventos/heatmap?cedis_id={cedis_id}&dias=365"])
+def test_heatmap_solo_indice(bd, client, contexto, ruta):
+    """El mapa de calor no debe leer filas de eventos_seguridad (columnas incluidas en el índice)"""
+    with capturar_planes(bd) as planes:
+        respuesta = client.get(ruta.format(**contexto), headers=contexto["usuario"])
+    assert respuesta.status_code == 200, respuesta.text
+    assert len(respuesta.json()["matriz"]) == 7
+
+    recorridos = [
+        nodo["Node Type"] for _, plan in planes for nodo in _nodos(plan)
+        if nodo.get("Relation Name") == "eventos_seguridad"
+    ]
+    assert recorridos and set(recorridos) == {"Index Only Scan"}, recorridos
@@ -0,0 +1,86 @@
+"""
+Presupuestos: acumulados mantenidos por triggers y eventos de umbral
+"""
+
+from datetime import date
+
+from sqlalchemy import text
+
+MES = date.today().replace(day=1)
+
+def _ejercido_real(bd, cedis_id, categoria_id):
+    with bd.connect() as conexion:
+        return float(conexion.execute(text("""
+            SELECT COALESCE(sum(monto_total), 0) FROM gastos
+            WHERE cedis_id = :c AND categoria_id = :k AND fecha >= :mes AND fecha < :mes + INTERVAL '1 month'
+        """), {"c": cedis_id, "k": categoria_id, "mes": MES}).scalar())
+
+def _celda(client, contexto, categoria_id):
+    respuesta = client.get(
+        f"/api/presupuestos/estado?cedis_id={contexto['cedis_id']}&categoria_id={categoria_id}",
+        headers=contexto["usuario"]
+    )
+    assert respuesta.status_code == 200, respuesta.text
+    return respuesta.json()["celdas"][0]
+
+def test_acumulados_y_eventos_de_umbral(bd, client, contexto, monkeypatch):
+    from app.services import auditoria
+
+    encolados = []
+    monkeypatch.setattr(auditoria.escritor_auditoria, "encolar", encolados.extend)
+    cedis_id = contexto["cedis_id"]
+    with bd.connect() as conexion:
+        categoria_id = conexion.execute(text("""
+            SELECT id FROM categorias_gasto WHERE id NOT IN (
+                SELECT categoria_id FROM gastos_acumulados WHERE cedis_id = :c AND mes = :mes
+            ) ORDER BY id LIMIT 1
+        """), {"c": cedis_id, "mes": MES}).scalar()
+
+    presupuesto = client.post("/api/presupuestos/", json={
+        "mes": str(MES.replace(day=15)), "cedis_id": cedis_id, "categoria_id": categoria_id, "monto": "1000"
+    }, headers=contexto["admin"])
+    assert presupuesto.status_code == 200, presupuesto.text
+    assert presupuesto.json()["mes"] == str(MES)
+    assert [(r[1], r[3]) for r in encolados if r[2] == "presupuestos"] == [("INSERT", presupuesto.json()["id"])]
+
+    gasto = {
+        "fecha": str(MES), "cedis_id": cedis_id, "categoria_id": categoria_id,
+        "organizacion_id": contexto["organizacion_id"], "monto_total": "850"
+    }
+    assert client.post("/api/gastos/", json=gasto, headers=contexto["admin"]).status_code == 200
+    celda = _celda(client, contexto, categoria_id)
+    assert (celda["ejercido"], celda["porcentaje"], celda["estado"]) == (850, 85, "alerta")
+
+    # Actualización y borrado también ajustan el acumulado
+    with bd.begin() as conexion:
+        conexion.execute(text("""
+            UPDATE gastos SET monto_total = 1200 WHERE cedis_id = :c AND categoria_id = :k AND fecha = :mes
+        """), {"c": cedis_id, "k": categoria_id, "mes": MES})
+    celda = _celda(client, contexto, categoria_id)
+    assert celda["ejercido"] == _ejercido_real(bd, cedis_id, categoria_id) == 1200
+    assert celda["estado"] == "excedido"
+
+    eventos = client.get(f"/api/presupuestos/eventos?cedis_id={cedis_id}", headers=contexto["usuario"]).json()
+    assert sorted(e["umbral"] for e in eventos if e["categoria_id"] == categoria_id) == [80, 100]
+
+    with bd.begin() as conexion:
+        conexion.execute(text("DELETE FROM gastos WHERE cedis_id = :c AND categoria_id = :k AND fecha = :mes"),
+                         {"c": cedis_id, "k": categoria_id, "mes": MES})
+    assert _celda(client, contexto, categoria_id)["ejercido"] == 0
+
+    with bd.begin() as conexion:
+        conexion.execute(text("DELETE FROM presupuestos WHERE id = :id"), {"id": presupuesto.json()["id"]})
+        conexion.execute(text("DELETE FROM gastos_acumulados WHERE cedis_id = :c AND categoria_id = :k AND mes = :mes"),
+                         {"c": cedis_id, "k": categoria_id, "mes": MES})
+
+def test_presupuesto_requiere_permisos(client, contexto):
+    respuesta = client.post("/api/presupuestos/", json={
+        "mes": str(MES), "cedis_id": contexto["cedis_id"], "categoria_id": contexto["categoria_id"], "monto": "1"
+    }, headers=contexto["usuario"])
+    assert respuesta.status_code == 403
+
+def test_presupuesto_categoria_inexistente(client, contexto):
+    respuesta = client.post("/api/presupuestos/", json={
+        "mes": str(MES), "cedis_id": contexto["cedis_id"], "categoria_id": 2_000_000_000, "monto": "1"
+    }, headers=contexto["admin"])
+    assert respuesta.status_code == 404
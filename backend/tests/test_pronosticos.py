@@ -0,0 +1,77 @@
+"""
+Pronóstico de gastos: ajuste vectorizado y reajuste incremental
+"""
+
+import numpy as np
+from sqlalchemy import text
+
+from app.services.pronosticos import ajustar, ejecutar_actualizacion
+
+MES_BASE = 2026 * 12 + 9  # octubre de 2026
+
+def test_ajuste_recupera_estacionalidad_y_tendencia():
+    meses = np.arange(MES_BASE - 36, MES_BASE)
+    patron = 1000 + 300 * (meses % 12 == 11) + 20 * (meses - meses[0])  # pico en diciembre
+    ruido = np.random.default_rng(3).normal(0, 10, size=(2, 36))
+    totales = np.vstack([patron, patron * 2]) + ruido
+
+    ajuste = ajustar(totales, np.array([0, 0]), MES_BASE, 12)
+
+    esperado = 1000 + 300 * (np.arange(MES_BASE, MES_BASE + 12) % 12 == 11) + 20 * np.arange(36, 48)
+    assert ajuste["modelo"] == ["estacional", "estacional"]
+    assert np.allclose(ajuste["pronostico"][0], esperado, rtol=0.05)
+    assert np.allclose(ajuste["pronostico"][1], 2 * esperado, rtol=0.05)
+    assert ajuste["error"][0][-1] > ajuste["error"][0][0] > 0
+
+def test_series_cortas():
+    totales = np.zeros((3, 36))
+    totales[0, -8:] = 500
+    totales[1, -4:] = 100
+    totales[2, -2:] = 100
+
+    ajuste = ajustar(totales, np.array([28, 32, 34]), MES_BASE, 6)
+
+    assert ajuste["modelo"] == ["tendencia", "promedio", None]
+    assert np.allclose(ajuste["pronostico"][1], 100)
+
+def test_reajusta_solo_series_modificadas(bd, client, contexto):
+    assert ejecutar_actualizacion(todas=True)["ajustadas"] > 0
+    with bd.begin() as conexion:
+        conexion.execute(text("""
+            UPDATE gastos SET updated_at = now()
+            WHERE id = (SELECT min(id) FROM gastos WHERE cedis_id = :cedis_id)
+        """), contexto)
+
+    assert ejecutar_actualizacion() == {"series": 1, "ajustadas": 1, "todas": False}
+    assert ejecutar_actualizacion() == {"series": 0, "ajustadas": 0}
+
+    respuesta = client.get(f"/api/gastos/forecast?meses=3&cedis_id={contexto['cedis_id']}", headers=contexto["usuario"])
+    assert respuesta.status_code == 200, respuesta.text
+    pronostico = respuesta.json()
+    assert pronostico["series"] > 0 and len(pronostico["meses"]) == 3
+    assert all(m["inferior"] <= m["pronostico"] <= m["superior"] for m in pronostico["meses"])
+
+def test_gasto_movido_o_borrado_reajusta_serie_anterior(bd, contexto):
+    ejecutar_actualizacion(todas=True)
+    with bd.begin() as conexion:
+        gasto = conexion.execute(text("""
+            SELECT id, categoria_id FROM gastos WHERE cedis_id = :cedis_id AND categoria_id <> :categoria_id
+            ORDER BY id LIMIT 1
+        """), contexto).one()
+        conexion.execute(text("UPDATE gastos SET categoria_id = :categoria_id WHERE id = :id"),
+                         {"categoria_id": contexto["categoria_id"], "id": gasto.id})
+        tocadas = conexion.execute(text("SELECT cedis_id, categoria_id FROM gastos_series_tocadas ORDER BY 2")).all()
+        assert sorted(tocadas) == sorted([(contexto["cedis_id"], gasto.categoria_id), (contexto["cedis_id"], contexto["categoria_id"])])
+
+        conexion.execute(text("UPDATE gastos SET categoria_id = :categoria_id WHERE id = :id"),
+                         {"categoria_id": gasto.categoria_id, "id": gasto.id})
+    ejecutar_actualizacion()
+
+    with bd.begin() as conexion:
+        conexion.execute(text("DELETE FROM gastos_series_tocadas"))
+        borrado = conexion.execute(text("""
+            DELETE FROM gastos WHERE id = (SELECT max(id) FROM gastos WHERE cedis_id = :cedis_id)
+            RETURNING cedis_id, categoria_id
+        """), contexto).one()
+        assert conexion.execute(text("SELECT cedis_id, categoria_id FROM gastos_series_tocadas")).all() == [tuple(borrado)]
+        conexion.rollback()
@@ -0,0 +1,91 @@
+"""
+Elección de réplica de lectura
+"""
+
+import time
+
+from sqlalchemy import text
+
+from app.core.replicas import Replicas
+
+def _replicas(*estados):
+    """Réplicas con (horizonte, lsn reproducido)"""
+    replicas = Replicas([f"postgresql://postgres@localhost/replica{i}" for i in range(len(estados))], 5, 1)
+    for replica, (horizonte, lsn) in zip(replicas._replicas, estados):
+        replica.horizonte, replica.lsn = horizonte, lsn
+    return replicas
+
+def test_round_robin_entre_replicas_al_dia():
+    ahora = time.time()
+    replicas = _replicas((ahora, 100), (ahora, 100))
+    elegidas = {replicas.elegir() for _ in range(4)}
+    assert elegidas == set(replicas.engines)
+
+def test_replica_atrasada_o_caida_usa_primario():
+    assert _replicas((time.time() - 30, 100)).elegir() is None
+    assert _replicas((None, None)).elegir() is None
+
+def test_lee_sus_propias_escrituras():
+    ahora = time.time()
+    replicas = _replicas((ahora, 100), (ahora, 200))
+    assert {replicas.elegir(150) for _ in range(4)} == {replicas.engines[1]}
+    assert replicas.elegir(250) is None
+
+def test_horizonte_por_posicion_del_primario(monkeypatch):
+    """Recibido = reproducido no basta: cuenta lo que el primario ya había escrito"""
+    replicas = _replicas((None, None))
+    replicas._muestras.extend([(100.0, 10), (101.0, 20), (102.0, 30)])
+
+    class Conexion:
+        def __init__(self, lsn):
+            self.lsn = lsn
+        def __enter__(self):
+            return self
+        def __exit__(self, *args):
+            return False
+        def execute(self, sql):
+            return self
+        def scalar(self):
+            return self.lsn
+
+    from app.core import replicas as modulo
+    replica = replicas._replicas[0]
+    monkeypatch.setattr(modulo.engine, "connect", lambda: Conexion(40))
+    monkeypatch.setattr(replica.engine, "connect", lambda: Conexion(25))
+    replicas.verificar()
+    assert replica.horizonte == 101.0 and replica.retraso > 0
+
+def test_escritura_registra_posicion_wal(bd, client, contexto, monkeypatch):
+    """La lectura va a la réplica solo cuando ya reprodujo la escritura del usuario"""
+    from app.core import replicas as modulo
+
+    # La "réplica" es la misma base de pruebas
+    replicas = Replicas([bd.url.render_as_string(hide_password=False)], 5, 1)
+    replica = replicas._replicas[0]
+    replica.horizonte, replica.lsn = time.time() + 60, 0
+    monkeypatch.setattr(modulo, "replicas", replicas)
+    elegidas = []
+    elegir = modulo.SesionLectura._elegir
+    monkeypatch.setattr(modulo.SesionLectura, "_elegir", lambda sesion: elegidas.append(elegir(sesion)) or elegidas[-1])
+
+    respuesta = client.post("/api/gastos/", json={
+        "fecha": "2024-01-15", "cedis_id": contexto["cedis_id"], "categoria_id": contexto["categoria_id"],
+        "organizacion_id": contexto["organizacion_id"], "monto_total": "10"
+    }, headers=contexto["admin"])
+    assert respuesta.status_code == 200, respuesta.text
+    with bd.connect() as conexion:
+        lsn = conexion.execute(text("""
+            SELECT (lsn - '0/0'::pg_lsn)::bigint FROM escrituras_usuario
+            WHERE usuario_id = (SELECT usuario_registro_id FROM gastos WHERE id = :id)
+        """), {"id": respuesta.json()["id"]}).scalar()
+        actual = conexion.execute(text("SELECT (pg_current_wal_lsn() - '0/0'::pg_lsn)::bigint")).scalar()
+    assert 0 < lsn <= actual
+
+    assert client.get("/api/gastos/", headers=contexto["admin"]).status_code == 200
+    replica.lsn = lsn
+    assert client.get("/api/gastos/", headers=contexto["admin"]).status_code == 200
+    assert elegidas == [None, replica.engine]
+
+    replicas.detener()
+    with bd.begin() as conexion:
+        conexion.execute(text("DELETE FROM gastos WHERE id = :id"), {"id": respuesta.json()["id"]})
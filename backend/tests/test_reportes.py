@@ -0,0 +1,61 @@
+"""
+Reportes en segundo plano: generación en el pool, solicitudes idénticas y cola llena
+"""
+
+from concurrent.futures import Future
+
+from sqlalchemy import text
+
+def _solicitud(contexto, mes, formato="HTML"):
+    return {"tipo_reporte": "Ejecutivo CEDIS", "formato": formato, "año": 2024, "mes": mes, "cedis_id": contexto["cedis_id"]}
+
+def test_genera_en_el_pool_y_descarga(bd, client, contexto, monkeypatch, tmp_path):
+    from app.core.config import settings
+    from app.services.reportes import ColaReportes
+    from app.routers import reportes
+
+    # El proceso hijo hereda REPORTES_DIR del entorno
+    monkeypatch.setenv("REPORTES_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "REPORTES_DIR", str(tmp_path))
+    cola = ColaReportes(1, 5)
+    monkeypatch.setattr(reportes, "cola_reportes", cola)
+    try:
+        respuesta = client.post("/api/reportes/", json=_solicitud(contexto, 3), headers=contexto["usuario"])
+        assert respuesta.status_code == 202, respuesta.text
+        reporte_id = respuesta.json()["id"]
+        cola._en_curso[reporte_id].result(timeout=120)
+    finally:
+        cola.cerrar()
+
+    estado = client.get(f"/api/reportes/{reporte_id}", headers=contexto["usuario"]).json()
+    assert estado["estado"] == "Completado", estado
+    descarga = client.get(f"/api/reportes/{reporte_id}/descarga", headers=contexto["usuario"])
+    assert descarga.status_code == 200 and b"Resumen por CEDIS" in descarga.content
+
+    with bd.begin() as conexion:
+        conexion.execute(text("DELETE FROM reportes_generados WHERE id = :id"), {"id": reporte_id})
+
+def test_solicitudes_identicas_y_cola_llena(bd, client, contexto, monkeypatch):
+    from app.services.reportes import ColaReportes
+    from app.routers import reportes
+
+    class EjecutorDetenido:
+        """Nada termina: las solicitudes quedan pendientes"""
+        def submit(self, *args):
+            return Future()
+
+    cola = ColaReportes(1, 1)
+    monkeypatch.setattr(cola, "_obtener_ejecutor", EjecutorDetenido)
+    monkeypatch.setattr(reportes, "cola_reportes", cola)
+
+    primera = client.post("/api/reportes/", json=_solicitud(contexto, 1), headers=contexto["usuario"])
+    assert primera.status_code == 202 and "X-Reporte-Reutilizado" not in primera.headers
+    repetida = client.post("/api/reportes/", json=_solicitud(contexto, 1), headers=contexto["usuario"])
+    assert repetida.status_code == 202 and repetida.headers["X-Reporte-Reutilizado"] == "true"
+    assert repetida.json()["id"] == primera.json()["id"]
+
+    otra = client.post("/api/reportes/", json=_solicitud(contexto, 2), headers=contexto["usuario"])
+    assert otra.status_code == 429 and otra.headers["Retry-After"] == "30"
+
+    with bd.begin() as conexion:
+        conexion.execute(text("DELETE FROM reportes_generados WHERE id = :id"), {"id": primera.json()["id"]})
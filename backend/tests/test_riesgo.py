@@ -0,0 +1,77 @@
+"""
+Riesgo delictivo: sumas móviles, variación anual y desfase sobre la matriz CEDIS x meses (sin base de datos)
+"""
+
+import numpy as np
+
+from app.services.riesgo import _desfasar, _sumas_moviles, _variacion_pct, recalcular_riesgo
+
+def _acumulada(matriz):
+    return np.concatenate([np.zeros((len(matriz), 1), dtype=np.int64), np.cumsum(matriz, axis=1)], axis=1)
+
+def test_sumas_moviles():
+    relevantes = np.array([np.arange(1, 16), [0] * 12 + [5, 5, 5]])
+    acumulada = _acumulada(relevantes)
+
+    # Al inicio la ventana se recorta a los meses disponibles
+    assert _sumas_moviles(acumulada, 3)[0].tolist() == [1, 3] + [3 * j for j in range(2, 15)]
+    assert _sumas_moviles(acumulada, 6)[0, 5:8].tolist() == [21, 27, 33]
+    assert _sumas_moviles(acumulada, 12)[0, 11:].tolist() == [78, 90, 102, 114]
+    assert _sumas_moviles(acumulada, 12)[1, 11:].tolist() == [0, 5, 10, 15]
+
+def test_desfasar():
+    resultado = _desfasar(np.array([[1.0, 2, 3, 4], [5, 6, 7, 8]]), 2)
+    assert np.isnan(resultado[:, :2]).all()
+    assert resultado[:, 2:].tolist() == [[1, 2], [5, 6]]
+
+def test_variacion_pct_sin_base():
+    resultado = _variacion_pct(np.array([110, 50, 7, 30]), np.array([100, 0, np.nan, 40]))
+    assert resultado[0] == 10 and resultado[3] == -25
+    assert np.isnan(resultado[1]) and np.isnan(resultado[2])
+
+class SesionFalsa:
+    """Lo mínimo de Session que usa recalcular_riesgo"""
+
+    def __init__(self, filas):
+        self.filas = filas
+        self.registros = None
+
+    def execute(self, sentencia):
+        return self
+
+    def all(self):
+        return self.filas
+
+    def query(self, modelo):
+        return self
+
+    def delete(self, synchronize_session):
+        pass
+
+    def bulk_insert_mappings(self, modelo, registros):
+        self.registros = registros
+
+    def commit(self):
+        pass
+
+def test_recalcular_riesgo():
+    # (cedis_id, año, mes, delitos_relevantes, indice_impacto); el CEDIS 7 no tiene junio de 2025
+    filas = [(7, 2025, mes, 10, 6) for mes in range(1, 13) if mes != 6] + [(7, 2026, 1, 10, 60)]
+    filas += [(9, 2025, 1, 0, 0), (9, 2026, 1, 4, 2)]
+    db = SesionFalsa(filas)
+
+    assert recalcular_riesgo(db) == len(filas)
+    registros = {(r["cedis_id"], r["año"], r["mes"]): r for r in db.registros}
+    assert (7, 2025, 6) not in registros
+
+    enero = registros[(7, 2026, 1)]
+    assert (enero["suma_3m"], enero["suma_6m"], enero["suma_12m"], enero["suma_12m_anterior"]) == (30, 60, 110, 10)
+    assert enero["variacion_anual"] == 1000.0 and enero["variacion_mes_anual"] == 0.0
+    assert enero["nivel_riesgo"] == "CRÍTICO" and registros[(7, 2025, 12)]["nivel_riesgo"] == "MEDIO"
+
+    # Año anterior en cero: sin variación
+    sin_base = registros[(9, 2026, 1)]
+    assert (sin_base["suma_12m"], sin_base["suma_12m_anterior"]) == (4, 0)
+    assert sin_base["variacion_anual"] is None and sin_base["variacion_mes_anual"] is None
+    assert sin_base["nivel_riesgo"] == "BAJO"
+    assert registros[(9, 2025, 1)]["suma_12m_anterior"] is None
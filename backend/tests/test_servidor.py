@@ -0,0 +1,30 @@
+"""
+Dimensionamiento de workers y pools del servidor de producción
+"""
+
+import pytest
+
+from app.servidor import dimensionar
+
+def test_total_no_excede_max_connections():
+    for nucleos in (1, 2, 4, 8, 16, 64):
+        for maximo in (25, 97, 197, 497):
+            dim = dimensionar(nucleos, maximo, reservadas=10, reportes=2)
+            assert dim.total_conexiones <= maximo - 10
+            assert dim.conexiones_por_worker >= 2
+            assert dim.hilos_por_worker < dim.conexiones_por_worker
+
+def test_pocas_conexiones_reducen_workers():
+    dim = dimensionar(nucleos=16, max_conexiones=50, reservadas=10, reportes=2)
+    assert dim.workers == 8
+    assert dim.conexiones_por_worker == 2
+    assert dim.total_conexiones == 8 * (2 + 2 + 1) == 40
+
+def test_instancias_reparten_conexiones():
+    una = dimensionar(4, 197, instancias=1)
+    tres = dimensionar(4, 197, instancias=3)
+    assert 3 * tres.total_conexiones <= 197 - 10 < 3 * una.total_conexiones
+
+def test_sin_conexiones_suficientes():
+    with pytest.raises(ValueError):
+        dimensionar(4, 14, reservadas=10, reportes=2)
@@ -0,0 +1,59 @@
+"""
+Sesiones: un token revocado se rechaza en la siguiente petición, en este y en otros workers
+"""
+
+import uuid
+
+from sqlalchemy import text
+
+def _token(client, email: str) -> dict:
+    client.post("/api/auth/register", json={"nombre": email, "email": email, "password": "Sesion-123"})
+    respuesta = client.post("/api/auth/login", data={"username": email, "password": "Sesion-123"})
+    assert respuesta.status_code == 200, respuesta.text
+    return {"Authorization": f"Bearer {respuesta.json()['access_token']}"}
+
+def test_logout_revoca_el_token(bd, client):
+    from app.services.sesiones import RegistroSesiones, hash_token
+
+    encabezados = _token(client, f"sesion.{uuid.uuid4().hex[:8]}@example.com")
+    token = encabezados["Authorization"].split()[1]
+    otro_worker = RegistroSesiones(intervalo=1, intervalo_compactacion=60)
+    otro_worker.sincronizar()
+
+    assert client.get("/api/auth/me", headers=encabezados).status_code == 200
+    assert client.post("/api/auth/logout", headers=encabezados).status_code == 200
+    assert client.get("/api/auth/me", headers=encabezados).status_code == 401
+
+    # Otro worker lo ve con su sincronización incremental
+    assert not otro_worker.revocada(hash_token(token))
+    otro_worker.sincronizar()
+    assert otro_worker.revocada(hash_token(token))
+
+def test_administrador_revoca_sesiones_de_usuario(bd, client, contexto):
+    email = f"sesion.{uuid.uuid4().hex[:8]}@example.com"
+    encabezados = _token(client, email)
+    with bd.connect() as conexion:
+        usuario_id = conexion.execute(text("SELECT id FROM usuarios WHERE email = :e"), {"e": email}).scalar()
+
+    assert client.post(f"/api/auth/usuarios/{usuario_id}/revocar-sesiones", headers=encabezados).status_code == 403
+    respuesta = client.post(f"/api/auth/usuarios/{usuario_id}/revocar-sesiones", headers=contexto["admin"])
+    assert respuesta.json()["total"] == 1
+    assert client.get("/api/auth/me", headers=encabezados).status_code == 401
+
+def test_logins_simultaneos_son_sesiones_distintas(bd, client):
+    from app.services.sesiones import hash_token
+
+    email = f"sesion.{uuid.uuid4().hex[:8]}@example.com"
+    primera = _token(client, email)
+    respuesta = client.post("/api/auth/login", data={"username": email, "password": "Sesion-123"})
+    segunda = {"Authorization": f"Bearer {respuesta.json()['access_token']}"}
+    assert primera != segunda
+    with bd.connect() as conexion:
+        hashes = conexion.execute(text("""
+            SELECT s.token_hash FROM sesiones s JOIN usuarios u ON u.id = s.usuario_id WHERE u.email = :e
+        """), {"e": email}).scalars().all()
+    assert sorted(hashes) == sorted(hash_token(e["Authorization"].split()[1]) for e in (primera, segunda))
+
+    assert client.post("/api/auth/logout", headers=primera).status_code == 200
+    assert client.get("/api/auth/me", headers=primera).status_code == 401
+    assert client.get("/api/auth/me", headers=segunda).status_code == 200